@@ -2,5 +2,8 @@
 from .auth import router as auth_router
 from .teams import router as teams_router
 from .domains import router as domains_router
+from .records import router as records_router
+from .profiling import router as profiling_router
+from .jobs import router as jobs_router
 
-__all__ = ["auth_router", "teams_router", "domains_router"]
+__all__ = ["auth_router", "teams_router", "domains_router", "records_router", "profiling_router", "jobs_router"]
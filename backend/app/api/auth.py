@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from datetime import timedelta
 from app.models.user import UserCreate, UserLogin, TokenResponse
 from app.services.user import user_service
 from app.auth.jwt import jwt_service
-from app.auth.dependencies import get_current_user
+from app.auth.passwords import password_hasher
+from app.auth.dependencies import get_current_user, security
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -11,20 +13,20 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 async def register(user: UserCreate):
     """Register new user"""
     # Check if user already exists
-    if user_service.get_user_by_username(user.username):
+    if await user_service.get_user_by_username(user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already exists"
         )
     
-    if user_service.get_user_by_email(user.email):
+    if await user_service.get_user_by_email(user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already exists"
         )
     
     # Create user
-    new_user = user_service.create_user(
+    new_user = await user_service.create_user(
         username=user.username,
         email=user.email,
         password=user.password,
@@ -41,9 +43,12 @@ async def register(user: UserCreate):
 @router.post("/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
     """Login user"""
-    user = user_service.get_user_by_username(credentials.username)
+    user = await user_service.get_user_by_username(credentials.username)
     
-    if not user or not user_service.verify_password(user, credentials.password):
+    if not user:
+        # Hash anyway so an unknown username takes as long as a wrong password
+        await password_hasher.verify_dummy(credentials.password)
+    if not user or not await user_service.verify_password(user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -69,14 +74,18 @@ async def login(credentials: UserLogin):
     }
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    current_user: dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     """Logout user"""
+    await jwt_service.revoke_token(credentials.credentials)
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=dict)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Get current user information"""
-    user = user_service.get_user(current_user["user_id"])
+    user = await user_service.get_user(current_user["user_id"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
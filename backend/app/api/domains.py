@@ -1,49 +1,377 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from app.models.domain import Domain, CreateDNSRecord, UpdateDNSRecord, DomainWithRecords
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Callable, List, Optional
+from pydantic import ValidationError
+from app.models.domain import Domain, CreateDNSRecord, UpdateDNSRecord, DomainWithRecords, DNSRecordBatch, DNSZoneSync
+from app.config import settings
 from app.services.domain import domain_service
 from app.services.dns import dns_service
-from app.services.namecom import namecom_service
-from app.auth.dependencies import get_current_user
+from app.services.jobs import job_queue
+from app.services.mirror import zone_mirror
+from app.services.outbox import IdempotencyKeyConflict, record_outbox
+from app.services.accounts import namecom_registry
+from app.services.namecom import NamecomService, NamecomUnavailableError, namecom_service
+from app.services.serialization import FastJSONResponse, json_response, stream_pages
+from app.services.ratelimit import upstream_key
+from app.services.team import team_service
+from app.services.zonesync import diff_records, parse_zone_file, plan_operations
+from app.auth.dependencies import get_current_user, get_current_admin_user
 
-router = APIRouter(prefix="/api/domains", tags=["domains"])
+async def get_team_id(
+    current_user: dict = Depends(get_current_user),
+    x_team_id: Optional[int] = Header(None)
+) -> Optional[int]:
+    """Get the X-Team-ID team if the current user is a member of it"""
+    if x_team_id is not None and await team_service.is_member(x_team_id, current_user["user_id"]):
+        return x_team_id
+    return None
+
+async def get_upstream_user(
+    current_user: dict = Depends(get_current_user),
+    team_id: Optional[int] = Depends(get_team_id)
+):
+    """Get current user and queue their name.com calls under their team (or themselves)"""
+    if team_id is not None:
+        upstream_key.set(f"team:{team_id}")
+    else:
+        upstream_key.set(f"user:{current_user['user_id']}")
+    return current_user
+
+async def get_namecom(team_id: Optional[int] = Depends(get_team_id)) -> NamecomService:
+    """Get the name.com client for the team's own account, or the shared one"""
+    try:
+        return await namecom_registry.for_team(team_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Error loading name.com credentials for team {team_id}: {str(e)}"
+        )
+
+router = APIRouter(prefix="/api/domains", tags=["domains"], dependencies=[Depends(get_upstream_user)])
+
+MAX_SNAPSHOT_DOMAINS = 100
+
+def _domain_summary(d: dict) -> dict:
+    """Map a name.com domain payload to Domain, in field order
+    
+    Streamed listings skip response validation, so every field is filled in.
+    """
+    namecom_id = d.get("domainId")
+    return {
+        "id": None,
+        "name": d["domainName"],
+        "namecom_id": str(namecom_id) if namecom_id is not None else None,
+        "team_id": 1,  # Should come from context
+        "created_at": None,
+        "updated_at": None
+    }
+
+def _record_summary(r: dict) -> dict:
+    """Map a name.com record payload to the API record shape"""
+    return {
+        "id": r.get("recordId"),
+        "name": r.get("name"),
+        "type": r.get("type"),
+        "content": r.get("answer"),
+        "ttl": r.get("ttl"),
+        "priority": r.get("mxPriority")
+    }
+
+def _record_detail(r: dict, domain_name: str) -> dict:
+    """Map a name.com record payload to DNSRecord, in field order"""
+    return {
+        "id": r.get("recordId"),
+        "domain": domain_name,
+        "name": r.get("name"),
+        "type": r.get("type"),
+        "content": r.get("answer"),
+        "ttl": r.get("ttl"),
+        "priority": r.get("mxPriority"),
+        "created_at": None,
+        "updated_at": None
+    }
+
+def _domain_head(domain_info: dict) -> dict:
+    """Map a name.com domain payload to DomainWithRecords, less its records"""
+    namecom_id = domain_info.get("domainId")
+    return {
+        "id": None,
+        "name": domain_info.get("domainName"),
+        "namecom_id": str(namecom_id) if namecom_id is not None else None,
+        "team_id": 1,  # Should come from context
+        "created_at": None,
+        "updated_at": None
+    }
+
+def _domain_with_records(domain_name: str, domain_info: dict, records: list) -> dict:
+    """Map name.com domain and record payloads to DomainWithRecords"""
+    return {**_domain_head(domain_info), "records": [_record_detail(r, domain_name) for r in records]}
+
+async def _stream_pages(
+    request: Request,
+    pages: AsyncIterator[List[dict]],
+    mapper: Callable[[dict], Any],
+    headers: Optional[dict] = None
+) -> StreamingResponse:
+    """Stream pages as a JSON array, or as NDJSON when the client accepts it"""
+    ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+    return await stream_pages(pages, mapper, ndjson, headers)
+
+def _read_source(namecom: NamecomService, live: bool, domain_name: Optional[str] = None):
+    """Pick the zone mirror or name.com for a read, with the headers describing it
+    
+    The mirror only holds the shared account's zones.
+    """
+    if not live and namecom is namecom_service and zone_mirror.serves(domain_name):
+        return zone_mirror, zone_mirror.freshness(domain_name)
+    return namecom, {"X-Data-Source": "live"}
+
+def _unavailable(e: NamecomUnavailableError) -> HTTPException:
+    """Fail fast with 503 while the name.com circuit breaker is open"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(max(int(e.retry_after or 0), 1))}
+    )
+
+async def _submit_changes(domain_name: str, operations: list, current_user: dict, team_id: Optional[int]) -> dict:
+    """Queue record operations as a background job"""
+    try:
+        return await job_queue.submit(
+            "dns_changes",
+            {"changes": {domain_name: operations}},
+            current_user["user_id"],
+            team_id
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating job: {str(e)}"
+        )
+
+async def _write(
+    response: Response,
+    op: str,
+    domain_name: str,
+    params: dict,
+    idempotency_key: Optional[str],
+    current_user: dict,
+    team_id: Optional[int],
+    action: str
+) -> dict:
+    """Record a write in the outbox and wait up to OUTBOX_WAIT_TIMEOUT for name.com to apply it"""
+    try:
+        entry, replayed = await record_outbox.submit(
+            op,
+            domain_name,
+            params,
+            current_user["user_id"],
+            team_id,
+            idempotency_key
+        )
+        entry = await record_outbox.wait(entry, settings.OUTBOX_WAIT_TIMEOUT)
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error {action} DNS record: {str(e)}"
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if entry["status"] == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error {action} DNS record: {entry['error']}"
+        )
+    if entry["status"] == "cancelled":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DNS record change was cancelled before it was sent"
+        )
+    return entry
+
+async def _send_batch(
+    response: Response,
+    namecom: NamecomService,
+    domain_name: str,
+    operations: List[dict],
+    current_user: dict,
+    team_id: Optional[int]
+) -> dict:
+    """Apply a batch through the outbox, so it keeps its place among single writes to the same records"""
+    try:
+        results = await record_outbox.send_batch(namecom, domain_name, operations, current_user["user_id"], team_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error applying DNS record changes: {str(e)}"
+        )
+    zone_mirror.mark_changed(domain_name)
+    failed = sum(1 for r in results if r["status"] == "error")
+    queued = sum(1 for r in results if r["status"] == "queued")
+    if queued:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return {
+        "succeeded": len(results) - failed - queued,
+        "failed": failed,
+        "queued": queued,
+        "results": results
+    }
+
+def _queued(response: Response, entry: dict) -> dict:
+    """Answer 202 Accepted for a write name.com hasn't taken yet"""
+    response.status_code = status.HTTP_202_ACCEPTED
+    response.headers["Location"] = f"/api/domains/outbox/{entry['id']}"
+    return {"message": "DNS record change queued", "outbox_id": entry["id"], "status": entry["status"]}
 
 @router.get("", response_model=List[Domain])
-async def list_domains(current_user: dict = Depends(get_current_user)):
+async def list_domains(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to stream every domain"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    live: bool = Query(False, description="Read from name.com instead of the local mirror"),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
     """List all domains"""
     try:
-        namecom_domains = namecom_service.get_domains()
-        return [{"name": d["domainName"], "namecom_id": d["domainId"]} for d in namecom_domains]
+        source, headers = _read_source(namecom, live)
+        if limit is None and cursor is None:
+            return await _stream_pages(request, source.iter_domains(), _domain_summary, headers)
+        page = await source.get_domains_page(cursor=cursor, limit=limit or 100)
+        response.headers.update(headers)
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return [_domain_summary(d) for d in page["items"]]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except NamecomUnavailableError as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching domains: {str(e)}"
         )
 
+@router.get("/cache/stats", response_model=dict)
+async def get_cache_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get name.com read cache counters"""
+    return namecom_service.cache_stats()
+
+@router.get("/upstream/stats", response_model=dict)
+async def get_upstream_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get name.com rate limiter, circuit breaker, retry and hedging counters"""
+    return namecom_service.upstream_stats()
+
+@router.get("/accounts/stats", response_model=dict)
+async def get_account_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get the per-team name.com clients and their limiter and cache counters"""
+    return namecom_registry.stats()
+
+@router.get("/mirror/stats", response_model=dict)
+async def get_mirror_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get zone mirror sync state"""
+    return zone_mirror.stats()
+
+@router.get("/outbox/stats", response_model=dict)
+async def get_outbox_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get record write outbox counts and dispatcher counters"""
+    return await record_outbox.stats()
+
+async def _get_outbox_entry(entry_id: int, current_user: dict) -> dict:
+    entry = await record_outbox.get(entry_id)
+    if entry is None or (entry["user_id"] != current_user["user_id"] and current_user.get("role") != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Outbox entry not found"
+        )
+    return {key: entry[key] for key in (
+        "id", "op", "domain_name", "params", "status", "attempts", "result",
+        "error", "merged_into", "superseded", "created_at", "delivered_at"
+    )}
+
+@router.get("/outbox/{entry_id}", response_model=dict)
+async def get_outbox_entry(entry_id: int, current_user: dict = Depends(get_current_user)):
+    """Get a queued record write and its outcome"""
+    return await _get_outbox_entry(entry_id, current_user)
+
+@router.delete("/outbox/{entry_id}", response_model=dict)
+async def cancel_outbox_entry(entry_id: int, current_user: dict = Depends(get_current_user)):
+    """Cancel a queued record write, and those merged into it, before it is sent"""
+    await _get_outbox_entry(entry_id, current_user)
+    try:
+        entry = await record_outbox.cancel(entry_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error cancelling DNS record change: {str(e)}"
+        )
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DNS record change was already sent, merged into another or cancelled"
+        )
+    return await _get_outbox_entry(entry_id, current_user)
+
+@router.get("/snapshot", response_model=dict)
+async def get_domain_snapshots(
+    names: str = Query(..., description="Comma-separated domain names"),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get details and DNS records for many domains at once"""
+    domain_names = list(dict.fromkeys(n.strip() for n in names.split(",") if n.strip()))
+    if not domain_names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one domain name is required"
+        )
+    if len(domain_names) > MAX_SNAPSHOT_DOMAINS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_SNAPSHOT_DOMAINS} domains can be requested at once"
+        )
+    
+    snapshots = await namecom.get_domain_snapshots(domain_names)
+    domains = []
+    errors = {}
+    for domain_name, snapshot in snapshots.items():
+        if isinstance(snapshot, BaseException):
+            errors[domain_name] = str(snapshot)
+            continue
+        domains.append(_domain_with_records(domain_name, snapshot["domain"], snapshot["records"]))
+    return FastJSONResponse({"domains": domains, "errors": errors})
+
 @router.get("/{domain_name}", response_model=DomainWithRecords)
-async def get_domain_details(domain_name: str, current_user: dict = Depends(get_current_user)):
+async def get_domain_details(
+    domain_name: str,
+    live: bool = Query(False, description="Read from name.com instead of the local mirror"),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
     """Get domain details with DNS records"""
     try:
-        domain_info = namecom_service.get_domain(domain_name)
-        records = namecom_service.get_dns_records(domain_name)
-        
-        return {
-            "name": domain_info.get("domainName"),
-            "namecom_id": domain_info.get("domainId"),
-            "team_id": 1,  # Should come from context
-            "records": [
-                {
-                    "id": r.get("recordId"),
-                    "domain": domain_name,
-                    "name": r.get("name"),
-                    "type": r.get("type"),
-                    "content": r.get("answer"),
-                    "ttl": r.get("ttl"),
-                    "priority": r.get("mxPriority")
-                }
-                for r in records
-            ]
-        }
+        zone_mirror.note_read(domain_name)
+        source, headers = _read_source(namecom, live, domain_name)
+        snapshot = await source.get_domain_snapshot(domain_name)
+        # Built in DomainWithRecords' shape, so it skips response validation
+        return json_response(
+            _domain_head(snapshot["domain"]),
+            "records",
+            snapshot["records"],
+            lambda r: _record_detail(r, domain_name),
+            headers
+        )
+    except NamecomUnavailableError as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,82 +382,197 @@ async def get_domain_details(domain_name: str, current_user: dict = Depends(get_
 async def create_dns_record(
     domain_name: str,
     record: CreateDNSRecord,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    team_id: Optional[int] = Depends(get_team_id),
     current_user: dict = Depends(get_current_user)
 ):
     """Create DNS record"""
+    entry = await _write(
+        response,
+        "create",
+        domain_name,
+        {
+            "name": record.name,
+            "type": record.type,
+            "content": record.content,
+            "ttl": record.ttl,
+            "priority": record.priority
+        },
+        idempotency_key,
+        current_user,
+        team_id,
+        "creating"
+    )
+    if entry["status"] != "done":
+        return _queued(response, entry)
+    return {"message": "DNS record created successfully", "record": entry["result"]}
+
+@router.post("/{domain_name}/records:batch", response_model=dict)
+async def batch_dns_records(
+    domain_name: str,
+    batch: DNSRecordBatch,
+    response: Response,
+    background: bool = Query(False, description="Queue as a job and return its ID right away"),
+    team_id: Optional[int] = Depends(get_team_id),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply a batch of DNS record creates, updates and deletes"""
+    operations = [operation.to_params() for operation in batch.operations]
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"job": await _submit_changes(domain_name, operations, current_user, team_id)}
+    
+    return await _send_batch(response, namecom, domain_name, operations, current_user, team_id)
+
+@router.get("/{domain_name}/records", response_model=List[dict])
+async def list_dns_records(
+    domain_name: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to stream every record"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    live: bool = Query(False, description="Read from name.com instead of the local mirror"),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
+    """List DNS records for domain"""
     try:
-        result = namecom_service.create_dns_record(
-            domain_name=domain_name,
-            name=record.name,
-            type=record.type,
-            content=record.content,
-            ttl=record.ttl,
-            priority=record.priority
-        )
-        return {"message": "DNS record created successfully", "record": result}
+        zone_mirror.note_read(domain_name)
+        source, headers = _read_source(namecom, live, domain_name)
+        if limit is None and cursor is None:
+            return await _stream_pages(request, source.iter_dns_records(domain_name), _record_summary, headers)
+        page = await source.get_dns_records_page(domain_name, cursor=cursor, limit=limit or 100)
+        if page["next_cursor"]:
+            headers = {**headers, "X-Next-Cursor": page["next_cursor"]}
+        return FastJSONResponse([_record_summary(r) for r in page["items"]], headers=headers)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except NamecomUnavailableError as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error creating DNS record: {str(e)}"
+            detail=f"Error fetching DNS records: {str(e)}"
         )
 
-@router.get("/{domain_name}/records", response_model=List[dict])
-async def list_dns_records(domain_name: str, current_user: dict = Depends(get_current_user)):
-    """List DNS records for domain"""
+@router.put("/{domain_name}/records", response_model=dict)
+async def sync_dns_records(
+    domain_name: str,
+    request: Request,
+    response: Response,
+    dry_run: bool = Query(False, description="Return the plan without applying it"),
+    background: bool = Query(False, description="Apply the plan as a job and return its ID right away"),
+    team_id: Optional[int] = Depends(get_team_id),
+    namecom: NamecomService = Depends(get_namecom),
+    current_user: dict = Depends(get_current_user)
+):
+    """Replace the domain's record set, applying only the changes needed
+    
+    Accepts JSON ({"records": [...]}) or a BIND zone file (text/dns or text/plain).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type in ("text/dns", "text/plain"):
+            desired = parse_zone_file((await request.body()).decode(), domain_name)
+        else:
+            desired = [r.model_dump() for r in DNSZoneSync.model_validate_json(await request.body()).records]
+    except (ValueError, ValidationError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid record set: {str(e)}"
+        )
+    
     try:
-        records = namecom_service.get_dns_records(domain_name)
-        return [
-            {
-                "id": r.get("recordId"),
-                "name": r.get("name"),
-                "type": r.get("type"),
-                "content": r.get("answer"),
-                "ttl": r.get("ttl"),
-                "priority": r.get("mxPriority")
-            }
-            for r in records
-        ]
+        current = await namecom.get_dns_records(domain_name, refresh=True)
+    except NamecomUnavailableError as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching DNS records: {str(e)}"
         )
+    
+    plan = diff_records(current, desired, domain_name)
+    result = {
+        "dry_run": dry_run,
+        "plan": plan,
+        "summary": {
+            "create": len(plan["create"]),
+            "update": len(plan["update"]),
+            "delete": len(plan["delete"]),
+            "unchanged": plan["unchanged"]
+        }
+    }
+    if dry_run:
+        return result
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+        result["job"] = await _submit_changes(domain_name, plan_operations(plan), current_user, team_id)
+        return result
+    
+    result.update(await _send_batch(response, namecom, domain_name, plan_operations(plan), current_user, team_id))
+    return result
 
 @router.put("/{domain_name}/records/{record_id}", response_model=dict)
 async def update_dns_record(
     domain_name: str,
     record_id: int,
     record_update: UpdateDNSRecord,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    team_id: Optional[int] = Depends(get_team_id),
     current_user: dict = Depends(get_current_user)
 ):
     """Update DNS record"""
-    try:
-        result = namecom_service.update_dns_record(
-            domain_name=domain_name,
-            record_id=record_id,
-            content=record_update.content,
-            ttl=record_update.ttl,
-            priority=record_update.priority
-        )
-        return {"message": "DNS record updated successfully", "record": result}
-    except Exception as e:
+    entry = await _write(
+        response,
+        "update",
+        domain_name,
+        {
+            "record_id": record_id,
+            "content": record_update.content,
+            "ttl": record_update.ttl,
+            "priority": record_update.priority
+        },
+        idempotency_key,
+        current_user,
+        team_id,
+        "updating"
+    )
+    if entry["superseded"]:
+        # A later delete of the record replaced this update before it was sent
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error updating DNS record: {str(e)}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DNS record update was superseded by a delete of the record"
         )
+    if entry["status"] != "done":
+        return _queued(response, entry)
+    return {"message": "DNS record updated successfully", "record": entry["result"]}
 
 @router.delete("/{domain_name}/records/{record_id}")
 async def delete_dns_record(
     domain_name: str,
     record_id: int,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    team_id: Optional[int] = Depends(get_team_id),
     current_user: dict = Depends(get_current_user)
 ):
     """Delete DNS record"""
-    try:
-        namecom_service.delete_dns_record(domain_name, record_id)
-        return {"message": "DNS record deleted successfully"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error deleting DNS record: {str(e)}"
-        )
+    entry = await _write(
+        response,
+        "delete",
+        domain_name,
+        {"record_id": record_id},
+        idempotency_key,
+        current_user,
+        team_id,
+        "deleting"
+    )
+    if entry["status"] != "done":
+        return _queued(response, entry)
+    return {"message": "DNS record deleted successfully"}
@@ -0,0 +1,134 @@
+import json
+from fastapi import APIRouter, HTTPException, status, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import List, Optional
+from app.config import settings
+from app.models.job import Job, DNSChangesJobCreate, TTLChangeJobCreate
+from app.services.jobs import FINISHED, job_queue
+from app.services.team import team_service
+from app.api.domains import get_team_id
+from app.auth.dependencies import get_current_user, get_current_admin_user
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+async def _get_job(job_id: str, current_user: dict) -> dict:
+    """Get a job the user started, or one of their team's"""
+    job = await job_queue.get(job_id)
+    if job is not None and (
+        job["user_id"] == current_user["user_id"]
+        or current_user.get("role") == "admin"
+        or (job["team_id"] is not None and await team_service.is_member(job["team_id"], current_user["user_id"]))
+    ):
+        return job
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Job not found"
+    )
+
+async def _submit(type: str, params: dict, current_user: dict, team_id: Optional[int]) -> dict:
+    try:
+        return await job_queue.submit(type, params, current_user["user_id"], team_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating job: {str(e)}"
+        )
+
+@router.post("/dns-changes", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def create_dns_changes_job(
+    job: DNSChangesJobCreate,
+    team_id: Optional[int] = Depends(get_team_id),
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply record creates, updates and deletes across one or more domains in the background"""
+    steps = sum(len(operations) for operations in job.changes.values())
+    if steps > settings.JOB_MAX_STEPS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Too many operations: {steps} (at most {settings.JOB_MAX_STEPS} per job)"
+        )
+    changes = {
+        domain_name: [operation.to_params() for operation in operations]
+        for domain_name, operations in job.changes.items()
+    }
+    return await _submit("dns_changes", {"changes": changes}, current_user, team_id)
+
+@router.post("/ttl", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def create_ttl_change_job(
+    job: TTLChangeJobCreate,
+    team_id: Optional[int] = Depends(get_team_id),
+    current_user: dict = Depends(get_current_user)
+):
+    """Set the TTL of every record (optionally only some types) on the given domains in the background"""
+    return await _submit("set_ttl", job.model_dump(), current_user, team_id)
+
+@router.get("", response_model=List[Job])
+async def list_jobs(
+    limit: int = Query(50, ge=1, le=500),
+    team_id: Optional[int] = Depends(get_team_id),
+    current_user: dict = Depends(get_current_user)
+):
+    """List the user's jobs and the X-Team-ID team's, newest first"""
+    try:
+        return await job_queue.list_jobs(current_user["user_id"], team_id, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching jobs: {str(e)}"
+        )
+
+@router.get("/stats", response_model=dict)
+async def get_job_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get job worker and outcome counters for this process"""
+    return job_queue.stats()
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get job status and progress"""
+    return await _get_job(job_id, current_user)
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a job; a running job stops after its current chunk"""
+    await _get_job(job_id, current_user)
+    return await job_queue.cancel(job_id)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    await _get_job(job_id, current_user)
+    
+    async def events():
+        async for job in job_queue.follow(job_id):
+            if job is None:
+                yield ": keepalive\n\n"
+                continue
+            event = "end" if job["status"] in FINISHED else "progress"
+            yield f"event: {event}\ndata: {json.dumps(jsonable_encoder(job))}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/{job_id}/ws")
+async def stream_job_websocket(websocket: WebSocket, job_id: str, token: str = Query(...)):
+    """Stream job progress over a WebSocket; browsers can't set headers there, so the JWT comes as ?token="""
+    try:
+        current_user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+        await _get_job(job_id, current_user)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    try:
+        async for job in job_queue.follow(job_id):
+            if job is not None:
+                await websocket.send_json(jsonable_encoder(job))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
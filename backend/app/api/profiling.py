@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from app.services.profiling import request_profiler
+from app.auth.dependencies import get_current_admin_user
+
+router = APIRouter(prefix="/api/profiling", tags=["profiling"])
+
+@router.get("/slow", response_model=dict)
+async def list_slow_requests(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Get the slowest recent requests with their time breakdown"""
+    return {"stats": request_profiler.stats(), "items": request_profiler.slowest(limit)}
+
+@router.get("/recent", response_model=dict)
+async def list_recent_profiles(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Get recently requested or sampled profiles"""
+    return {"stats": request_profiler.stats(), "items": request_profiler.latest(limit)}
+
+@router.get("/traces/{trace_id}", response_model=dict)
+async def get_trace(trace_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Get a kept request trace with its wall-clock profile"""
+    trace = request_profiler.get(trace_id)
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trace not found"
+        )
+    return trace
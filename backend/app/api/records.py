@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import Literal, Optional
+from app.services.search import record_index
+from app.services.team import team_service
+from app.auth.dependencies import get_current_user, get_current_admin_user
+
+router = APIRouter(prefix="/api/records", tags=["records"])
+
+@router.get("/search", response_model=dict)
+async def search_records(
+    q: Optional[str] = Query(None, min_length=1, max_length=255, description="Text to look for in record names and content"),
+    match: Literal["substring", "prefix", "exact"] = Query("substring"),
+    field: Literal["any", "name", "content"] = Query("any"),
+    type: Optional[str] = Query(None, description="Comma-separated record types"),
+    cidr: Optional[str] = Query(None, description="A/AAAA records inside this network, e.g. 203.0.113.0/24"),
+    domain: Optional[str] = Query(None),
+    ttl_min: Optional[int] = Query(None, ge=0),
+    ttl_max: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Search DNS records across the domains of the user's teams (every domain for admins)"""
+    try:
+        teams = None
+        if current_user.get("role") != "admin":
+            teams = {team["id"] for team in await team_service.get_user_teams(current_user["user_id"])}
+        await record_index.ready()
+        return record_index.search(
+            q=q,
+            match=match,
+            field=field,
+            types=[t.strip() for t in type.split(",") if t.strip()] if type else None,
+            cidr=cidr,
+            domain=domain,
+            ttl_min=ttl_min,
+            ttl_max=ttl_max,
+            limit=limit,
+            cursor=cursor,
+            teams=teams
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching DNS records: {str(e)}"
+        )
+
+@router.get("/index/stats", response_model=dict)
+async def get_index_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Get record search index size and build time"""
+    return record_index.stats()
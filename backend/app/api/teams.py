@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from app.models.team import Team, TeamCreate, TeamUpdate, TeamDetail
 from app.services.team import team_service
+from app.services.outbox import record_outbox
 from app.services.user import user_service
 from app.auth.dependencies import get_current_user
 
@@ -10,7 +11,7 @@ router = APIRouter(prefix="/api/teams", tags=["teams"])
 @router.post("", response_model=Team)
 async def create_team(team: TeamCreate, current_user: dict = Depends(get_current_user)):
     """Create new team"""
-    new_team = team_service.create_team(
+    new_team = await team_service.create_team(
         name=team.name,
         owner_id=current_user["user_id"],
         description=team.description
@@ -27,13 +28,13 @@ async def create_team(team: TeamCreate, current_user: dict = Depends(get_current
 @router.get("", response_model=List[Team])
 async def get_user_teams(current_user: dict = Depends(get_current_user)):
     """Get all teams for current user"""
-    teams = team_service.get_user_teams(current_user["user_id"])
+    teams = await team_service.get_user_teams(current_user["user_id"])
     return teams
 
 @router.get("/{team_id}", response_model=TeamDetail)
 async def get_team(team_id: int, current_user: dict = Depends(get_current_user)):
     """Get team details"""
-    team = team_service.get_team(team_id)
+    team = await team_service.get_team(team_id)
     
     if not team:
         raise HTTPException(
@@ -41,7 +42,7 @@ async def get_team(team_id: int, current_user: dict = Depends(get_current_user))
             detail="Team not found"
         )
     
-    members = team_service.get_team_members(team_id)
+    members = await team_service.get_team_members(team_id)
     
     return {
         "id": team["id"],
@@ -56,7 +57,7 @@ async def get_team(team_id: int, current_user: dict = Depends(get_current_user))
 @router.put("/{team_id}", response_model=Team)
 async def update_team(team_id: int, team_update: TeamUpdate, current_user: dict = Depends(get_current_user)):
     """Update team"""
-    team = team_service.get_team(team_id)
+    team = await team_service.get_team(team_id)
     
     if not team:
         raise HTTPException(
@@ -70,18 +71,21 @@ async def update_team(team_id: int, team_update: TeamUpdate, current_user: dict
             detail="Only team owner can update team"
         )
     
-    updated_team = team_service.update_team(
+    updated_team = await team_service.update_team(
         team_id,
         name=team_update.name,
-        description=team_update.description
+        description=team_update.description,
+        write_coalesce_window=team_update.write_coalesce_window
     )
+    if team_update.write_coalesce_window is not None:
+        record_outbox.forget_team(team_id)
     
     return updated_team
 
 @router.delete("/{team_id}")
 async def delete_team(team_id: int, current_user: dict = Depends(get_current_user)):
     """Delete team"""
-    team = team_service.get_team(team_id)
+    team = await team_service.get_team(team_id)
     
     if not team:
         raise HTTPException(
@@ -95,13 +99,13 @@ async def delete_team(team_id: int, current_user: dict = Depends(get_current_use
             detail="Only team owner can delete team"
         )
     
-    team_service.delete_team(team_id)
+    await team_service.delete_team(team_id)
     return {"message": "Team deleted successfully"}
 
 @router.post("/{team_id}/members/{user_id}")
 async def add_team_member(team_id: int, user_id: int, role: str = "member", current_user: dict = Depends(get_current_user)):
     """Add member to team"""
-    team = team_service.get_team(team_id)
+    team = await team_service.get_team(team_id)
     
     if not team:
         raise HTTPException(
@@ -115,20 +119,20 @@ async def add_team_member(team_id: int, user_id: int, role: str = "member", curr
             detail="Only team owner can add members"
         )
     
-    user = user_service.get_user(user_id)
+    user = await user_service.get_user(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    member = team_service.add_member(team_id, user_id, role)
+    member = await team_service.add_member(team_id, user_id, role)
     return {"message": "Member added successfully", "member": member}
 
 @router.delete("/{team_id}/members/{user_id}")
 async def remove_team_member(team_id: int, user_id: int, current_user: dict = Depends(get_current_user)):
     """Remove member from team"""
-    team = team_service.get_team(team_id)
+    team = await team_service.get_team(team_id)
     
     if not team:
         raise HTTPException(
@@ -142,5 +146,5 @@ async def remove_team_member(team_id: int, user_id: int, current_user: dict = De
             detail="Only team owner can remove members"
         )
     
-    team_service.remove_member(team_id, user_id)
+    await team_service.remove_member(team_id, user_id)
     return {"message": "Member removed successfully"}
@@ -1,9 +1,33 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import logging
+import time
 import jwt
+from sqlalchemy import delete, select
 from app.config import settings
+from app.db import async_session
+from app.db.tables import RevokedTokenRow
+from app.services.cache import TTLCache
+from app.services.metrics import jwt_latency
+from app.services.profiling import record_span
+
+logger = logging.getLogger(__name__)
+
+# Revocations committed this long before a poll are still picked up by it
+POLL_OVERLAP = 60
 
 class JWTService:
+    def __init__(self):
+        # Verified payloads and revoked tokens, keyed by token digest
+        self._verified = TTLCache(max_entries=settings.JWT_CACHE_SIZE)
+        self._revoked = TTLCache(max_entries=settings.JWT_REVOCATION_SIZE)
+        # Revocations are stored in the database and copied into _revoked by polling
+        self._polled_at: Optional[datetime] = None
+        self._next_poll = 0.0
+        self._poll_lock = asyncio.Lock()
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
@@ -39,5 +63,96 @@ class JWTService:
             raise Exception("Token has expired")
         except jwt.InvalidTokenError:
             raise Exception("Invalid token")
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    @staticmethod
+    def _seconds_left(payload: dict) -> float:
+        exp = payload.get("exp")
+        return exp - time.time() if exp is not None else settings.JWT_CACHE_TTL
+    
+    async def _poll_revocations(self):
+        """Copy revocations made since the last poll (by any process) into _revoked"""
+        if time.monotonic() < self._next_poll:
+            return
+        async with self._poll_lock:
+            if time.monotonic() < self._next_poll:
+                return
+            self._next_poll = time.monotonic() + settings.JWT_REVOCATION_POLL_INTERVAL
+            now = datetime.now()
+            query = select(RevokedTokenRow.digest, RevokedTokenRow.expires_at).where(RevokedTokenRow.expires_at > now)
+            if self._polled_at is not None:
+                query = query.where(RevokedTokenRow.created_at >= self._polled_at - timedelta(seconds=POLL_OVERLAP))
+            try:
+                async with async_session() as session:
+                    rows = (await session.execute(query)).all()
+            except Exception as e:
+                logger.warning("Polling token revocations failed: %s", e)
+                return
+            for digest, expires_at in rows:
+                self._revoked.set(bytes.fromhex(digest), True, (expires_at - now).total_seconds())
+                self._verified.invalidate(bytes.fromhex(digest))
+            self._polled_at = now
+    
+    async def get_verified_user(self, token: str) -> dict:
+        """Verify a token and get its current-user dict, reusing earlier verifications
+        
+        Cached entries live until the token's exp (capped at JWT_CACHE_TTL),
+        and revoked tokens are rejected before the cache is consulted. Tokens
+        revoked by another process are seen within JWT_REVOCATION_POLL_INTERVAL.
+        """
+        started = time.perf_counter()
+        result = "invalid"
+        try:
+            await self._poll_revocations()
+            digest = self._digest(token)
+            if self._revoked.get(digest) is not None:
+                result = "revoked"
+                raise Exception("Token has been revoked")
+            
+            user = self._verified.get(digest)
+            if user is not None:
+                self._verified.hits += 1
+                result = "cache_hit"
+                # A copy, so a caller changing it can't change the cached one
+                return dict(user)
+            self._verified.misses += 1
+            
+            payload = self.verify_token(token)
+            user_id = payload.get("sub")
+            if user_id is None:
+                raise Exception("Invalid token")
+            user = {"user_id": int(user_id), **payload}
+            self._verified.set(digest, user, min(self._seconds_left(payload), settings.JWT_CACHE_TTL))
+            result = "verified"
+            return dict(user)
+        finally:
+            elapsed = time.perf_counter() - started
+            jwt_latency.labels(result).observe(elapsed)
+            record_span("jwt", elapsed)
+    
+    def cache_stats(self) -> dict:
+        """Get verified-token cache counters"""
+        return self._verified.stats()
+    
+    async def revoke_token(self, token: str):
+        """Reject a token from now until it expires, in every process"""
+        digest = self._digest(token)
+        self._verified.invalidate(digest)
+        try:
+            payload = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return
+        seconds_left = self._seconds_left(payload)
+        self._revoked.set(digest, True, seconds_left)
+        now = datetime.now()
+        async with async_session() as session:
+            if await session.get(RevokedTokenRow, digest.hex()) is None:
+                session.add(RevokedTokenRow(digest=digest.hex(), expires_at=now + timedelta(seconds=seconds_left)))
+            # Expired tokens are rejected anyway; drop their rows
+            await session.execute(delete(RevokedTokenRow).where(RevokedTokenRow.expires_at <= now))
+            await session.commit()
 
 jwt_service = JWTService()
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from app.config import settings
+
+class PasswordHasher:
+    """scrypt password hashing run in a bounded thread pool, off the event loop
+    
+    Hashes are stored as "scrypt$n$r$p$salt$hash". Unsalted SHA-256 hex
+    digests from before are still accepted and reported as needing a rehash.
+    """
+    
+    def __init__(
+        self,
+        n: Optional[int] = None,
+        r: Optional[int] = None,
+        p: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.n = n or settings.PASSWORD_SCRYPT_N
+        self.r = r or settings.PASSWORD_SCRYPT_R
+        self.p = p or settings.PASSWORD_SCRYPT_P
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dummy_hash: Optional[str] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+    
+    def shutdown(self):
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        # hashlib.scrypt releases the GIL, so pool threads hash in parallel
+        return hashlib.scrypt(
+            password.encode(),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r + 1024 * 1024,
+            dklen=32
+        )
+    
+    def hash_sync(self, password: str) -> str:
+        """Hash a password in the calling thread"""
+        salt = os.urandom(16)
+        digest = self._scrypt(password, salt, self.n, self.r, self.p)
+        return "$".join([
+            "scrypt",
+            str(self.n),
+            str(self.r),
+            str(self.p),
+            base64.b64encode(salt).decode(),
+            base64.b64encode(digest).decode()
+        ])
+    
+    def verify_sync(self, stored: str, password: str) -> Tuple[bool, bool]:
+        """Check a password in the calling thread; returns (matches, needs_rehash)"""
+        if stored.startswith("scrypt$"):
+            try:
+                _, n, r, p, salt, digest = stored.split("$")
+                n, r, p = int(n), int(r), int(p)
+                expected = base64.b64decode(digest)
+                actual = self._scrypt(password, base64.b64decode(salt), n, r, p)
+            except ValueError:
+                return False, False
+            matches = hmac.compare_digest(actual, expected)
+            return matches, matches and (n, r, p) != (self.n, self.r, self.p)
+        
+        # Legacy unsalted SHA-256
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        matches = hmac.compare_digest(legacy, stored)
+        return matches, matches
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.hash_sync, password)
+    
+    async def verify(self, stored: str, password: str) -> Tuple[bool, bool]:
+        """Check a password in the worker pool; returns (matches, needs_rehash)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.verify_sync, stored, password)
+    
+    async def verify_dummy(self, password: str) -> bool:
+        """Check a password against a throwaway hash, taking as long as verify(); always False
+        
+        Used when there is no such user, so response times don't reveal which usernames exist.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(base64.b64encode(os.urandom(16)).decode())
+        await self.verify(self._dummy_hash, password)
+        return False
+
+password_hasher = PasswordHasher()
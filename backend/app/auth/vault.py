@@ -1,18 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
 import hvac
 from app.config import settings
+from app.services.metrics import secret_path, vault_latency
+from app.services.profiling import record_span
 import json
 
+logger = logging.getLogger(__name__)
+
+class CachedSecret:
+    """Last known good value of a Vault secret and when it needs refreshing"""
+    
+    def __init__(self, data: dict, version: Optional[int], ttl: float):
+        self.data = data
+        self.version = version
+        self.fetched_at = time.monotonic()
+        self.expires_at = self.fetched_at + ttl
+        # Refresh once two thirds of the lease has passed
+        self.refresh_at = self.fetched_at + ttl * 2 / 3
+        self.last_error: Optional[str] = None
+    
+    def usable(self, now: float) -> bool:
+        """Fresh, or expired for no longer than the staleness bound"""
+        return now < self.expires_at + settings.VAULT_MAX_STALENESS
+
 class VaultService:
     def __init__(self):
         self.client = hvac.Client(url=settings.VAULT_ADDR, token=settings.VAULT_TOKEN)
+        self._secrets: Dict[str, CachedSecret] = {}
+        # path -> the read in progress, shared by everyone waiting on it
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = {}
+        self._refresher: Optional[asyncio.Task] = None
+    
+    def _read_secret(self, path: str) -> CachedSecret:
+        """Read a KV v2 secret from Vault (blocking)"""
+        response = self.client.secrets.kv.read_secret_version(path=path)
+        metadata = response['data'].get('metadata') or {}
+        ttl = response.get('lease_duration') or settings.VAULT_SECRET_TTL
+        return CachedSecret(response['data']['data'], metadata.get('version'), ttl)
+    
+    async def _fetch(self, path: str) -> CachedSecret:
+        """Read a secret off the event loop and store it, notifying listeners on a new version"""
+        previous = self._secrets.get(path)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            secret = await asyncio.to_thread(self._read_secret, path)
+            outcome = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            vault_latency.labels(secret_path(path), outcome).observe(elapsed)
+            record_span("vault", elapsed)
+        if self._inflight.get(path) is not asyncio.current_task():
+            # Invalidated during the read; don't keep what was read before the change
+            return secret
+        self._secrets[path] = secret
+        if previous is not None and (previous.version != secret.version or previous.data != secret.data):
+            for listener in self._listeners.get(path, []):
+                try:
+                    listener(secret.data)
+                except Exception:
+                    logger.exception("Vault secret listener for %s failed", path)
+        return secret
+    
+    async def _fetch_once(self, path: str) -> CachedSecret:
+        """Fetch a secret, with one Vault read no matter how many callers ask at once"""
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._load(path))
+            # Retrieve failures even if every waiter went away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[path] = task
+        # One caller going away must not cancel the read for the others
+        return await asyncio.shield(task)
+    
+    async def _load(self, path: str) -> CachedSecret:
+        try:
+            return await self._fetch(path)
+        finally:
+            if self._inflight.get(path) is asyncio.current_task():
+                del self._inflight[path]
+    
+    async def get_secret(self, path: str) -> dict:
+        """Get a secret from the cache, reading Vault only when there is no usable value"""
+        now = time.monotonic()
+        secret = self._secrets.get(path)
+        if secret is not None and now < secret.expires_at:
+            return secret.data
+        # Past expiry the background refresh is already retrying; don't wait on Vault here
+        if secret is not None and self._refreshing() and secret.usable(now):
+            return secret.data
+        try:
+            return (await self._fetch_once(path)).data
+        except Exception as e:
+            if secret is not None and secret.usable(now):
+                secret.last_error = str(e)
+                logger.warning("Serving stale Vault secret %s: %s", path, e)
+                return secret.data
+            raise
+    
+    def subscribe(self, path: str, listener: Callable[[dict], None]):
+        """Call listener(data) whenever the secret at path changes"""
+        self._listeners.setdefault(path, []).append(listener)
+    
+    def invalidate(self, path: str):
+        """Forget a cached secret and detach any read in progress"""
+        self._secrets.pop(path, None)
+        self._inflight.pop(path, None)
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.VAULT_REFRESH_INTERVAL)
+            now = time.monotonic()
+            for path, secret in list(self._secrets.items()):
+                if now < secret.refresh_at:
+                    continue
+                try:
+                    await self._fetch_once(path)
+                except Exception as e:
+                    # Keep serving the last good value until the staleness bound
+                    secret.last_error = str(e)
+                    logger.warning("Refreshing Vault secret %s failed: %s", path, e)
+    
+    def _refreshing(self) -> bool:
+        return self._refresher is not None and not self._refresher.done()
     
-    def get_namecom_credentials(self) -> dict:
+    def start(self):
+        """Start refreshing cached secrets in the background before they expire"""
+        if not self._refreshing():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self):
+        """Stop the background refresh"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+    
+    async def check_token(self):
+        """Check Vault is reachable and the token is still valid"""
+        await asyncio.to_thread(self.client.auth.token.lookup_self)
+    
+    def cache_status(self) -> dict:
+        """Get age, version and last refresh error of each cached secret"""
+        now = time.monotonic()
+        return {
+            path: {
+                "version": secret.version,
+                "age": round(now - secret.fetched_at, 3),
+                "expires_in": round(secret.expires_at - now, 3),
+                "last_error": secret.last_error
+            }
+            for path, secret in self._secrets.items()
+        }
+    
+    async def get_namecom_credentials(self) -> dict:
         """Retrieve name.com credentials from Vault"""
         try:
-            response = self.client.secrets.kv.read_secret_version(
-                path=settings.VAULT_SECRET_PATH
-            )
-            return response['data']['data']
+            return await self.get_secret(settings.VAULT_SECRET_PATH)
         except Exception as e:
             raise Exception(f"Error retrieving credentials from Vault: {str(e)}")
     
@@ -24,15 +175,15 @@ class VaultService:
                 path=path,
                 secret_dict={"token": token}
             )
+            self.invalidate(path)
         except Exception as e:
             raise Exception(f"Error storing token in Vault: {str(e)}")
     
-    def get_user_token(self, user_id: int) -> str:
+    async def get_user_token(self, user_id: int) -> str:
         """Retrieve user JWT token from Vault"""
         try:
             path = f"secret/data/users/{user_id}/token"
-            response = self.client.secrets.kv.read_secret_version(path=path)
-            return response['data']['data']['token']
+            return (await self.get_secret(path))['token']
         except Exception as e:
             raise Exception(f"Error retrieving token from Vault: {str(e)}")
     
@@ -41,6 +192,7 @@ class VaultService:
         try:
             path = f"secret/data/users/{user_id}/token"
             self.client.secrets.kv.delete_secret_version(path=path)
+            self.invalidate(path)
         except Exception as e:
             raise Exception(f"Error revoking token in Vault: {str(e)}")
 
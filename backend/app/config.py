@@ -8,11 +8,87 @@ class Settings:
     VAULT_ADDR: str = os.getenv("VAULT_ADDR", "http://localhost:8200")
     VAULT_TOKEN: str = os.getenv("VAULT_TOKEN", "")
     VAULT_SECRET_PATH: str = os.getenv("VAULT_SECRET_PATH", "secret/data/namecom")
+    VAULT_SECRET_TTL: float = float(os.getenv("VAULT_SECRET_TTL", 300))
+    VAULT_REFRESH_INTERVAL: float = float(os.getenv("VAULT_REFRESH_INTERVAL", 15))
+    VAULT_MAX_STALENESS: float = float(os.getenv("VAULT_MAX_STALENESS", 600))
     
     # name.com API Configuration
+    NAMECOM_BASE_URL: str = os.getenv("NAMECOM_BASE_URL", "https://api.name.com/v4")
     NAMECOM_API_KEY: str = os.getenv("NAMECOM_API_KEY", "")
     NAMECOM_API_TOKEN: str = os.getenv("NAMECOM_API_TOKEN", "")
     NAMECOM_USERNAME: str = os.getenv("NAMECOM_USERNAME", "")
+    NAMECOM_POOL_SIZE: int = int(os.getenv("NAMECOM_POOL_SIZE", 20))
+    NAMECOM_CONNECT_TIMEOUT: float = float(os.getenv("NAMECOM_CONNECT_TIMEOUT", 5))
+    NAMECOM_READ_TIMEOUT: float = float(os.getenv("NAMECOM_READ_TIMEOUT", 15))
+    NAMECOM_HTTP2: bool = os.getenv("NAMECOM_HTTP2", "True").lower() == "true"
+    NAMECOM_RATE_LIMIT: float = float(os.getenv("NAMECOM_RATE_LIMIT", 20))
+    NAMECOM_RATE_BURST: int = int(os.getenv("NAMECOM_RATE_BURST", 20))
+    NAMECOM_MIN_CONCURRENCY: int = int(os.getenv("NAMECOM_MIN_CONCURRENCY", 1))
+    NAMECOM_MAX_CONCURRENCY: int = int(os.getenv("NAMECOM_MAX_CONCURRENCY", 0))  # 0 = pool size
+    NAMECOM_FANOUT_CONCURRENCY: int = int(os.getenv("NAMECOM_FANOUT_CONCURRENCY", 10))
+    NAMECOM_PAGE_SIZE: int = int(os.getenv("NAMECOM_PAGE_SIZE", 1000))
+    NAMECOM_CACHE_MAX_ENTRIES: int = int(os.getenv("NAMECOM_CACHE_MAX_ENTRIES", 2048))
+    NAMECOM_CACHE_TTL_DOMAINS: float = float(os.getenv("NAMECOM_CACHE_TTL_DOMAINS", 60))
+    NAMECOM_CACHE_TTL_DOMAIN: float = float(os.getenv("NAMECOM_CACHE_TTL_DOMAIN", 300))
+    NAMECOM_CACHE_TTL_RECORDS: float = float(os.getenv("NAMECOM_CACHE_TTL_RECORDS", 30))
+    NAMECOM_CACHE_STALE_TTL: float = float(os.getenv("NAMECOM_CACHE_STALE_TTL", 3600))
+    NAMECOM_RETRY_ATTEMPTS: int = int(os.getenv("NAMECOM_RETRY_ATTEMPTS", 3))
+    NAMECOM_RETRY_BASE_DELAY: float = float(os.getenv("NAMECOM_RETRY_BASE_DELAY", 0.2))
+    NAMECOM_RETRY_MAX_DELAY: float = float(os.getenv("NAMECOM_RETRY_MAX_DELAY", 5))
+    NAMECOM_BREAKER_THRESHOLD: int = int(os.getenv("NAMECOM_BREAKER_THRESHOLD", 5))
+    NAMECOM_BREAKER_RESET: float = float(os.getenv("NAMECOM_BREAKER_RESET", 30))
+    NAMECOM_HEDGE_GETS: bool = os.getenv("NAMECOM_HEDGE_GETS", "False").lower() == "true"
+    NAMECOM_HEDGE_PERCENTILE: float = float(os.getenv("NAMECOM_HEDGE_PERCENTILE", 95))
+    NAMECOM_TEAM_SECRET_PATH: str = os.getenv("NAMECOM_TEAM_SECRET_PATH", "secret/data/teams/{team_id}/namecom")
+    NAMECOM_ACCOUNT_CACHE_TTL: float = float(os.getenv("NAMECOM_ACCOUNT_CACHE_TTL", 60))
+    NAMECOM_CLIENT_IDLE_TTL: float = float(os.getenv("NAMECOM_CLIENT_IDLE_TTL", 900))
+    NAMECOM_MAX_CLIENTS: int = int(os.getenv("NAMECOM_MAX_CLIENTS", 100))
+    
+    # Zone Mirror Configuration
+    ZONE_MIRROR_ENABLED: bool = os.getenv("ZONE_MIRROR_ENABLED", "True").lower() == "true"
+    ZONE_MIRROR_INTERVAL: float = float(os.getenv("ZONE_MIRROR_INTERVAL", 5))
+    ZONE_MIRROR_LIST_INTERVAL: float = float(os.getenv("ZONE_MIRROR_LIST_INTERVAL", 300))
+    ZONE_MIRROR_MAX_AGE: float = float(os.getenv("ZONE_MIRROR_MAX_AGE", 900))
+    ZONE_MIRROR_HOT_AGE: float = float(os.getenv("ZONE_MIRROR_HOT_AGE", 60))
+    ZONE_MIRROR_BATCH: int = int(os.getenv("ZONE_MIRROR_BATCH", 10))
+    ZONE_MIRROR_TEAM_ID: int = int(os.getenv("ZONE_MIRROR_TEAM_ID", 1))
+    ZONE_MIRROR_LEASE_TTL: float = float(os.getenv("ZONE_MIRROR_LEASE_TTL", 60))
+    
+    # Health Check Configuration
+    HEALTH_PROBE_INTERVAL: float = float(os.getenv("HEALTH_PROBE_INTERVAL", 10))
+    HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", 3))
+    HEALTH_MAX_STALENESS: float = float(os.getenv("HEALTH_MAX_STALENESS", 30))
+    HEALTH_NAMECOM_REQUIRED: bool = os.getenv("HEALTH_NAMECOM_REQUIRED", "True").lower() == "true"
+    
+    # Profiling Configuration
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_SAMPLE_INTERVAL: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+    PROFILE_MAX_ACTIVE: int = int(os.getenv("PROFILE_MAX_ACTIVE", 4))
+    PROFILE_SLOW_THRESHOLD: float = float(os.getenv("PROFILE_SLOW_THRESHOLD", 1))
+    PROFILE_SLOW_LOG_SIZE: int = int(os.getenv("PROFILE_SLOW_LOG_SIZE", 50))
+    PROFILE_RECENT_SIZE: int = int(os.getenv("PROFILE_RECENT_SIZE", 50))
+    
+    # Job Queue Configuration
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 4))
+    JOB_TEAM_CONCURRENCY: int = int(os.getenv("JOB_TEAM_CONCURRENCY", 2))
+    JOB_CHUNK_SIZE: int = int(os.getenv("JOB_CHUNK_SIZE", 50))
+    JOB_MAX_STEPS: int = int(os.getenv("JOB_MAX_STEPS", 100000))
+    JOB_MAX_FAILURES: int = int(os.getenv("JOB_MAX_FAILURES", 100))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", 5))
+    JOB_STALE_AFTER: float = float(os.getenv("JOB_STALE_AFTER", 60))
+    JOB_EVENT_KEEPALIVE: float = float(os.getenv("JOB_EVENT_KEEPALIVE", 15))
+    JOB_BREAKER_MAX_WAIT: float = float(os.getenv("JOB_BREAKER_MAX_WAIT", 600))
+    
+    # Record Write Outbox Configuration
+    OUTBOX_WAIT_TIMEOUT: float = float(os.getenv("OUTBOX_WAIT_TIMEOUT", 10))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", 1))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+    OUTBOX_RETRY_BASE_DELAY: float = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", 1))
+    OUTBOX_RETRY_MAX_DELAY: float = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", 60))
+    OUTBOX_STALE_AFTER: float = float(os.getenv("OUTBOX_STALE_AFTER", 60))
+    OUTBOX_RETENTION: float = float(os.getenv("OUTBOX_RETENTION", 86400))
+    OUTBOX_COALESCE_WINDOW: float = float(os.getenv("OUTBOX_COALESCE_WINDOW", 0))
     
     # FastAPI Configuration
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
@@ -21,10 +97,24 @@ class Settings:
     
     # Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_ECHO: bool = os.getenv("DB_ECHO", "False").lower() == "true"
+    DB_AUTO_CREATE: bool = os.getenv("DB_AUTO_CREATE", "True").lower() == "true"
     
     # JWT Configuration
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    PASSWORD_SCRYPT_N: int = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))
+    PASSWORD_SCRYPT_R: int = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+    PASSWORD_SCRYPT_P: int = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 0))  # 0 = min(4, CPUs)
+    JWT_CACHE_SIZE: int = int(os.getenv("JWT_CACHE_SIZE", 10000))
+    JWT_CACHE_TTL: float = float(os.getenv("JWT_CACHE_TTL", 300))
+    JWT_REVOCATION_SIZE: int = int(os.getenv("JWT_REVOCATION_SIZE", 100000))
+    JWT_REVOCATION_POLL_INTERVAL: float = float(os.getenv("JWT_REVOCATION_POLL_INTERVAL", 5))
 
 settings = Settings()
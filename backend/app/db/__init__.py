@@ -0,0 +1,11 @@
+"""Database module"""
+from .session import Base, engine, async_session, init_db, ping_db, close_db
+
+__all__ = [
+    "Base",
+    "engine",
+    "async_session",
+    "init_db",
+    "ping_db",
+    "close_db",
+]
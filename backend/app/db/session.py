@@ -0,0 +1,55 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from app.config import settings
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Map a plain DATABASE_URL onto its async driver"""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        scheme = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": settings.DB_ECHO}
+    if not url.startswith("sqlite"):
+        options.update({
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        })
+    return options
+
+class Base(DeclarativeBase):
+    pass
+
+DATABASE_URL = async_database_url(settings.DATABASE_URL)
+
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def init_db():
+    """Create missing tables when DB_AUTO_CREATE is set (use Alembic otherwise)"""
+    if not settings.DB_AUTO_CREATE:
+        return
+    from app.db import tables  # noqa: F401 - register tables on Base.metadata
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def ping_db():
+    """Check a pooled connection can run a query"""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def close_db():
+    """Close pooled database connections"""
+    await engine.dispose()
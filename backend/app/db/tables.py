@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import JSON, Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.session import Base
+
+class UserRow(Base):
+    __tablename__ = "users"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    username: Mapped[str] = mapped_column(String(150), unique=True, index=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    password: Mapped[str] = mapped_column(String(255))
+    full_name: Mapped[Optional[str]] = mapped_column(String(255))
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class TeamRow(Base):
+    __tablename__ = "teams"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    # Seconds record writes are held so later ones to the same record can be merged in; None uses the default
+    write_coalesce_window: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class TeamMemberRow(Base):
+    __tablename__ = "team_members"
+    __table_args__ = (
+        # Serves team -> members and (team, user) lookups; user_id index serves user -> teams
+        UniqueConstraint("team_id", "user_id", name="uq_team_members_team_user"),
+    )
+
+    member_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    team_id: Mapped[int] = mapped_column(ForeignKey("teams.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    role: Mapped[str] = mapped_column(String(50), default="member")
+    joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+class DomainRow(Base):
+    __tablename__ = "domains"
+    __table_args__ = (
+        # Team listings filter on team_id and page on id
+        Index("ix_domains_team_id_id", "team_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(253), unique=True, index=True)
+    namecom_id: Mapped[Optional[str]] = mapped_column(String(64))
+    team_id: Mapped[int] = mapped_column(Integer)
+    # When the zone mirror last copied this domain's records from name.com
+    synced_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class DNSRecordRow(Base):
+    __tablename__ = "dns_records"
+    __table_args__ = (
+        # Zone listings filter on domain_id and page on id
+        Index("ix_dns_records_domain_id_id", "domain_id", "id"),
+        Index("ix_dns_records_domain_id_name_type", "domain_id", "name", "type"),
+        Index("ix_dns_records_domain_id_namecom_id", "domain_id", "namecom_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    domain_id: Mapped[int] = mapped_column(ForeignKey("domains.id", ondelete="CASCADE"))
+    namecom_id: Mapped[Optional[int]] = mapped_column(Integer)
+    domain_name: Mapped[str] = mapped_column(String(253))
+    name: Mapped[str] = mapped_column(String(253))
+    type: Mapped[str] = mapped_column(String(16))
+    content: Mapped[str] = mapped_column(Text)
+    ttl: Mapped[int] = mapped_column(Integer, default=3600)
+    priority: Mapped[Optional[int]] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class JobRow(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers pick up queued and orphaned jobs oldest first
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_jobs_team_id_created_at", "team_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    type: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default="queued")
+    user_id: Mapped[int] = mapped_column(Integer)
+    team_id: Mapped[Optional[int]] = mapped_column(Integer)
+    # Request and planned steps can be large, so they are only loaded by the worker
+    params: Mapped[dict] = mapped_column(JSON, deferred=True)
+    steps: Mapped[Optional[list]] = mapped_column(JSON, deferred=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    # Steps done; a resumed job starts here
+    checkpoint: Mapped[int] = mapped_column(Integer, default=0)
+    succeeded: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    failures: Mapped[list] = mapped_column(JSON, default=list)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Process running the job, and when it last said so
+    owner: Mapped[Optional[str]] = mapped_column(String(128))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class OutboxRow(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Keys are scoped to the user sending them
+        UniqueConstraint("user_id", "idempotency_key", name="uq_outbox_user_id_idempotency_key"),
+        # The dispatcher drains pending entries in order
+        Index("ix_outbox_status_id", "status", "id"),
+        # Finds earlier unfinished writes to the same record
+        Index("ix_outbox_record_key_id", "record_key", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(255))
+    # Hash of the mutation, to refuse a key reused for a different one
+    request_hash: Mapped[str] = mapped_column(String(64))
+    user_id: Mapped[int] = mapped_column(Integer)
+    team_id: Mapped[Optional[int]] = mapped_column(Integer)
+    domain_name: Mapped[str] = mapped_column(String(253))
+    op: Mapped[str] = mapped_column(String(16))
+    params: Mapped[dict] = mapped_column(JSON)
+    # "domain/record_id" for updates and deletes; a record's writes are sent one at a time, in order
+    record_key: Mapped[Optional[str]] = mapped_column(String(300))
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    # Counted before each send, so a count above one means it may have landed before
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # Refreshed while the send is in flight; a stale one means its process died
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    result: Mapped[Optional[dict]] = mapped_column(JSON)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    error_status: Mapped[Optional[int]] = mapped_column(Integer)
+    # The held entry this one was merged into; it takes that entry's outcome
+    merged_into: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    # An update a later delete of the record replaced before it was sent
+    superseded: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+class RevokedTokenRow(Base):
+    __tablename__ = "revoked_tokens"
+
+    # SHA-256 of the token, hex
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # The token's own exp; the row can go once it passes
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    # Processes poll for revocations newer than the last ones they saw
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
+
+class LeaseRow(Base):
+    __tablename__ = "leases"
+
+    # What the lease is for, e.g. "zone_mirror"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(128))
+    # Anyone may take the lease over once this passes without a renewal
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
+
+def row_to_dict(row) -> dict:
+    """Get a row as the plain dict the services return"""
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
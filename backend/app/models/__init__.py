@@ -1,6 +1,7 @@
 from .user import User, UserCreate, UserLogin, TokenResponse
 from .team import Team, TeamCreate, TeamUpdate
 from .domain import Domain, DNSRecord, DomainWithRecords
+from .job import Job
 
 __all__ = [
     "User",
@@ -13,4 +14,5 @@ __all__ = [
     "Domain",
     "DNSRecord",
     "DomainWithRecords",
+    "Job",
 ]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class DNSRecord(BaseModel):
@@ -41,3 +41,47 @@ class UpdateDNSRecord(BaseModel):
     content: Optional[str] = None
     ttl: Optional[int] = None
     priority: Optional[int] = None
+
+class DNSRecordOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    record_id: Optional[int] = None
+    name: Optional[str] = None
+    type: Optional[str] = None
+    content: Optional[str] = None
+    ttl: Optional[int] = None
+    priority: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op == "create" and not (self.name is not None and self.type and self.content):
+            raise ValueError("create requires name, type and content")
+        if self.op in ("update", "delete") and self.record_id is None:
+            raise ValueError(f"{self.op} requires record_id")
+        return self
+
+    def to_params(self) -> dict:
+        """Get the NamecomService arguments for this operation"""
+        if self.op == "create":
+            return {
+                "op": self.op,
+                "name": self.name,
+                "type": self.type,
+                "content": self.content,
+                "ttl": self.ttl or 3600,
+                "priority": self.priority
+            }
+        if self.op == "update":
+            return {
+                "op": self.op,
+                "record_id": self.record_id,
+                "content": self.content,
+                "ttl": self.ttl,
+                "priority": self.priority
+            }
+        return {"op": self.op, "record_id": self.record_id}
+
+class DNSRecordBatch(BaseModel):
+    operations: List[DNSRecordOperation] = Field(..., min_length=1, max_length=1000)
+
+class DNSZoneSync(BaseModel):
+    records: List[CreateDNSRecord]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from datetime import datetime
+from .domain import DNSRecordOperation
+
+class Job(BaseModel):
+    id: str
+    type: str
+    status: str
+    user_id: int
+    team_id: Optional[int] = None
+    total: int = 0
+    checkpoint: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    failures: List[dict] = []
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DNSChangesJobCreate(BaseModel):
+    changes: Dict[str, List[DNSRecordOperation]] = Field(..., min_length=1)
+
+class TTLChangeJobCreate(BaseModel):
+    domains: List[str] = Field(..., min_length=1, max_length=1000)
+    ttl: int = Field(..., ge=300)
+    types: Optional[List[str]] = None
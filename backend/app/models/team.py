@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -7,6 +7,7 @@ class Team(BaseModel):
     name: str
     description: Optional[str] = None
     owner_id: int
+    write_coalesce_window: Optional[float] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -20,6 +21,8 @@ class TeamCreate(BaseModel):
 class TeamUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    # Seconds to hold record writes so later ones to the same record are merged in; 0 turns it off
+    write_coalesce_window: Optional[float] = Field(None, ge=0, le=300)
 
 class TeamMember(BaseModel):
     user_id: int
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from hvac.exceptions import InvalidPath
+from app.config import settings
+from app.auth.vault import vault_service
+from app.services.cache import TTLCache
+from app.services.namecom import NamecomService, namecom_service
+
+# Cached mapping for teams that use the shared account
+_SHARED = ("", None)
+
+# Seconds after a handout during which a client is never closed: its caller
+# may not have reached the rate limiter yet, so it doesn't look busy
+HANDOUT_GRACE = 30.0
+
+class _Account:
+    """One name.com account's client and when it was last used"""
+    
+    def __init__(self, service: NamecomService):
+        self.service = service
+        self.last_used = time.monotonic()
+        self.teams = set()
+
+class NamecomRegistry:
+    """name.com clients per account, for teams that bring their own
+    
+    A team's credentials are read from Vault at NAMECOM_TEAM_SECRET_PATH
+    ({"api_token", "username"}, optionally "rate_limit" and "rate_burst").
+    Teams without that secret use the shared client. Each account gets its
+    own NamecomService, so its own connection pool, rate limiter, circuit
+    breaker and cache, and one reseller's traffic never queues behind
+    another's. Clients idle for NAMECOM_CLIENT_IDLE_TTL are closed, never
+    while busy or within HANDOUT_GRACE of being handed out.
+    """
+    
+    def __init__(self, default: NamecomService):
+        self.default = default
+        self._accounts: "OrderedDict[str, _Account]" = OrderedDict()
+        # team_id -> (account key, credentials), or _SHARED
+        self._teams = TTLCache(max_entries=settings.NAMECOM_MAX_CLIENTS * 100)
+        self._subscribed = set()
+        self._swept_at = time.monotonic()
+        # Handouts and sweeps take turns, so a sweep never closes a client being handed out
+        self._lock = asyncio.Lock()
+        self.created = 0
+        self.evicted = 0
+    
+    @staticmethod
+    def _account_key(credentials: dict) -> str:
+        """Teams sharing an account share its client"""
+        if credentials.get("username"):
+            return f"user:{credentials['username']}"
+        return "token:" + hashlib.sha256(credentials["api_token"].encode()).hexdigest()[:16]
+    
+    async def _load_team(self, team_id: int) -> Tuple[str, Optional[dict]]:
+        path = settings.NAMECOM_TEAM_SECRET_PATH.format(team_id=team_id)
+        try:
+            credentials = await vault_service.get_secret(path)
+        except InvalidPath:
+            return _SHARED
+        if not credentials.get("api_token"):
+            return _SHARED
+        if path not in self._subscribed:
+            self._subscribed.add(path)
+            vault_service.subscribe(path, lambda data: self._rotated(team_id, data))
+        return self._account_key(credentials), credentials
+    
+    def _rotated(self, team_id: int, credentials: dict):
+        """Apply rotated credentials to the live client and re-resolve the team"""
+        self._teams.invalidate(team_id)
+        account = self._accounts.get(self._account_key(credentials)) if credentials.get("api_token") else None
+        if account is not None:
+            account.service.set_credentials(credentials["api_token"], credentials.get("username"))
+    
+    async def for_team(self, team_id: Optional[int]) -> NamecomService:
+        """Get the client for a team's own account, or the shared one
+        
+        Raises if Vault can't say whether the team has its own account, rather
+        than sending the team's calls through the shared account.
+        """
+        if team_id is None or not settings.VAULT_TOKEN:
+            return self.default
+        key, credentials = await self._teams.get_or_load(
+            team_id,
+            lambda: self._load_team(team_id),
+            settings.NAMECOM_ACCOUNT_CACHE_TTL
+        )
+        if not key:
+            return self.default
+        
+        async with self._lock:
+            account = self._accounts.get(key)
+            if account is None:
+                account = self._accounts[key] = _Account(NamecomService(
+                    api_token=credentials["api_token"],
+                    username=credentials.get("username"),
+                    rate_limit=float(credentials["rate_limit"]) if credentials.get("rate_limit") else None,
+                    rate_burst=int(credentials["rate_burst"]) if credentials.get("rate_burst") else None
+                ))
+                self.created += 1
+            account.last_used = time.monotonic()
+            account.teams.add(team_id)
+            self._accounts.move_to_end(key)
+            closing = self._sweep()
+        for service in closing:
+            await service.close()
+        return account.service
+    
+    @staticmethod
+    def _busy(service: NamecomService) -> bool:
+        stats = service.limiter.stats()
+        return stats["in_flight"] > 0 or stats["queue_depth"] > 0
+    
+    def _sweep(self) -> List[NamecomService]:
+        """Drop idle clients, and the least recently used ones past NAMECOM_MAX_CLIENTS; returns them to close
+        
+        Clients that are busy or were handed out within HANDOUT_GRACE are
+        kept, even if that leaves more than NAMECOM_MAX_CLIENTS for a while.
+        """
+        now = time.monotonic()
+        if len(self._accounts) <= settings.NAMECOM_MAX_CLIENTS and now - self._swept_at < settings.NAMECOM_CLIENT_IDLE_TTL / 10:
+            return []
+        self._swept_at = now
+        excess = len(self._accounts) - settings.NAMECOM_MAX_CLIENTS
+        closing = []
+        for key, account in list(self._accounts.items()):
+            idle = now - account.last_used >= settings.NAMECOM_CLIENT_IDLE_TTL
+            if not (idle or excess > 0):
+                continue
+            if now - account.last_used < HANDOUT_GRACE or self._busy(account.service):
+                continue
+            del self._accounts[key]
+            excess -= 1
+            self.evicted += 1
+            closing.append(account.service)
+        return closing
+    
+    async def close(self):
+        """Close every per-account client (the shared one is closed separately)"""
+        accounts = list(self._accounts.values())
+        self._accounts.clear()
+        for account in accounts:
+            await account.service.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get each account's teams, idle time and limiter, circuit breaker and cache counters"""
+        now = time.monotonic()
+        return {
+            "accounts": len(self._accounts),
+            "created": self.created,
+            "evicted": self.evicted,
+            "clients": {
+                key: {
+                    "teams": sorted(account.teams),
+                    "idle_seconds": round(now - account.last_used, 3),
+                    "limiter": account.service.limiter_stats(),
+                    "breaker": account.service.breaker.stats(),
+                    "cache": account.service.cache_stats()
+                }
+                for key, account in self._accounts.items()
+            }
+        }
+
+namecom_registry = NamecomRegistry(namecom_service)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and single-flight loading
+    
+    Expired entries are kept for another `stale_ttl` seconds so callers can
+    fall back to them with get_stale() when a reload fails.
+    """
+    
+    def __init__(self, max_entries: int = 1024, stale_ttl: float = 0):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry[0] <= now:
+            if entry[0] + self.stale_ttl <= now:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Get an entry even if expired, as long as it is within the stale window"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + self.stale_ttl <= time.monotonic():
+            return None
+        self.stale_hits += 1
+        return entry[1]
+    
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Store a value for ttl seconds, evicting the least recently used entries"""
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """Drop an entry and detach any in-flight load for it"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+    
+    def update(self, key: Hashable, patch: Callable[[Any], Any]):
+        """Replace a live entry with patch(value), keeping its expiry"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self.invalidate(key)
+            return
+        self._inflight.pop(key, None)
+        self._entries[key] = (entry[0], patch(entry[1]))
+    
+    def clear(self):
+        """Drop every entry"""
+        for key in list(self._entries) + list(self._inflight):
+            self.invalidate(key)
+    
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """Return a cached value, or load it once no matter how many callers ask"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            # Retrieve failures even if every waiter went away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # One caller disconnecting must not cancel the load for the others
+        return await asyncio.shield(task)
+    
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        try:
+            value = await loader()
+            # A write during the load detached it (see invalidate); don't keep a stale result
+            if self._inflight.get(key) is asyncio.current_task():
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+    
+    def stats(self) -> dict:
+        """Get hit, miss and eviction counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
@@ -1,14 +1,12 @@
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, Optional, List
+from sqlalchemy import select
+from app.db import async_session
+from app.db.tables import DNSRecordRow, row_to_dict
 
 class DNSService:
     """Service for managing DNS records"""
     
-    def __init__(self):
-        self.records = {}  # In-memory storage for demo
-        self.counter = 1
-    
-    def create_record(
+    async def create_record(
         self,
         domain_id: int,
         domain_name: str,
@@ -19,31 +17,119 @@ class DNSService:
         priority: Optional[int] = None
     ):
         """Create DNS record"""
-        record = {
-            "id": self.counter,
-            "domain_id": domain_id,
-            "domain_name": domain_name,
-            "name": name,
-            "type": type,
-            "content": content,
-            "ttl": ttl,
-            "priority": priority,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        self.records[self.counter] = record
-        self.counter += 1
-        return record
+        record = DNSRecordRow(
+            domain_id=domain_id,
+            domain_name=domain_name,
+            name=name,
+            type=type,
+            content=content,
+            ttl=ttl,
+            priority=priority
+        )
+        async with async_session() as session:
+            session.add(record)
+            await session.commit()
+        return row_to_dict(record)
     
-    def get_record(self, record_id: int):
+    async def get_record(self, record_id: int):
         """Get record by ID"""
-        return self.records.get(record_id)
+        async with async_session() as session:
+            record = await session.get(DNSRecordRow, record_id)
+        return row_to_dict(record) if record else None
     
-    def get_domain_records(self, domain_id: int) -> list:
+    async def get_domain_records(self, domain_id: int) -> list:
         """Get all records for a domain"""
-        return [r for r in self.records.values() if r["domain_id"] == domain_id]
+        async with async_session() as session:
+            records = await session.scalars(
+                select(DNSRecordRow).where(DNSRecordRow.domain_id == domain_id).order_by(DNSRecordRow.id)
+            )
+            return [row_to_dict(r) for r in records]
+    
+    async def list_domain_records(self, domain_id: int, limit: int = 100, cursor: Optional[int] = None) -> dict:
+        """Get one page of a domain's records, ordered by ID
+        
+        Pass the returned next_cursor back as cursor to get the following page.
+        """
+        query = select(DNSRecordRow).where(DNSRecordRow.domain_id == domain_id)
+        if cursor is not None:
+            query = query.where(DNSRecordRow.id > cursor)
+        async with async_session() as session:
+            records = list(await session.scalars(query.order_by(DNSRecordRow.id).limit(limit + 1)))
+        has_more = len(records) > limit
+        records = records[:limit]
+        return {
+            "items": [row_to_dict(r) for r in records],
+            "next_cursor": records[-1].id if has_more else None
+        }
+    
+    async def list_records(self, limit: int = 1000, cursor: Optional[int] = None) -> dict:
+        """Get one page of every domain's records, ordered by ID"""
+        query = select(DNSRecordRow)
+        if cursor is not None:
+            query = query.where(DNSRecordRow.id > cursor)
+        async with async_session() as session:
+            records = list(await session.scalars(query.order_by(DNSRecordRow.id).limit(limit + 1)))
+        has_more = len(records) > limit
+        records = records[:limit]
+        return {
+            "items": [row_to_dict(r) for r in records],
+            "next_cursor": records[-1].id if has_more else None
+        }
+    
+    async def find_records(self, domain_id: int, name: str, type: Optional[str] = None) -> List:
+        """Get a domain's records by name, and type if given"""
+        query = select(DNSRecordRow).where(
+            DNSRecordRow.domain_id == domain_id,
+            DNSRecordRow.name == name
+        )
+        if type:
+            query = query.where(DNSRecordRow.type == type)
+        async with async_session() as session:
+            records = await session.scalars(query.order_by(DNSRecordRow.id))
+            return [row_to_dict(r) for r in records]
+    
+    async def sync_domain_records(self, domain_id: int, domain_name: str, records: List[Dict[str, Any]]) -> dict:
+        """Make a domain's stored records match name.com's, matched on name.com record ID
+        
+        Only rows that changed are written. Returns created/updated/deleted counts.
+        """
+        counts = {"created": 0, "updated": 0, "deleted": 0}
+        async with async_session() as session:
+            existing = {}
+            stale = []
+            for row in await session.scalars(select(DNSRecordRow).where(DNSRecordRow.domain_id == domain_id)):
+                if row.namecom_id is None or row.namecom_id in existing:
+                    stale.append(row)
+                else:
+                    existing[row.namecom_id] = row
+            for record in records:
+                values = {
+                    "name": record.get("name", record.get("host")) or "",
+                    "type": record.get("type") or "",
+                    "content": record.get("answer", record.get("content")) or "",
+                    "ttl": record.get("ttl") or 3600,
+                    "priority": record.get("priority", record.get("mxPriority"))
+                }
+                row = existing.pop(record.get("recordId", record.get("id")), None)
+                if row is None:
+                    session.add(DNSRecordRow(
+                        domain_id=domain_id,
+                        domain_name=domain_name,
+                        namecom_id=record.get("recordId", record.get("id")),
+                        **values
+                    ))
+                    counts["created"] += 1
+                elif any(getattr(row, key) != value for key, value in values.items()):
+                    for key, value in values.items():
+                        setattr(row, key, value)
+                    counts["updated"] += 1
+            for row in stale + list(existing.values()):
+                await session.delete(row)
+                counts["deleted"] += 1
+            await session.commit()
+        return counts
     
-    def update_record(
+    async def update_record(
         self,
         record_id: int,
         content: Optional[str] = None,
@@ -51,22 +137,27 @@ class DNSService:
         priority: Optional[int] = None
     ):
         """Update DNS record"""
-        if record_id in self.records:
+        async with async_session() as session:
+            record = await session.get(DNSRecordRow, record_id)
+            if not record:
+                return None
             if content:
-                self.records[record_id]["content"] = content
+                record.content = content
             if ttl:
-                self.records[record_id]["ttl"] = ttl
+                record.ttl = ttl
             if priority is not None:
-                self.records[record_id]["priority"] = priority
-            self.records[record_id]["updated_at"] = datetime.now()
-            return self.records[record_id]
-        return None
+                record.priority = priority
+            await session.commit()
+            return row_to_dict(record)
     
-    def delete_record(self, record_id: int):
+    async def delete_record(self, record_id: int):
         """Delete DNS record"""
-        if record_id in self.records:
-            del self.records[record_id]
+        async with async_session() as session:
+            record = await session.get(DNSRecordRow, record_id)
+            if not record:
+                return False
+            await session.delete(record)
+            await session.commit()
             return True
-        return False
 
 dns_service = DNSService()
@@ -1,49 +1,109 @@
-from typing import Optional, List
 from datetime import datetime
+from typing import Dict, Optional, List
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.db import async_session
+from app.db.tables import DomainRow, row_to_dict
 
 class DomainService:
     """Service for managing domains"""
     
-    def __init__(self):
-        self.domains = {}  # In-memory storage for demo, replace with DB
-        self.counter = 1
-    
-    def create_domain(self, name: str, team_id: int, namecom_id: Optional[str] = None):
+    async def create_domain(self, name: str, team_id: int, namecom_id: Optional[str] = None):
         """Create domain record"""
-        domain = {
-            "id": self.counter,
-            "name": name,
-            "namecom_id": namecom_id,
-            "team_id": team_id,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        self.domains[self.counter] = domain
-        self.counter += 1
-        return domain
+        domain = DomainRow(name=name, namecom_id=namecom_id, team_id=team_id)
+        async with async_session() as session:
+            session.add(domain)
+            await session.commit()
+        return row_to_dict(domain)
+    
+    async def get_or_create_domain(self, name: str, team_id: int, namecom_id: Optional[str] = None):
+        """Get a domain by name, creating it if there is none"""
+        domain = await self.get_domain_by_name(name)
+        if domain is not None:
+            return domain
+        try:
+            return await self.create_domain(name, team_id, namecom_id)
+        except IntegrityError:
+            # Created by another process since the lookup
+            return await self.get_domain_by_name(name)
     
-    def get_domain(self, domain_id: int):
+    async def get_domain(self, domain_id: int):
         """Get domain by ID"""
-        return self.domains.get(domain_id)
+        async with async_session() as session:
+            domain = await session.get(DomainRow, domain_id)
+        return row_to_dict(domain) if domain else None
+    
+    async def get_domain_by_name(self, name: str):
+        """Get domain by name"""
+        async with async_session() as session:
+            domain = (await session.execute(select(DomainRow).where(DomainRow.name == name))).scalar_one_or_none()
+        return row_to_dict(domain) if domain else None
+    
+    async def get_domain_teams(self) -> Dict[int, int]:
+        """Get every domain's team ID, by domain ID"""
+        async with async_session() as session:
+            return dict((await session.execute(select(DomainRow.id, DomainRow.team_id))).all())
     
-    def get_team_domains(self, team_id: int) -> List:
+    async def get_synced_domains(self) -> List:
+        """Get every domain the zone mirror has copied from name.com"""
+        async with async_session() as session:
+            domains = await session.scalars(
+                select(DomainRow).where(DomainRow.synced_at.is_not(None)).order_by(DomainRow.id)
+            )
+            return [row_to_dict(d) for d in domains]
+    
+    async def mark_synced(self, domain_id: int, synced_at: Optional[datetime]):
+        """Record when the zone mirror last copied a domain (None: no longer mirrored)"""
+        async with async_session() as session:
+            domain = await session.get(DomainRow, domain_id)
+            if domain:
+                domain.synced_at = synced_at
+                await session.commit()
+    
+    async def get_team_domains(self, team_id: int) -> List:
         """Get all domains for a team"""
-        return [d for d in self.domains.values() if d["team_id"] == team_id]
+        async with async_session() as session:
+            domains = await session.scalars(
+                select(DomainRow).where(DomainRow.team_id == team_id).order_by(DomainRow.id)
+            )
+            return [row_to_dict(d) for d in domains]
+    
+    async def list_team_domains(self, team_id: int, limit: int = 100, cursor: Optional[int] = None) -> dict:
+        """Get one page of a team's domains, ordered by ID
+        
+        Pass the returned next_cursor back as cursor to get the following page.
+        """
+        query = select(DomainRow).where(DomainRow.team_id == team_id)
+        if cursor is not None:
+            query = query.where(DomainRow.id > cursor)
+        async with async_session() as session:
+            domains = list(await session.scalars(query.order_by(DomainRow.id).limit(limit + 1)))
+        has_more = len(domains) > limit
+        domains = domains[:limit]
+        return {
+            "items": [row_to_dict(d) for d in domains],
+            "next_cursor": domains[-1].id if has_more else None
+        }
     
-    def update_domain(self, domain_id: int, name: Optional[str] = None):
+    async def update_domain(self, domain_id: int, name: Optional[str] = None):
         """Update domain"""
-        if domain_id in self.domains:
+        async with async_session() as session:
+            domain = await session.get(DomainRow, domain_id)
+            if not domain:
+                return None
             if name:
-                self.domains[domain_id]["name"] = name
-            self.domains[domain_id]["updated_at"] = datetime.now()
-            return self.domains[domain_id]
-        return None
+                domain.name = name
+            await session.commit()
+            return row_to_dict(domain)
     
-    def delete_domain(self, domain_id: int):
+    async def delete_domain(self, domain_id: int):
         """Delete domain"""
-        if domain_id in self.domains:
-            del self.domains[domain_id]
+        async with async_session() as session:
+            domain = await session.get(DomainRow, domain_id)
+            if not domain:
+                return False
+            await session.delete(domain)
+            await session.commit()
             return True
-        return False
 
 domain_service = DomainService()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class _Probe:
+    """A dependency check and its last result"""
+    
+    def __init__(self, check: Callable[[], Awaitable], required: bool):
+        self.check = check
+        self.required = required
+        self.ok = False
+        self.latency: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.failures = 0
+
+class HealthMonitor:
+    """Dependency probes run in the background, so readiness checks never call upstream
+    
+    Every HEALTH_PROBE_INTERVAL seconds each registered check is awaited
+    (bounded by HEALTH_PROBE_TIMEOUT) and its outcome and latency stored.
+    readiness() only reads those results; a result older than
+    HEALTH_MAX_STALENESS counts as failing, so a wedged prober can't keep
+    a pod marked ready.
+    """
+    
+    def __init__(self):
+        self._probes: Dict[str, _Probe] = {}
+        self._worker: Optional[asyncio.Task] = None
+    
+    def register(self, name: str, check: Callable[[], Awaitable], required: bool = True):
+        """Probe check() in the background; failures of required checks make the service not ready"""
+        self._probes[name] = _Probe(check, required)
+    
+    async def _run_probe(self, name: str, probe: _Probe):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(probe.check(), settings.HEALTH_PROBE_TIMEOUT)
+            probe.ok = True
+            probe.error = None
+            probe.failures = 0
+        except Exception as e:
+            if probe.ok:
+                logger.warning("Health check %s failing: %s", name, e)
+            probe.ok = False
+            probe.error = str(e) or type(e).__name__
+            probe.failures += 1
+        probe.latency = time.monotonic() - started
+        probe.checked_at = time.monotonic()
+    
+    async def probe_all(self):
+        """Run every check once, concurrently"""
+        await asyncio.gather(*(self._run_probe(name, probe) for name, probe in self._probes.items()))
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception:
+                logger.exception("Health probes failed")
+            await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL)
+    
+    def start(self):
+        """Start probing in the background"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop probing"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    def readiness(self, names: Optional[Iterable[str]] = None) -> dict:
+        """Get the cached status, latency and age of the named dependencies (all of them for None)"""
+        now = time.monotonic()
+        ready = True
+        dependencies = {}
+        names = self._probes if names is None else names
+        for name in names:
+            probe = self._probes[name]
+            age = now - probe.checked_at if probe.checked_at is not None else None
+            if age is None:
+                status = "pending"
+            elif age > settings.HEALTH_MAX_STALENESS:
+                status = "stale"
+            else:
+                status = "ok" if probe.ok else "failing"
+            if status != "ok" and probe.required:
+                ready = False
+            dependencies[name] = {
+                "status": status,
+                "required": probe.required,
+                "latency_ms": round(probe.latency * 1000, 2) if probe.latency is not None else None,
+                "checked_seconds_ago": round(age, 3) if age is not None else None,
+                "consecutive_failures": probe.failures,
+                "error": probe.error
+            }
+        return {"status": "ready" if ready else "not_ready", "dependencies": dependencies}
+
+health_monitor = HealthMonitor()
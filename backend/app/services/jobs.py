@@ -0,0 +1,535 @@
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import undefer
+from app.config import settings
+from app.db import async_session
+from app.db.tables import JobRow
+from app.services.accounts import namecom_registry
+from app.services.mirror import zone_mirror
+from app.services.namecom import NamecomService
+from app.services.ratelimit import upstream_key
+from app.services.zonesync import normalize_record
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("completed", "failed", "cancelled")
+
+# Columns kept out of API responses
+_INTERNAL = {"params", "steps", "owner", "heartbeat_at"}
+
+# Marks the jobs this process is running
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+class OwnershipLost(Exception):
+    """Another process took a job over after this one missed its heartbeats"""
+
+Planner = Callable[[Dict[str, Any], NamecomService], Awaitable[List[Dict[str, Any]]]]
+
+def _job_dict(row: JobRow) -> Dict[str, Any]:
+    return {
+        column.key: getattr(row, column.key)
+        for column in row.__table__.columns
+        if column.key not in _INTERNAL
+    }
+
+def _queue_key(team_id: Optional[int], user_id: int) -> str:
+    """Jobs are capped per team, or per user outside a team"""
+    return f"team:{team_id}" if team_id is not None else f"user:{user_id}"
+
+async def plan_dns_changes(params: Dict[str, Any], namecom: NamecomService) -> List[Dict[str, Any]]:
+    """One step per record operation, domain by domain"""
+    return [
+        {"domain": domain_name, "op": operation}
+        for domain_name, operations in params["changes"].items()
+        for operation in operations
+    ]
+
+async def plan_ttl_change(params: Dict[str, Any], namecom: NamecomService) -> List[Dict[str, Any]]:
+    """One update per matching record that doesn't have the TTL yet"""
+    types = {type.upper() for type in params.get("types") or []}
+    steps = []
+    for domain_name in params["domains"]:
+        for record in await namecom.get_dns_records(domain_name, refresh=True):
+            r = normalize_record(record, domain_name)
+            if r["id"] is None or r["ttl"] == params["ttl"] or (types and r["type"] not in types):
+                continue
+            steps.append({
+                "domain": domain_name,
+                "op": {"op": "update", "record_id": r["id"], "ttl": params["ttl"]}
+            })
+    return steps
+
+class JobQueue:
+    """Persistent background jobs for bulk DNS record changes
+    
+    A job is planned once into steps (one record operation each) that are
+    stored with it, then applied in chunks of up to JOB_CHUNK_SIZE operations
+    on one domain. The checkpoint is saved after every chunk, so a job
+    interrupted by a shutdown or crash resumes where it stopped, in whichever
+    process claims it next. Each process runs JOB_WORKERS jobs at once, at
+    most JOB_TEAM_CONCURRENCY of them per team, and queues their name.com
+    calls under a key of their own so bulk work shares the rate limit fairly
+    with the team's interactive requests.
+    """
+    
+    def __init__(self):
+        self._planners: Dict[str, Planner] = {}
+        # Jobs that may be claimable, job_id -> queue key
+        self._candidates: "OrderedDict[str, str]" = OrderedDict()
+        self._running: Dict[str, str] = {}
+        self._per_key: Dict[str, int] = {}
+        self._cancelling: Set[str] = set()
+        # Running jobs whose heartbeat found another owner
+        self._lost: Set[str] = set()
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._poller: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.resumed = 0
+    
+    def register(self, type: str, planner: Planner):
+        """Add a job type, planned into steps by await planner(params, namecom)"""
+        self._planners[type] = planner
+    
+    async def submit(self, type: str, params: Dict[str, Any], user_id: int, team_id: Optional[int] = None) -> Dict[str, Any]:
+        """Store a job and queue it; returns right away"""
+        if type not in self._planners:
+            raise ValueError(f"Unknown job type: {type}")
+        row = JobRow(
+            id=uuid.uuid4().hex,
+            type=type,
+            status="queued",
+            user_id=user_id,
+            team_id=team_id,
+            params=params,
+            total=0,
+            checkpoint=0,
+            succeeded=0,
+            failed=0,
+            failures=[],
+            cancel_requested=False
+        )
+        async with async_session() as session:
+            session.add(row)
+            await session.commit()
+        self._offer(row.id, _queue_key(team_id, user_id))
+        return _job_dict(row)
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status and progress"""
+        async with async_session() as session:
+            row = await session.get(JobRow, job_id)
+        return _job_dict(row) if row else None
+    
+    async def list_jobs(self, user_id: int, team_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get a user's jobs and their team's, newest first"""
+        condition = JobRow.user_id == user_id
+        if team_id is not None:
+            condition = or_(condition, JobRow.team_id == team_id)
+        async with async_session() as session:
+            rows = await session.scalars(
+                select(JobRow).where(condition).order_by(JobRow.created_at.desc()).limit(limit)
+            )
+            return [_job_dict(row) for row in rows]
+    
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job now, or a running one after its current chunk"""
+        async with async_session() as session:
+            await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job_id, JobRow.status == "queued")
+                .values(status="cancelled", cancel_requested=True, finished_at=datetime.now())
+            )
+            await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job_id, JobRow.status == "running")
+                .values(cancel_requested=True)
+            )
+            await session.commit()
+        self._candidates.pop(job_id, None)
+        if job_id in self._running:
+            self._cancelling.add(job_id)
+        job = await self.get(job_id)
+        if job is not None:
+            self._publish(job)
+        return job
+    
+    async def follow(self, job_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the job now and after every change until it finishes
+        
+        Yields None when nothing changed for a while, for callers to send a
+        keepalive. Jobs running in another process are followed by polling.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._listeners.setdefault(job_id, set()).add(queue)
+        try:
+            job = await self.get(job_id)
+            last = None
+            while job is not None:
+                if job == last:
+                    yield None
+                # Older states may have been published while the first read was in flight
+                elif last is None or job["updated_at"] >= last["updated_at"]:
+                    yield job
+                    last = job
+                    if job["status"] in FINISHED:
+                        return
+                timeout = settings.JOB_EVENT_KEEPALIVE if job_id in self._running else 1.0
+                try:
+                    job = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    job = await self.get(job_id)
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[job_id]
+    
+    def _publish(self, job: Dict[str, Any]):
+        """Hand listeners the latest state, replacing any they haven't read yet"""
+        for queue in self._listeners.get(job["id"], ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(job)
+    
+    def _offer(self, job_id: str, key: str):
+        if job_id not in self._running:
+            self._candidates.setdefault(job_id, key)
+        if self._wake is not None:
+            self._wake.set()
+    
+    def _next(self) -> Optional[str]:
+        """Take the oldest candidate whose team is under its concurrency cap"""
+        for job_id, key in self._candidates.items():
+            if self._per_key.get(key, 0) < settings.JOB_TEAM_CONCURRENCY:
+                del self._candidates[job_id]
+                self._running[job_id] = key
+                self._per_key[key] = self._per_key.get(key, 0) + 1
+                return job_id
+        return None
+    
+    async def _work(self):
+        while True:
+            job_id = self._next()
+            if job_id is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job %s failed", job_id)
+            finally:
+                key = self._running.pop(job_id)
+                self._per_key[key] -= 1
+                if not self._per_key[key]:
+                    del self._per_key[key]
+                self._cancelling.discard(job_id)
+                # A team slot opened up
+                self._wake.set()
+    
+    async def _poll(self):
+        """Pick up queued jobs, and running ones whose process stopped heartbeating"""
+        while True:
+            try:
+                stale = datetime.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+                async with async_session() as session:
+                    rows = await session.execute(
+                        select(JobRow.id, JobRow.team_id, JobRow.user_id)
+                        .where(or_(
+                            JobRow.status == "queued",
+                            and_(JobRow.status == "running", JobRow.heartbeat_at < stale)
+                        ))
+                        .order_by(JobRow.created_at)
+                        .limit(settings.JOB_WORKERS * 10)
+                    )
+                    for job_id, team_id, user_id in rows:
+                        self._offer(job_id, _queue_key(team_id, user_id))
+            except Exception:
+                logger.exception("Polling for jobs failed")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+    
+    async def _claim(self, job_id: str) -> Optional[JobRow]:
+        """Take ownership of a job unless it finished or another process has it"""
+        now = datetime.now()
+        stale = now - timedelta(seconds=settings.JOB_STALE_AFTER)
+        async with async_session() as session:
+            result = await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job_id)
+                .where(or_(
+                    JobRow.status == "queued",
+                    and_(JobRow.status == "running", JobRow.heartbeat_at < stale)
+                ))
+                .values(
+                    status="running",
+                    owner=_OWNER,
+                    heartbeat_at=now,
+                    started_at=func.coalesce(JobRow.started_at, now)
+                )
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                return None
+            return await session.scalar(
+                select(JobRow).options(undefer(JobRow.params), undefer(JobRow.steps)).where(JobRow.id == job_id)
+            )
+    
+    async def _save(self, job_id: str, **values) -> JobRow:
+        """Update a job this process owns and get it back; raises OwnershipLost if it no longer does"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job_id, JobRow.owner == _OWNER)
+                .values(heartbeat_at=datetime.now(), **values)
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                raise OwnershipLost(f"Job {job_id} is owned by another process")
+            row = await session.get(JobRow, job_id)
+        self._publish(_job_dict(row))
+        return row
+    
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(settings.JOB_STALE_AFTER / 3)
+            try:
+                async with async_session() as session:
+                    result = await session.execute(
+                        update(JobRow)
+                        .where(JobRow.id == job_id, JobRow.owner == _OWNER)
+                        .values(heartbeat_at=datetime.now())
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.warning("Job %s heartbeat failed: %s", job_id, e)
+                continue
+            if result.rowcount != 1:
+                # _execute stops before its next chunk
+                self._lost.add(job_id)
+                return
+    
+    async def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        await self._save(job_id, status=status, error=error, owner=None, finished_at=datetime.now())
+        if status == "completed":
+            self.completed += 1
+        elif status == "failed":
+            self.failed += 1
+        else:
+            self.cancelled += 1
+    
+    async def _release(self, job_id: str):
+        """Hand a job back to the queue at its checkpoint"""
+        async with async_session() as session:
+            await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job_id, JobRow.owner == _OWNER, JobRow.status == "running")
+                .values(status="queued", owner=None)
+            )
+            await session.commit()
+    
+    async def _run(self, job_id: str):
+        row = await self._claim(job_id)
+        if row is None:
+            return
+        # Bulk calls queue apart from the team's interactive ones
+        upstream_key.set(f"job:{self._running[job_id]}")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await self._execute(row)
+        except OwnershipLost:
+            # The new owner resumes from the last checkpoint; don't touch the job
+            logger.warning("Job %s was taken over by another process; stopping", job_id)
+        except asyncio.CancelledError:
+            # Shutting down; another start picks the job up at its checkpoint
+            await self._release(job_id)
+            raise
+        except Exception as e:
+            logger.warning("Job %s failed: %s", job_id, e)
+            await self._finish(job_id, "failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+            self._lost.discard(job_id)
+    
+    async def _execute(self, row: JobRow):
+        job_id = row.id
+        namecom = await namecom_registry.for_team(row.team_id)
+        steps = row.steps
+        resumed = steps is not None
+        if resumed:
+            self.resumed += 1
+        else:
+            steps = await self._planners[row.type](row.params, namecom)
+            row = await self._save(job_id, steps=steps, total=len(steps))
+        
+        position = row.checkpoint
+        succeeded, failed = row.succeeded, row.failed
+        failures = list(row.failures or [])
+        while position < len(steps):
+            if job_id in self._lost:
+                raise OwnershipLost(f"Job {job_id} is owned by another process")
+            if row.cancel_requested or job_id in self._cancelling:
+                await self._finish(job_id, "cancelled")
+                return
+            domain_name = steps[position]["domain"]
+            end = position + 1
+            while end < len(steps) and end - position < settings.JOB_CHUNK_SIZE and steps[end]["domain"] == domain_name:
+                end += 1
+            operations = [step["op"] for step in steps[position:end]]
+            if resumed:
+                # The chunk in flight when the job stopped may have landed
+                results = await self._apply_once(job_id, namecom, domain_name, operations)
+                resumed = False
+            else:
+                results = await self._apply(job_id, namecom, domain_name, operations)
+            zone_mirror.mark_changed(domain_name)
+            
+            for index, result in enumerate(results, start=position):
+                if result["status"] == "ok":
+                    succeeded += 1
+                    continue
+                if result["status"] == "cancelled":
+                    # Never sent; the job stops before its next chunk
+                    continue
+                failed += 1
+                if len(failures) < settings.JOB_MAX_FAILURES:
+                    failures.append({
+                        "step": index,
+                        "domain": domain_name,
+                        "op": steps[index]["op"],
+                        "error": result.get("error")
+                    })
+            position = end
+            row = await self._save(
+                job_id,
+                checkpoint=position,
+                succeeded=succeeded,
+                failed=failed,
+                failures=failures
+            )
+        await self._finish(job_id, "completed")
+    
+    async def _cancel_requested(self, job_id: str) -> bool:
+        if job_id in self._cancelling:
+            return True
+        # Possibly asked of another process
+        async with async_session() as session:
+            return bool(await session.scalar(select(JobRow.cancel_requested).where(JobRow.id == job_id)))
+    
+    async def _apply(
+        self,
+        job_id: str,
+        namecom: NamecomService,
+        domain_name: str,
+        operations: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Apply operations, waiting out an open circuit breaker for up to JOB_BREAKER_MAX_WAIT
+        
+        Operations still waiting when the job is cancelled come back as
+        "cancelled", and those still waiting at the cap keep their error.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        pending = list(range(len(operations)))
+        deadline = time.monotonic() + settings.JOB_BREAKER_MAX_WAIT
+        while pending:
+            applied = await namecom.apply_dns_changes(domain_name, [operations[i] for i in pending])
+            retry = []
+            for i, result in zip(pending, applied):
+                if result["status"] == "error" and "retry_after" in result and time.monotonic() < deadline:
+                    retry.append(i)
+                else:
+                    results[i] = result
+            pending = retry
+            if not pending:
+                break
+            if job_id in self._lost:
+                raise OwnershipLost(f"Job {job_id} is owned by another process")
+            if await self._cancel_requested(job_id):
+                for i in pending:
+                    results[i] = {
+                        "index": i,
+                        "op": operations[i]["op"],
+                        "record_id": operations[i].get("record_id"),
+                        "status": "cancelled"
+                    }
+                break
+            await asyncio.sleep(min(max(namecom.breaker.retry_in(), 1.0), max(deadline - time.monotonic(), 0)))
+        return results
+    
+    async def _apply_once(
+        self,
+        job_id: str,
+        namecom: NamecomService,
+        domain_name: str,
+        operations: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Apply operations, skipping the ones that already landed: creates of existing records, deletes of missing ones"""
+        existing = {
+            (r["name"], r["type"], r["content"])
+            for r in (normalize_record(record, domain_name) for record in await namecom.get_dns_records(domain_name, refresh=True))
+        }
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        for i, operation in enumerate(operations):
+            if operation["op"] == "create":
+                r = normalize_record(operation, domain_name)
+                if (r["name"], r["type"], r["content"]) in existing:
+                    results[i] = {"index": i, "op": "create", "record_id": None, "status": "ok", "skipped": True}
+                    continue
+            pending.append((i, operation))
+        applied = await self._apply(job_id, namecom, domain_name, [operation for _, operation in pending])
+        for (i, _), result in zip(pending, applied):
+            if result["op"] == "delete" and result["status"] == "error" and result.get("status_code") == 404:
+                # Deleted before the job stopped
+                result = {"index": i, "op": "delete", "record_id": result["record_id"], "status": "ok", "skipped": True}
+            results[i] = result
+        return results
+    
+    def start(self):
+        """Start the workers and pick up jobs left over from before a restart"""
+        if self._poller is not None and not self._poller.done():
+            return
+        self._wake = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(max(settings.JOB_WORKERS, 1))]
+        self._poller = asyncio.create_task(self._poll())
+    
+    async def stop(self):
+        """Stop the workers, handing running jobs back at their checkpoints"""
+        tasks = [task for task in (self._poller, *self._workers) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
+        self._workers = []
+        self._candidates.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get worker, per-team and outcome counters for this process"""
+        return {
+            "workers": len(self._workers),
+            "running": len(self._running),
+            "running_per_team": dict(self._per_key),
+            "waiting": len(self._candidates),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "resumed": self.resumed,
+            "listeners": sum(len(listeners) for listeners in self._listeners.values())
+        }
+
+job_queue = JobQueue()
+job_queue.register("dns_changes", plan_dns_changes)
+job_queue.register("set_ttl", plan_ttl_change)
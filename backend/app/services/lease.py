@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from app.db import async_session
+from app.db.tables import LeaseRow
+
+class Lease:
+    """A named database lease, so only one process at a time does a piece of work
+    
+    The holder renews it with acquire() more often than every `ttl`
+    seconds; if it stops, another process takes over once it expires.
+    """
+    
+    def __init__(self, name: str, owner: str, ttl: float):
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+    
+    async def acquire(self) -> bool:
+        """Take or renew the lease; False if another process holds it"""
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=self.ttl)
+        async with async_session() as session:
+            result = await session.execute(
+                update(LeaseRow)
+                .where(LeaseRow.name == self.name)
+                .where(or_(LeaseRow.owner == self.owner, LeaseRow.expires_at < now))
+                .values(owner=self.owner, expires_at=expires_at)
+            )
+            if result.rowcount == 1:
+                await session.commit()
+                return True
+            session.add(LeaseRow(name=self.name, owner=self.owner, expires_at=expires_at))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Held and live
+                return False
+        return True
+    
+    async def release(self):
+        """Give the lease up early if this process holds it"""
+        async with async_session() as session:
+            await session.execute(
+                delete(LeaseRow).where(LeaseRow.name == self.name, LeaseRow.owner == self.owner)
+            )
+            await session.commit()
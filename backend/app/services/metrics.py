@@ -0,0 +1,234 @@
+import re
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers cached reads (sub-millisecond) through slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_DOMAIN_PATH = re.compile(r"^/domains/[^/?]+")
+_RECORD_PATH = re.compile(r"/records/[^/?]+")
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def upstream_endpoint(endpoint: str) -> str:
+    """Template domain names and IDs out of a name.com endpoint to bound label values"""
+    path = endpoint.split("?", 1)[0]
+    path = _DOMAIN_PATH.sub("/domains/{domain}", path)
+    return _RECORD_PATH.sub("/records/{record_id}", path)
+
+def secret_path(path: str) -> str:
+    """Template numeric IDs (e.g. user IDs) out of a Vault path"""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    type = ""
+    
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+    
+    def labels(self, *values: str):
+        """Get the child for these label values (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+    
+    def clear(self):
+        """Drop every child, so a collector re-exporting a changing set of label values doesn't keep old ones"""
+        self._children.clear()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(_format_labels(self.labelnames, values), values, child))
+        return lines
+    
+    def _render_child(self, labels: str, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{labels} {child.value}"]
+
+class _Value:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+    
+    def set(self, value: float):
+        self.value = value
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    
+    type = "counter"
+    
+    def _new_child(self):
+        return _Value()
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    
+    type = "gauge"
+    
+    def _new_child(self):
+        return _Value()
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; cumulated at render time, not per observation
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets"""
+    
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+    
+    def _render_child(self, labels: str, values: Tuple[str, ...], child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{labels} {child.sum}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format
+    
+    Hot paths only touch plain counters; gauges that mirror a service's
+    stats() are filled in by collectors at scrape time.
+    """
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+    
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+    
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+    
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+    
+    def _register(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collector: Callable[[], None]):
+        """Call collector() before each scrape, e.g. to copy stats into gauges"""
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter("http_requests_total", "HTTP requests by route template, method and status", ("method", "route", "status"))
+http_latency = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+http_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests being served").labels()
+upstream_requests = metrics.counter("namecom_requests_total", "name.com API calls by endpoint template and status", ("method", "endpoint", "status"))
+upstream_latency = metrics.histogram("namecom_request_duration_seconds", "name.com API call latency by endpoint template", ("method", "endpoint"))
+vault_latency = metrics.histogram("vault_request_duration_seconds", "Vault secret reads by path template and outcome", ("path", "outcome"))
+jwt_latency = metrics.histogram("jwt_verify_duration_seconds", "Time to resolve a bearer token to a user", ("result",))
+cache_stats = metrics.gauge("cache_stat", "Cache counters and ratios by cache", ("cache", "stat"))
+upstream_stats = metrics.gauge("namecom_upstream_stat", "name.com limiter and circuit breaker state", ("stat",))
+account_stats = metrics.gauge("namecom_account_stat", "Limiter, circuit breaker and cache state of each team's own name.com client", ("account", "stat"))
+
+def export_stats(gauge: Gauge, stats: dict, *labels: str, prefix: str = ""):
+    """Copy the numeric values of a stats() dict into gauge children, flattening nested dicts"""
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            export_stats(gauge, value, *labels, prefix=f"{name}_")
+        elif isinstance(value, (int, float)):
+            gauge.labels(*labels, name).set(float(value))
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status and in-flight requests
+    
+    Routes are labelled by their template (e.g. /api/domains/{domain_name}),
+    looked up from the endpoint the router matched, so label values stay bounded.
+    """
+    
+    def __init__(self, app, routes_of: Optional[Callable[[], Iterable]] = None):
+        self.app = app
+        self.routes_of = routes_of
+        self._templates: Optional[Dict[Callable, str]] = None
+    
+    def _template(self, scope) -> str:
+        if self._templates is None and self.routes_of is not None:
+            self._templates = {
+                route.endpoint: route.path
+                for route in self.routes_of()
+                if getattr(route, "endpoint", None) is not None
+            }
+        return (self._templates or {}).get(scope.get("endpoint"), "unmatched")
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        started = time.perf_counter()
+        http_in_flight.value += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.value -= 1
+            route = self._template(scope)
+            method = scope["method"]
+            http_latency.labels(method, route).observe(time.perf_counter() - started)
+            http_requests.labels(method, route, str(status)).inc()
@@ -0,0 +1,353 @@
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.services.dns import dns_service
+from app.services.domain import domain_service
+from app.services.lease import Lease
+from app.services.namecom import namecom_service, parse_page_cursor
+
+logger = logging.getLogger(__name__)
+
+# Marks the lease while this process is the one syncing
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+def _as_namecom(record: dict) -> Dict[str, Any]:
+    """Map a stored record to the name.com payload shape the routes expect"""
+    return {
+        "recordId": record["namecom_id"],
+        "domainName": record["domain_name"],
+        "name": record["name"],
+        "type": record["type"],
+        "answer": record["content"],
+        "ttl": record["ttl"],
+        "mxPriority": record["priority"]
+    }
+
+def _page(items: list, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    page = parse_page_cursor(cursor)
+    start = (page - 1) * limit
+    return {
+        "items": items[start:start + limit],
+        "next_cursor": str(page + 1) if start + limit < len(items) else None
+    }
+
+class ZoneMirror:
+    """Local copy of every zone in the name.com account, refreshed in the background
+    
+    Domains and records are stored through DomainService and DNSService.
+    Each tick resyncs the zones that are due: zones written through the API
+    first, then the ones furthest past their refresh age, where zones read
+    since their last sync use the shorter hot age. The read methods match
+    NamecomService's so routes can use either as their source.
+    
+    One process at a time syncs, the holder of the "zone_mirror" lease;
+    the others reload the zone list and sync times it stores each tick.
+    """
+    
+    def __init__(self):
+        # name -> {"id", "namecom_id", "synced_at", "reads"}
+        self._zones: Dict[str, dict] = {}
+        # name -> writes since the last sync started; dirty zones are read live
+        self._dirty: Dict[str, int] = {}
+        # name -> last write, so a follower knows which sync covers it
+        self._written_at: Dict[str, datetime] = {}
+        self._lease = Lease("zone_mirror", _OWNER, settings.ZONE_MIRROR_LEASE_TTL)
+        self.leader = False
+        self._loaded = False
+        self._listed_at: Optional[datetime] = None
+        self._list_due = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[int, str], Awaitable[None]]] = []
+        self._removed_listeners: List[Callable[[str], Awaitable[None]]] = []
+        self.syncs = 0
+        self.sync_errors = 0
+        self.last_error: Optional[str] = None
+    
+    async def load(self):
+        """Take the mirrored zones and their sync times from the database
+        
+        Serves reads right away after a restart, and keeps a process that
+        doesn't hold the lease in step with the one syncing.
+        """
+        synced = {d["name"].lower(): d for d in await domain_service.get_synced_domains()}
+        for name, domain in synced.items():
+            zone = self._zones.get(name)
+            if zone is None:
+                zone = self._zones[name] = {"id": domain["id"], "namecom_id": domain["namecom_id"], "reads": 0}
+                if self._loaded:
+                    # First synced by the lease holder; the startup load is covered by the listeners' own build
+                    await self._notify(zone["id"], name)
+            elif zone["synced_at"] != domain["synced_at"]:
+                # Resynced by the lease holder
+                await self._notify(zone["id"], name)
+            zone["synced_at"] = domain["synced_at"]
+            written_at = self._written_at.get(name)
+            if written_at is not None and domain["synced_at"] > written_at:
+                self._forget_writes(name)
+        for name in list(self._zones):
+            if name not in synced:
+                del self._zones[name]
+                self._forget_writes(name)
+                await self._notify_removed(name)
+        if self._zones:
+            self._listed_at = min(zone["synced_at"] for zone in self._zones.values())
+        self._loaded = True
+    
+    def _forget_writes(self, name: str):
+        self._dirty.pop(name, None)
+        self._written_at.pop(name, None)
+    
+    async def refresh_domains(self):
+        """Match the mirrored domain list to the account's"""
+        listed = {}
+        async for page in namecom_service.iter_domains():
+            for d in page:
+                listed[d["domainName"].lower()] = d
+        for name, d in listed.items():
+            if name in self._zones:
+                continue
+            namecom_id = d.get("domainId")
+            domain = await domain_service.get_or_create_domain(
+                d["domainName"],
+                team_id=settings.ZONE_MIRROR_TEAM_ID,
+                namecom_id=str(namecom_id) if namecom_id is not None else None
+            )
+            self._zones[name] = {
+                "id": domain["id"],
+                "namecom_id": domain["namecom_id"],
+                "synced_at": domain["synced_at"],
+                "reads": 0
+            }
+        for name in list(self._zones):
+            if name not in listed:
+                # Other processes stop serving it from the mirror too
+                await domain_service.mark_synced(self._zones.pop(name)["id"], None)
+                self._forget_writes(name)
+                await self._notify_removed(name)
+        self._listed_at = datetime.now()
+    
+    async def sync_zone(self, domain_name: str) -> bool:
+        """Copy one zone's records from name.com, writing only what changed"""
+        name = domain_name.lower()
+        zone = self._zones.get(name)
+        if zone is None:
+            return False
+        # Stay dirty until a sync that started after the last write lands
+        writes = self._dirty.get(name)
+        try:
+            records = await namecom_service.get_dns_records(name, refresh=True)
+            changes = await dns_service.sync_domain_records(zone["id"], name, records)
+            synced_at = datetime.now()
+            await domain_service.mark_synced(zone["id"], synced_at)
+        except Exception as e:
+            self.sync_errors += 1
+            self.last_error = f"{name}: {e}"
+            logger.warning("Zone mirror sync of %s failed: %s", name, e)
+            return False
+        zone["synced_at"] = synced_at
+        zone["reads"] = 0
+        if writes is not None and self._dirty.get(name) == writes:
+            self._forget_writes(name)
+        if any(changes.values()):
+            await self._notify(zone["id"], name)
+        self.syncs += 1
+        return True
+    
+    async def _notify(self, domain_id: int, name: str):
+        for listener in self._listeners:
+            try:
+                await listener(domain_id, name)
+            except Exception:
+                logger.exception("Zone mirror listener for %s failed", name)
+    
+    async def _notify_removed(self, name: str):
+        for listener in self._removed_listeners:
+            try:
+                await listener(name)
+            except Exception:
+                logger.exception("Zone mirror removal listener for %s failed", name)
+    
+    def _due(self, now: datetime) -> List[str]:
+        """Get the zones to sync this tick, most urgent first"""
+        scored = []
+        for name, zone in self._zones.items():
+            if zone["synced_at"] is None:
+                age = float("inf")
+            else:
+                age = (now - zone["synced_at"]).total_seconds()
+            max_age = settings.ZONE_MIRROR_HOT_AGE if zone["reads"] else settings.ZONE_MIRROR_MAX_AGE
+            urgency = age / max_age if max_age > 0 else float("inf")
+            if name in self._dirty or urgency >= 1:
+                scored.append(((name in self._dirty, urgency, zone["reads"]), name))
+        scored.sort(reverse=True)
+        return [name for _, name in scored[:settings.ZONE_MIRROR_BATCH]]
+    
+    async def tick(self):
+        """Refresh the domain list if due, then sync the most urgent zones
+        
+        Without the lease, only reload what the process holding it stored.
+        """
+        try:
+            self.leader = await self._lease.acquire()
+        except Exception as e:
+            self.leader = False
+            self.last_error = str(e)
+            logger.warning("Zone mirror lease check failed: %s", e)
+        if not self.leader:
+            # Whoever takes the lease over lists domains first
+            self._list_due = 0.0
+            await self.load()
+            return
+        if time.monotonic() >= self._list_due:
+            try:
+                await self.refresh_domains()
+                self._list_due = time.monotonic() + settings.ZONE_MIRROR_LIST_INTERVAL
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Zone mirror domain list refresh failed: %s", e)
+        names = self._due(datetime.now())
+        if names:
+            await asyncio.gather(*(self.sync_zone(name) for name in names))
+    
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Loading the zone mirror failed")
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Zone mirror sync failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.ZONE_MIRROR_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+    
+    def start(self):
+        """Start the background sync"""
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background sync"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self.leader:
+            self.leader = False
+            try:
+                await self._lease.release()
+            except Exception as e:
+                logger.warning("Releasing the zone mirror lease failed: %s", e)
+    
+    def subscribe(self, listener: Callable[[int, str], Awaitable[None]]):
+        """Await listener(domain_id, domain_name) whenever a sync changed a zone's records"""
+        self._listeners.append(listener)
+    
+    def subscribe_removed(self, listener: Callable[[str], Awaitable[None]]):
+        """Await listener(domain_name) whenever a zone stops being mirrored"""
+        self._removed_listeners.append(listener)
+    
+    def note_read(self, domain_name: str):
+        """Count a read so the zone is kept on the shorter hot refresh age"""
+        zone = self._zones.get(domain_name.lower())
+        if zone is not None:
+            zone["reads"] += 1
+    
+    def mark_changed(self, domain_name: str):
+        """Serve a zone live until it is resynced after a write, and resync it now"""
+        name = domain_name.lower()
+        if name in self._zones:
+            self._dirty[name] = self._dirty.get(name, 0) + 1
+            self._written_at[name] = datetime.now()
+            if self._wake is not None:
+                self._wake.set()
+    
+    def serves(self, domain_name: Optional[str] = None) -> bool:
+        """Check whether reads of the domain list (or one zone) can come from the mirror"""
+        if not settings.ZONE_MIRROR_ENABLED or self._listed_at is None:
+            return False
+        if domain_name is None:
+            return True
+        name = domain_name.lower()
+        zone = self._zones.get(name)
+        return zone is not None and zone["synced_at"] is not None and name not in self._dirty
+    
+    def freshness(self, domain_name: Optional[str] = None) -> Dict[str, str]:
+        """Get response headers saying the data is mirrored and when it was synced"""
+        synced_at = self._listed_at if domain_name is None else self._zones[domain_name.lower()]["synced_at"]
+        return {"X-Data-Source": "mirror", "X-Mirror-Synced-At": synced_at.isoformat()}
+    
+    def _domains(self) -> List[Dict[str, Any]]:
+        return [{"domainName": name, "domainId": zone["namecom_id"]} for name, zone in self._zones.items()]
+    
+    async def iter_domains(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate over mirrored domains a page at a time"""
+        domains = self._domains()
+        for start in range(0, len(domains), settings.NAMECOM_PAGE_SIZE):
+            yield domains[start:start + settings.NAMECOM_PAGE_SIZE]
+    
+    async def get_domains_page(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Get one page of mirrored domains"""
+        return _page(self._domains(), cursor, limit)
+    
+    async def get_dns_records(self, domain_name: str) -> List[Dict[str, Any]]:
+        """Get a zone's mirrored records"""
+        zone = self._zones[domain_name.lower()]
+        return [_as_namecom(r) for r in await dns_service.get_domain_records(zone["id"])]
+    
+    async def iter_dns_records(self, domain_name: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate over a zone's mirrored records a page at a time"""
+        zone = self._zones[domain_name.lower()]
+        cursor = None
+        while True:
+            page = await dns_service.list_domain_records(zone["id"], limit=settings.NAMECOM_PAGE_SIZE, cursor=cursor)
+            yield [_as_namecom(r) for r in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    async def get_dns_records_page(self, domain_name: str, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Get one page of a zone's mirrored records"""
+        return _page(await self.get_dns_records(domain_name), cursor, limit)
+    
+    async def get_domain_snapshot(self, domain_name: str) -> Dict[str, Any]:
+        """Get mirrored domain details and records"""
+        zone = self._zones[domain_name.lower()]
+        return {
+            "domain": {"domainName": domain_name.lower(), "domainId": zone["namecom_id"]},
+            "records": await self.get_dns_records(domain_name)
+        }
+    
+    def stats(self) -> dict:
+        """Get zone counts, sync counters and the oldest sync age"""
+        now = datetime.now()
+        synced = [zone["synced_at"] for zone in self._zones.values() if zone["synced_at"] is not None]
+        return {
+            "running": self._worker is not None and not self._worker.done(),
+            "leader": self.leader,
+            "zones": len(self._zones),
+            "synced_zones": len(synced),
+            "dirty_zones": len(self._dirty),
+            "listed_at": self._listed_at.isoformat() if self._listed_at else None,
+            "oldest_sync_age": round((now - min(synced)).total_seconds(), 3) if synced else None,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "last_error": self.last_error
+        }
+
+zone_mirror = ZoneMirror()
@@ -1,62 +1,422 @@
-import requests
-from typing import Optional, Dict, List, Any
+import asyncio
+import re
+import time
+import httpx
+from typing import Any, AsyncIterator, Dict, List, Optional
 from app.config import settings
+from app.services.cache import TTLCache
+from app.services.metrics import upstream_endpoint, upstream_latency, upstream_requests
+from app.services.profiling import record_span
+from app.services.ratelimit import UpstreamLimiter, parse_retry_after
+from app.services.resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
+# PUT/DELETE on a single record are idempotent and safe to retry
+RECORD_ENDPOINT = re.compile(r"^/domains/[^/]+/records/[^/]+$")
+
+def parse_page_cursor(cursor: Optional[str]) -> int:
+    """Get the page number from a list cursor (the first page if there is none)"""
+    try:
+        page = int(cursor) if cursor else 1
+    except ValueError:
+        page = 0
+    if page < 1:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return page
+
+class NamecomAPIError(Exception):
+    """name.com answered with an error status"""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class NamecomRateLimitError(NamecomAPIError):
+    """name.com throttled the account (HTTP 429)"""
+
+class NamecomServerError(NamecomAPIError):
+    """name.com failed or was unreachable (HTTP 5xx, timeouts, connection errors)"""
+
+class NamecomUnavailableError(NamecomServerError):
+    """The circuit breaker is open; name.com was not called"""
 
 class NamecomService:
     """Service to interact with name.com API"""
     
-    BASE_URL = "https://api.name.com/v4"
+    BASE_URL = settings.NAMECOM_BASE_URL
     
-    def __init__(self, api_token: Optional[str] = None, username: Optional[str] = None):
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        username: Optional[str] = None,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[int] = None
+    ):
         self.api_token = api_token or settings.NAMECOM_API_TOKEN
         self.username = username or settings.NAMECOM_USERNAME
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = TTLCache(
+            max_entries=settings.NAMECOM_CACHE_MAX_ENTRIES,
+            stale_ttl=settings.NAMECOM_CACHE_STALE_TTL
+        )
+        self.limiter = UpstreamLimiter(
+            rate=rate_limit if rate_limit is not None else settings.NAMECOM_RATE_LIMIT,
+            burst=rate_burst or settings.NAMECOM_RATE_BURST,
+            min_concurrency=settings.NAMECOM_MIN_CONCURRENCY,
+            max_concurrency=settings.NAMECOM_MAX_CONCURRENCY or settings.NAMECOM_POOL_SIZE
+        )
+        self.breaker = CircuitBreaker(
+            threshold=settings.NAMECOM_BREAKER_THRESHOLD,
+            reset_timeout=settings.NAMECOM_BREAKER_RESET
+        )
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedged = 0
+        self.stale_served = 0
+    
+    def set_credentials(self, api_token: str, username: Optional[str] = None):
+        """Switch to new credentials without dropping pooled connections"""
+        self.api_token = api_token
+        if username:
+            self.username = username
+        self.headers["Authorization"] = f"Bearer {self.api_token}"
+        if self._client is not None:
+            self._client.headers["Authorization"] = self.headers["Authorization"]
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared keep-alive client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                headers=self.headers,
+                http2=settings.NAMECOM_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=settings.NAMECOM_POOL_SIZE,
+                    max_keepalive_connections=settings.NAMECOM_POOL_SIZE
+                ),
+                timeout=httpx.Timeout(
+                    settings.NAMECOM_READ_TIMEOUT,
+                    connect=settings.NAMECOM_CONNECT_TIMEOUT,
+                    pool=settings.NAMECOM_CONNECT_TIMEOUT
+                )
+            )
+        return self._client
     
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make authenticated request to name.com API"""
-        url = f"{self.BASE_URL}{endpoint}"
+    async def close(self):
+        """Close the connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+        """Make authenticated request to name.com API, retrying idempotent calls"""
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        # POST creates a record each time it lands, so it is never retried
+        idempotent = method == "GET" or (method in ("PUT", "DELETE") and RECORD_ENDPOINT.match(endpoint))
+        attempts = max(settings.NAMECOM_RETRY_ATTEMPTS, 1) if idempotent else 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise NamecomUnavailableError(
+                    f"API request failed: name.com is unavailable, retrying in {self.breaker.retry_in():.0f}s",
+                    status_code=503,
+                    retry_after=self.breaker.retry_in()
+                )
+            try:
+                if method == "GET" and settings.NAMECOM_HEDGE_GETS:
+                    result = await self._hedged_get(endpoint)
+                else:
+                    result = await self._send(method, endpoint, data)
+            except (NamecomServerError, NamecomRateLimitError) as e:
+                if isinstance(e, NamecomServerError):
+                    self.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                self.retries += 1
+                delay = backoff_delay(attempt, settings.NAMECOM_RETRY_BASE_DELAY, settings.NAMECOM_RETRY_MAX_DELAY)
+                await asyncio.sleep(max(delay, e.retry_after or 0))
+                continue
+            except NamecomAPIError as e:
+                # name.com is up; the request itself was refused
+                self.breaker.record_success()
+                if method == "DELETE" and attempt > 0 and e.status_code == 404:
+                    # An earlier attempt deleted it before failing to answer
+                    return {}
+                raise
+            self.breaker.record_success()
+            return result
+    
+    async def _hedged_get(self, endpoint: str) -> Dict[str, Any]:
+        """GET with a second request fired if the first outlasts the usual tail latency"""
+        delay = self.latency.percentile(settings.NAMECOM_HEDGE_PERCENTILE)
+        if delay is None:
+            return await self._send("GET", endpoint)
         
+        pending = {asyncio.ensure_future(self._send("GET", endpoint))}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedged += 1
+                pending.add(asyncio.ensure_future(self._send("GET", endpoint)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _send(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+        """Send one request to name.com under the rate limiter"""
+        await self.limiter.acquire()
+        started = time.monotonic()
+        outcome = "cancelled"
+        status = "cancelled"
         try:
+            response = await self._get_client().request(
+                method,
+                endpoint,
+                json=data if method in ("POST", "PUT") else None
+            )
+            status = str(response.status_code)
+            self._observe_rate_limit(response)
+            if response.status_code == 429:
+                outcome = "throttled"
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.limiter.backoff(retry_after if retry_after is not None else 1.0)
+                raise NamecomRateLimitError(
+                    f"API request failed: rate limited by name.com for {endpoint}",
+                    status_code=429,
+                    retry_after=retry_after
+                )
+            if response.status_code >= 500:
+                outcome = "failed"
+                raise NamecomServerError(
+                    f"API request failed: name.com returned {response.status_code} for {endpoint}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+            outcome = "ok"
             if method == "GET":
-                response = requests.get(url, headers=self.headers)
-            elif method == "POST":
-                response = requests.post(url, headers=self.headers, json=data)
-            elif method == "PUT":
-                response = requests.put(url, headers=self.headers, json=data)
-            elif method == "DELETE":
-                response = requests.delete(url, headers=self.headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"API request failed: {str(e)}")
-    
-    def get_domains(self) -> List[Dict[str, Any]]:
+                self.latency.add(time.monotonic() - started)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise NamecomAPIError(f"API request failed: {str(e)}", status_code=response.status_code)
+            return response.json() if response.content else {}
+        except (httpx.TimeoutException, httpx.NetworkError) as e:
+            outcome = "failed"
+            status = "timeout" if isinstance(e, httpx.TimeoutException) else "network_error"
+            raise NamecomServerError(f"API request failed: {str(e)}")
+        except httpx.HTTPError as e:
+            status = "error"
+            raise NamecomAPIError(f"API request failed: {str(e)}")
+        finally:
+            self.limiter.release(outcome)
+            template = upstream_endpoint(endpoint)
+            elapsed = time.monotonic() - started
+            upstream_latency.labels(method, template).observe(elapsed)
+            record_span("namecom", elapsed)
+            upstream_requests.labels(method, template, status).inc()
+    
+    def _observe_rate_limit(self, response: httpx.Response):
+        """Pause before the account budget runs out when name.com says it has"""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) > 0:
+                return
+            reset_at = float(reset)
+        except ValueError:
+            return
+        # Reset is either an epoch timestamp or seconds from now
+        delay = reset_at - time.time() if reset_at > 1e9 else reset_at
+        if delay > 0:
+            self.limiter.backoff(delay)
+    
+    async def ping(self):
+        """Check name.com is reachable and accepts the current credentials
+        
+        Sent straight on the client, not through the rate limiter, so a busy
+        account's queue can't time the health probe out.
+        """
+        response = await self._get_client().get("/hello")
+        if response.status_code >= 400:
+            raise NamecomAPIError(
+                f"API request failed: name.com returned {response.status_code} for /hello",
+                status_code=response.status_code
+            )
+    
+    def cache_stats(self) -> dict:
+        """Get read cache counters"""
+        return self.cache.stats()
+    
+    def limiter_stats(self) -> dict:
+        """Get rate limiter queue and concurrency counters"""
+        return self.limiter.stats()
+    
+    def upstream_stats(self) -> dict:
+        """Get limiter, circuit breaker, retry and hedging counters"""
+        p95 = self.latency.percentile(95)
+        return {
+            **self.limiter.stats(),
+            "breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "stale_served": self.stale_served,
+            "get_latency_p95": round(p95, 6) if p95 is not None else None
+        }
+    
+    async def _cached_read(self, key: tuple, loader, ttl: float):
+        """Read through the cache, serving the last known value if name.com is down"""
+        try:
+            return await self.cache.get_or_load(key, loader, ttl)
+        except NamecomServerError:
+            value = self.cache.get_stale(key)
+            if value is None:
+                raise
+            self.stale_served += 1
+            return value
+    
+    def _patch_records(self, domain_name: str, patch):
+        """Apply a write to the cached record set so readers see their own writes"""
+        self.cache.update(("records", domain_name.lower()), patch)
+    
+    async def _iter_upstream(self, endpoint: str, key: str, per_page: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield each page of a name.com list endpoint, following nextPage"""
+        per_page = per_page or settings.NAMECOM_PAGE_SIZE
+        page = 1
+        while page:
+            response = await self._make_request("GET", f"{endpoint}?perPage={per_page}&page={page}")
+            yield response.get(key, [])
+            page = response.get("nextPage")
+    
+    async def _cached_list(self, cache_key: tuple, endpoint: str, key: str, ttl: float) -> List[Dict[str, Any]]:
+        """Read a whole name.com list through the cache, fetching it once however many callers ask"""
+        async def load():
+            return [item async for page in self._iter_upstream(endpoint, key) for item in page]
+        
+        return await self._cached_read(cache_key, load, ttl)
+    
+    async def _iter_cached(self, cache_key: tuple, endpoint: str, key: str, ttl: float) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield a cached list a page at a time, loading it first on a miss"""
+        items = await self._cached_list(cache_key, endpoint, key, ttl)
+        for start in range(0, len(items), settings.NAMECOM_PAGE_SIZE):
+            yield items[start:start + settings.NAMECOM_PAGE_SIZE]
+    
+    async def _get_page(
+        self,
+        cache_key: tuple,
+        endpoint: str,
+        key: str,
+        ttl: float,
+        cursor: Optional[str],
+        limit: int
+    ) -> Dict[str, Any]:
+        """Get one page of a cached list as {"items", "next_cursor"}; the cursor is a page number"""
+        page = parse_page_cursor(cursor)
+        items = await self._cached_list(cache_key, endpoint, key, ttl)
+        start = (page - 1) * limit
+        return {
+            "items": items[start:start + limit],
+            "next_cursor": str(page + 1) if start + limit < len(items) else None
+        }
+    
+    async def get_domains(self) -> List[Dict[str, Any]]:
         """Get all domains"""
-        response = self._make_request("GET", "/domains")
-        return response.get("domains", [])
+        return await self._cached_list(("domains",), "/domains", "domains", settings.NAMECOM_CACHE_TTL_DOMAINS)
+    
+    def iter_domains(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate over all domains a page at a time"""
+        return self._iter_cached(("domains",), "/domains", "domains", settings.NAMECOM_CACHE_TTL_DOMAINS)
     
-    def get_domain(self, domain_name: str) -> Dict[str, Any]:
+    async def get_domains_page(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Get one page of domains"""
+        return await self._get_page(
+            ("domains",), "/domains", "domains", settings.NAMECOM_CACHE_TTL_DOMAINS, cursor, limit
+        )
+    
+    async def get_domain(self, domain_name: str) -> Dict[str, Any]:
         """Get specific domain details"""
-        response = self._make_request("GET", f"/domains/{domain_name}")
-        return response
+        async def load():
+            return await self._make_request("GET", f"/domains/{domain_name}")
+        
+        return await self._cached_read(
+            ("domain", domain_name.lower()), load, settings.NAMECOM_CACHE_TTL_DOMAIN
+        )
+    
+    async def get_dns_records(self, domain_name: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get all DNS records for a domain, bypassing the cache when refresh is set"""
+        if refresh:
+            self.cache.invalidate(("records", domain_name.lower()))
+        return await self._cached_list(
+            ("records", domain_name.lower()), f"/domains/{domain_name}/records", "records", settings.NAMECOM_CACHE_TTL_RECORDS
+        )
+    
+    def iter_dns_records(self, domain_name: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate over a domain's DNS records a page at a time"""
+        return self._iter_cached(
+            ("records", domain_name.lower()), f"/domains/{domain_name}/records", "records", settings.NAMECOM_CACHE_TTL_RECORDS
+        )
     
-    def get_dns_records(self, domain_name: str) -> List[Dict[str, Any]]:
-        """Get all DNS records for a domain"""
-        response = self._make_request("GET", f"/domains/{domain_name}/records")
-        return response.get("records", [])
+    async def get_dns_records_page(self, domain_name: str, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Get one page of a domain's DNS records"""
+        return await self._get_page(
+            ("records", domain_name.lower()),
+            f"/domains/{domain_name}/records",
+            "records",
+            settings.NAMECOM_CACHE_TTL_RECORDS,
+            cursor,
+            limit
+        )
     
-    def get_dns_record(self, domain_name: str, record_id: int) -> Dict[str, Any]:
+    async def get_domain_snapshot(self, domain_name: str) -> Dict[str, Any]:
+        """Get domain details and DNS records with both reads in flight at once"""
+        domain_info, records = await asyncio.gather(
+            self.get_domain(domain_name),
+            self.get_dns_records(domain_name)
+        )
+        return {"domain": domain_info, "records": records}
+    
+    async def get_domain_snapshots(
+        self,
+        domain_names: List[str],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get snapshots for many domains, keeping at most `concurrency` in flight"""
+        semaphore = asyncio.Semaphore(concurrency or settings.NAMECOM_FANOUT_CONCURRENCY)
+        
+        async def snapshot(domain_name: str):
+            async with semaphore:
+                return await self.get_domain_snapshot(domain_name)
+        
+        results = await asyncio.gather(
+            *(snapshot(name) for name in domain_names),
+            return_exceptions=True
+        )
+        for result in results:
+            # Per-domain failures are reported; a cancelled fetch cancels the lot
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+        return dict(zip(domain_names, results))
+    
+    async def get_dns_record(self, domain_name: str, record_id: int) -> Dict[str, Any]:
         """Get specific DNS record"""
-        response = self._make_request("GET", f"/domains/{domain_name}/records/{record_id}")
+        response = await self._make_request("GET", f"/domains/{domain_name}/records/{record_id}")
         return response
     
-    def create_dns_record(
+    async def create_dns_record(
         self,
         domain_name: str,
         name: str,
@@ -76,14 +436,19 @@ class NamecomService:
         if priority:
             data["priority"] = priority
         
-        response = self._make_request(
+        response = await self._make_request(
             "POST",
             f"/domains/{domain_name}/records",
             data
         )
+        
+        if response.get("recordId") is not None:
+            self._patch_records(domain_name, lambda records: records + [response])
+        else:
+            self.cache.invalidate(("records", domain_name.lower()))
         return response
     
-    def update_dns_record(
+    async def update_dns_record(
         self,
         domain_name: str,
         record_id: int,
@@ -100,16 +465,76 @@ class NamecomService:
         if priority is not None:
             data["priority"] = priority
         
-        response = self._make_request(
+        response = await self._make_request(
             "PUT",
             f"/domains/{domain_name}/records/{record_id}",
             data
         )
+        
+        if response.get("recordId") is not None:
+            self._patch_records(domain_name, lambda records: [
+                response if r.get("recordId") == record_id else r for r in records
+            ])
+        else:
+            self.cache.invalidate(("records", domain_name.lower()))
         return response
     
-    def delete_dns_record(self, domain_name: str, record_id: int) -> bool:
+    async def delete_dns_record(self, domain_name: str, record_id: int) -> bool:
         """Delete DNS record"""
-        self._make_request("DELETE", f"/domains/{domain_name}/records/{record_id}")
+        await self._make_request("DELETE", f"/domains/{domain_name}/records/{record_id}")
+        self._patch_records(domain_name, lambda records: [
+            r for r in records if r.get("recordId") != record_id
+        ])
         return True
+    
+    async def apply_dns_changes(
+        self,
+        domain_name: str,
+        operations: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Apply create/update/delete operations concurrently under the account rate limit
+        
+        Each operation is a dict with an "op" key plus the keyword arguments of
+        create_dns_record, update_dns_record or delete_dns_record. Deletes run
+        first, then updates, then creates, so swapping a CNAME for an A record
+        at the same name never creates before it deletes. Returns one result
+        per operation, in order; a failed operation does not stop the others.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.NAMECOM_FANOUT_CONCURRENCY)
+        handlers = {
+            "create": self.create_dns_record,
+            "update": self.update_dns_record,
+            "delete": self.delete_dns_record
+        }
+        
+        async def apply(index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+            params = {k: v for k, v in operation.items() if k != "op"}
+            result = {"index": index, "op": operation["op"], "record_id": params.get("record_id")}
+            async with semaphore:
+                try:
+                    record = await handlers[operation["op"]](domain_name=domain_name, **params)
+                except NamecomUnavailableError as e:
+                    # Never sent, so it can be tried again once the breaker closes
+                    result.update({"status": "error", "error": str(e), "retry_after": e.retry_after})
+                    return result
+                except NamecomAPIError as e:
+                    result.update({"status": "error", "error": str(e), "status_code": e.status_code})
+                    return result
+                except Exception as e:
+                    result.update({"status": "error", "error": str(e)})
+                    return result
+            result["status"] = "ok"
+            if isinstance(record, dict):
+                result["record"] = record
+            return result
+        
+        results = [None] * len(operations)
+        for phase in ("delete", "update", "create"):
+            indexes = [i for i, operation in enumerate(operations) if operation["op"] == phase]
+            applied = await asyncio.gather(*(apply(i, operations[i]) for i in indexes))
+            for i, result in zip(indexes, applied):
+                results[i] = result
+        return results
 
 namecom_service = NamecomService()
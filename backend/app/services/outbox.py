@@ -0,0 +1,886 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.config import settings
+from app.db import async_session
+from app.db.tables import OutboxRow, TeamRow, row_to_dict
+from app.services.accounts import namecom_registry
+from app.services.cache import TTLCache
+from app.services.mirror import zone_mirror
+from app.services.namecom import NamecomAPIError, NamecomRateLimitError, NamecomServerError, NamecomService
+from app.services.ratelimit import upstream_key
+from app.services.resilience import backoff_delay
+from app.services.zonesync import normalize_record
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed", "cancelled")
+
+# Statuses of writes a later one to the same record must wait for
+UNFINISHED = ("pending", "sending")
+
+class IdempotencyKeyConflict(Exception):
+    """An Idempotency-Key was sent again with a different request"""
+
+def request_hash(op: str, domain_name: str, params: Dict[str, Any]) -> str:
+    body = json.dumps([op, domain_name.lower(), params], sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+class _GroupCommit:
+    """Writes queued while a commit is in flight go out together in the next one
+    
+    SQLite takes one writer at a time, so committing each entry on its own
+    caps the outbox at one commit's worth of writes per fsync.
+    """
+    
+    def __init__(self, apply: Callable[[AsyncSession, list], Awaitable[None]]):
+        self.apply = apply
+        self._queue: List[Tuple[Any, asyncio.Future]] = []
+        self._flushing: Optional[asyncio.Task] = None
+        self.commits = 0
+    
+    async def write(self, item: Any):
+        """Write an item; returns once it is committed"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((item, future))
+        if self._flushing is None:
+            self._flushing = asyncio.create_task(self._flush())
+        await future
+    
+    async def write_many(self, items: list):
+        """Write items, in order; returns once they are all committed"""
+        futures = []
+        for item in items:
+            futures.append(asyncio.get_running_loop().create_future())
+            self._queue.append((item, futures[-1]))
+        if items and self._flushing is None:
+            self._flushing = asyncio.create_task(self._flush())
+        await asyncio.gather(*futures)
+    
+    async def drain(self):
+        """Wait for queued writes to be committed"""
+        if self._flushing is not None:
+            await self._flushing
+    
+    async def _commit(self, items: list):
+        async with async_session() as session:
+            await self.apply(session, items)
+            await session.commit()
+        self.commits += 1
+    
+    async def _flush(self):
+        try:
+            while self._queue:
+                batch, self._queue = self._queue, []
+                try:
+                    await self._commit([item for item, _ in batch])
+                    results = [None] * len(batch)
+                except Exception as e:
+                    if len(batch) == 1:
+                        results = [e]
+                    else:
+                        # One bad write (e.g. a reused Idempotency-Key) mustn't fail the rest
+                        results = []
+                        for item, _ in batch:
+                            try:
+                                await self._commit([item])
+                                results.append(None)
+                            except Exception as item_error:
+                                results.append(item_error)
+                for (_, future), error in zip(batch, results):
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+        finally:
+            self._flushing = None
+
+def _behind_older_write():
+    """Condition: an older write to the same record is still pending or being sent, in any process"""
+    older = aliased(OutboxRow)
+    return exists().where(
+        older.record_key == OutboxRow.record_key,
+        older.id < OutboxRow.id,
+        older.status.in_(UNFINISHED)
+    )
+
+async def _insert_rows(session: AsyncSession, rows: List[OutboxRow]):
+    keys = {row.record_key for row in rows if row.status == "sending" and row.record_key is not None}
+    if keys:
+        busy = set(await session.scalars(
+            select(OutboxRow.record_key).where(OutboxRow.record_key.in_(keys), OutboxRow.status.in_(UNFINISHED))
+        ))
+        for row in rows:
+            if row.status == "sending" and row.record_key in busy:
+                # Another process has an earlier write to the record; wait for the dispatcher
+                row.status, row.attempts, row.claimed_at = "pending", 0, None
+    session.add_all(rows)
+
+async def _update_rows(session: AsyncSession, updates: List[Tuple[int, Dict[str, Any]]]):
+    for entry_id, values in updates:
+        await session.execute(update(OutboxRow).where(OutboxRow.id == entry_id).values(**values))
+        if values["status"] in FINISHED:
+            # Entries merged into this one share its outcome
+            await session.execute(update(OutboxRow).where(OutboxRow.merged_into == entry_id).values(**values))
+
+
+class RecordOutbox:
+    """Durable queue of single-record writes, sent to name.com with retries
+    
+    Each create, update or delete is stored before it is sent, with the
+    client's Idempotency-Key if it gave one, so a retried request gets the
+    first one's outcome instead of writing again. A write is sent straight
+    away when nothing is queued ahead of it for the same record and fewer
+    than OUTBOX_BATCH_SIZE sends are in flight; otherwise it waits for the
+    dispatcher. Writes to one record go out one at a time, in order: no
+    process sends one while an older write to the record is pending or
+    being sent. Server errors and throttling are retried with backoff. A
+    send's claim is refreshed while it is in flight, and one left
+    unrefreshed for OUTBOX_STALE_AFTER (its process died) is replayed.
+    Delivery is at least once, so a replayed create is skipped if name.com
+    already has the record and a replayed delete that finds nothing counts
+    as done.
+    
+    Teams with a write_coalesce_window (or OUTBOX_COALESCE_WINDOW for the
+    rest) have their writes held that long. A later update to a held
+    record is merged into it, so only the last state is sent; a delete
+    replaces held updates, and identical creates become one. The merged
+    entries take the held entry's outcome. A held entry can be cancelled,
+    so a create that is deleted again never reaches name.com.
+    """
+    
+    def __init__(self):
+        # entry_id -> futures of requests waiting for the outcome
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        # Recently settled entries, for waiters that registered late
+        self._settled: "OrderedDict[int, dict]" = OrderedDict()
+        self._wake: Optional[asyncio.Event] = None
+        # Entries being sent -> their record key
+        self._in_flight: Dict[OutboxRow, Optional[str]] = {}
+        # Entries this process left to the dispatcher -> their record key
+        self._queued: Dict[OutboxRow, Optional[str]] = {}
+        self._queued_keys = Counter()
+        # Until the dispatcher finds nothing pending, there may be entries from before a restart
+        self._backlog_unknown = True
+        # Coalescing key -> the entry held for its window, and entry_id -> key
+        self._held: Dict[tuple, OutboxRow] = {}
+        self._held_keys: Dict[int, tuple] = {}
+        # Held entry_id -> entries merged into it
+        self._merged: Dict[int, List[OutboxRow]] = {}
+        # Coalescing key -> [lock, users]
+        self._key_locks: Dict[tuple, list] = {}
+        # team_id -> coalescing window
+        self._windows = TTLCache(max_entries=10000)
+        self._next_due: Optional[datetime] = None
+        self._inserts = _GroupCommit(_insert_rows)
+        self._updates = _GroupCommit(_update_rows)
+        self._tasks = set()
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._replayed_at: Optional[float] = None
+        self._heartbeat_at = time.monotonic()
+        self._cleaned_at = time.monotonic()
+        self.sent_directly = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.replayed = 0
+        self.deduplicated = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.batches = 0
+    
+    async def _find(self, user_id: int, idempotency_key: str) -> Optional[OutboxRow]:
+        async with async_session() as session:
+            return await session.scalar(
+                select(OutboxRow).where(
+                    OutboxRow.user_id == user_id,
+                    OutboxRow.idempotency_key == idempotency_key
+                )
+            )
+    
+    @staticmethod
+    def _same_request(row: OutboxRow, hash: str) -> Dict[str, Any]:
+        if row.request_hash != hash:
+            raise IdempotencyKeyConflict(f"Idempotency-Key {row.idempotency_key} was already used for a different request")
+        return row_to_dict(row)
+    
+    @staticmethod
+    def _record_key(op: str, domain_name: str, params: Dict[str, Any]) -> Optional[str]:
+        """Writes to the same record share a key and go out one at a time, in order"""
+        if op == "create":
+            return None
+        return f"{domain_name.lower()}/{params.get('record_id')}"
+    
+    def _queue(self, row: OutboxRow, key: Optional[str]):
+        self._queued[row] = key
+        self._queued_keys[key] += 1
+    
+    def _unqueue(self, row: OutboxRow):
+        key = self._queued.pop(row)
+        self._queued_keys[key] -= 1
+        if not self._queued_keys[key]:
+            del self._queued_keys[key]
+    
+    def _can_send_now(self, key: Optional[str]) -> bool:
+        if self._worker is None or self._stopping or len(self._in_flight) >= settings.OUTBOX_BATCH_SIZE:
+            return False
+        if key in self._queued_keys:
+            return False
+        return key is None or (not self._backlog_unknown and key not in self._in_flight.values())
+    
+    async def submit(
+        self,
+        op: str,
+        domain_name: str,
+        params: Dict[str, Any],
+        user_id: int,
+        team_id: Optional[int] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Store a write before it is sent; returns the entry and whether the key was seen before"""
+        hash = request_hash(op, domain_name, params)
+        if idempotency_key is not None:
+            existing = await self._find(user_id, idempotency_key)
+            if existing is not None:
+                return self._same_request(existing, hash), True
+        
+        row = OutboxRow(
+            idempotency_key=idempotency_key,
+            request_hash=hash,
+            user_id=user_id,
+            team_id=team_id,
+            domain_name=domain_name,
+            op=op,
+            params=params,
+            record_key=self._record_key(op, domain_name, params),
+            status="pending",
+            attempts=0
+        )
+        try:
+            window = await self._window(team_id)
+            if window > 0:
+                await self._hold(row, window)
+            else:
+                await self._store(row)
+        except IntegrityError:
+            # A retry with the same key got in first
+            existing = await self._find(user_id, idempotency_key)
+            if existing is None:
+                raise
+            return self._same_request(existing, hash), True
+        return row_to_dict(row), False
+    
+    async def _store(self, row: OutboxRow, hold: bool = False):
+        """Insert an entry, then send it or leave it to the dispatcher"""
+        key = row.record_key
+        send_now = not hold and self._can_send_now(key)
+        if send_now:
+            row.status, row.attempts, row.claimed_at = "sending", 1, datetime.now()
+        # Taken before the insert, so later writes to the record line up behind this one
+        if send_now:
+            self._in_flight[row] = key
+        else:
+            self._queue(row, key)
+        try:
+            await self._inserts.write(row)
+        except BaseException:
+            if send_now:
+                del self._in_flight[row]
+            else:
+                self._unqueue(row)
+            raise
+        if send_now and row.status != "sending":
+            # The insert found an earlier write to the record in another process
+            del self._in_flight[row]
+            self._queue(row, key)
+            send_now = False
+        if send_now:
+            self.sent_directly += 1
+            self._dispatch(row)
+        elif self._wake is not None:
+            self._wake.set()
+    
+    async def send_batch(
+        self,
+        namecom: NamecomService,
+        domain_name: str,
+        operations: List[Dict[str, Any]],
+        user_id: int,
+        team_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Apply a batch of writes in the same per-record order as single writes
+        
+        Each operation is stored as an entry claimed for sending, so later
+        writes to its record, in any process, wait for it. The claimed ones go
+        out together through apply_dns_changes; one behind an earlier pending
+        write to its record is left to the dispatcher and waited for up to
+        OUTBOX_WAIT_TIMEOUT, then reported as "queued" with its outbox_id.
+        Batches are not held for coalescing, and failures are reported rather
+        than retried. Returns one apply_dns_changes result per operation.
+        """
+        now = datetime.now()
+        rows = []
+        for operation in operations:
+            params = {k: v for k, v in operation.items() if k != "op"}
+            rows.append(OutboxRow(
+                request_hash=request_hash(operation["op"], domain_name, params),
+                user_id=user_id,
+                team_id=team_id,
+                domain_name=domain_name,
+                op=operation["op"],
+                params=params,
+                record_key=self._record_key(operation["op"], domain_name, params),
+                status="sending",
+                attempts=1,
+                claimed_at=now
+            ))
+        # Behind this process's writes in flight or queued for the records, like _store,
+        # and behind an earlier operation on the same record in the batch
+        busy = {key for key in self._in_flight.values() if key is not None} | set(self._queued_keys)
+        for row in rows:
+            if row.record_key in busy:
+                row.status, row.attempts, row.claimed_at = "pending", 0, None
+            elif row.record_key is not None:
+                busy.add(row.record_key)
+        for row in rows:
+            if row.status == "sending":
+                self._in_flight[row] = row.record_key
+            else:
+                self._queue(row, row.record_key)
+        try:
+            await self._inserts.write_many(rows)
+        except BaseException:
+            for row in rows:
+                if row in self._in_flight:
+                    del self._in_flight[row]
+                elif row in self._queued:
+                    self._unqueue(row)
+            raise
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        sending = [i for i, row in enumerate(rows) if row.status == "sending"]
+        for row in rows:
+            if row.status != "sending" and row in self._in_flight:
+                # The insert found an earlier write to the record in another process
+                del self._in_flight[row]
+                self._queue(row, row.record_key)
+        if len(sending) < len(rows) and self._wake is not None:
+            self._wake.set()
+        
+        try:
+            applied = await namecom.apply_dns_changes(domain_name, [operations[i] for i in sending])
+        finally:
+            for i in sending:
+                del self._in_flight[rows[i]]
+        updates = []
+        for i, result in zip(sending, applied):
+            result["index"] = i
+            results[i] = result
+            if result["status"] == "ok":
+                values = {"status": "done", "result": result.get("record"), "delivered_at": datetime.now()}
+                self.delivered += 1
+            else:
+                values = {"status": "failed", "error": result["error"], "error_status": result.get("status_code")}
+                self.failed += 1
+            updates.append((rows[i].id, values))
+        if sending and self._wake is not None:
+            # Writes to these records that queued up meanwhile can go
+            self._wake.set()
+        try:
+            await self._updates.write_many(updates)
+        except Exception:
+            # Left as sending, so they are replayed after OUTBOX_STALE_AFTER
+            logger.exception("Storing the outcome of a batch to %s failed", domain_name)
+        
+        waiting = [i for i, row in enumerate(rows) if results[i] is None]
+        entries = await asyncio.gather(
+            *(self.wait(row_to_dict(rows[i]), settings.OUTBOX_WAIT_TIMEOUT) for i in waiting)
+        )
+        for i, entry in zip(waiting, entries):
+            result = {"index": i, "op": entry["op"], "record_id": entry["params"].get("record_id")}
+            if entry["status"] == "done":
+                result["status"] = "ok"
+                if isinstance(entry["result"], dict):
+                    result["record"] = entry["result"]
+            elif entry["status"] in FINISHED:
+                result.update({"status": "error", "error": entry["error"] or "DNS record change was cancelled"})
+            else:
+                result.update({"status": "queued", "outbox_id": entry["id"]})
+            results[i] = result
+        return results
+    
+    async def _load_window(self, team_id: int) -> float:
+        async with async_session() as session:
+            window = await session.scalar(select(TeamRow.write_coalesce_window).where(TeamRow.id == team_id))
+        return settings.OUTBOX_COALESCE_WINDOW if window is None else window
+    
+    async def _window(self, team_id: Optional[int]) -> float:
+        """Seconds to hold the team's writes for coalescing; 0 sends them right away"""
+        if team_id is None:
+            return settings.OUTBOX_COALESCE_WINDOW
+        return await self._windows.get_or_load(team_id, lambda: self._load_window(team_id), 60)
+    
+    def forget_team(self, team_id: int):
+        """Drop a team's cached coalescing window after it changed"""
+        self._windows.invalidate(team_id)
+    
+    @staticmethod
+    def _coalesce_key(row: OutboxRow) -> tuple:
+        """Held writes with the same key may be merged: those to one record, or identical creates"""
+        if row.op == "create":
+            return (row.team_id, row.domain_name.lower(), "create", row.request_hash)
+        return (row.team_id, row.domain_name.lower(), row.params.get("record_id"))
+    
+    @staticmethod
+    def _merge(held: OutboxRow, row: OutboxRow) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """The single write that has the effect of the held one followed by row, if there is one"""
+        if held.op == "create":
+            return held.op, held.params
+        if held.op == "update" and row.op == "update":
+            return "update", {**held.params, **{k: v for k, v in row.params.items() if v is not None}}
+        if held.op == "update" and row.op == "delete":
+            return "delete", row.params
+        # Writes after a delete go out on their own
+        return None
+    
+    @contextlib.asynccontextmanager
+    async def _locked(self, key: tuple):
+        """Serialize holding and merging per coalescing key"""
+        lock = self._key_locks.setdefault(key, [asyncio.Lock(), 0])
+        lock[1] += 1
+        try:
+            async with lock[0]:
+                yield
+        finally:
+            lock[1] -= 1
+            if not lock[1]:
+                del self._key_locks[key]
+    
+    async def _merge_into(self, held: OutboxRow, row: OutboxRow, op: str, params: Dict[str, Any]) -> bool:
+        """Fold row into the held entry, unless the dispatcher claimed that first"""
+        row.status, row.merged_into = "merged", held.id
+        async with async_session() as session:
+            result = await session.execute(
+                update(OutboxRow)
+                .where(OutboxRow.id == held.id, OutboxRow.status == "pending")
+                .values(op=op, params=params)
+            )
+            if not result.rowcount:
+                await session.rollback()
+                row.status, row.merged_into = "pending", None
+                return False
+            superseded = held.op == "update" and op == "delete"
+            if superseded:
+                # The updates' callers must not be told their change was made
+                await session.execute(
+                    update(OutboxRow)
+                    .where((OutboxRow.id == held.id) | (OutboxRow.merged_into == held.id))
+                    .values(superseded=True)
+                )
+            session.add(row)
+            await session.commit()
+        held.op, held.params = op, params
+        if superseded:
+            for merged in [held, *self._merged.get(held.id, ())]:
+                merged.superseded = True
+        self._merged.setdefault(held.id, []).append(row)
+        self.coalesced += 1
+        return True
+    
+    async def _hold(self, row: OutboxRow, window: float):
+        """Merge a write into the held one for its record, or hold it for the window"""
+        key = self._coalesce_key(row)
+        async with self._locked(key):
+            held = self._held.get(key)
+            if held is not None:
+                merged = self._merge(held, row)
+                if merged is not None and await self._merge_into(held, row, *merged):
+                    return
+                self._release(held)
+            row.next_attempt_at = datetime.now() + timedelta(seconds=window)
+            await self._store(row, hold=True)
+            self._held[key] = row
+            self._held_keys[row.id] = key
+    
+    def _release(self, held: OutboxRow):
+        """Stop merging writes into an entry"""
+        key = self._held_keys.pop(held.id, None)
+        if key is not None and self._held.get(key) is held:
+            del self._held[key]
+    
+    async def cancel(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Cancel an entry, and those merged into it, if it hasn't been sent yet; returns it if so"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(OutboxRow)
+                .where(OutboxRow.id == entry_id, OutboxRow.status == "pending")
+                .values(status="cancelled")
+            )
+            if not result.rowcount:
+                return None
+            await session.execute(
+                update(OutboxRow).where(OutboxRow.merged_into == entry_id).values(status="cancelled")
+            )
+            await session.commit()
+            row = await session.get(OutboxRow, entry_id)
+        
+        held = self._held.get(self._held_keys.get(entry_id))
+        if held is not None:
+            self._release(held)
+        for queued in [queued for queued in self._queued if queued.id == entry_id]:
+            self._unqueue(queued)
+        self.cancelled += 1
+        entry = row_to_dict(row)
+        self._settle_waiters(entry)
+        for merged in self._merged.pop(entry_id, ()):
+            self._settle_waiters({**row_to_dict(merged), "status": "cancelled"})
+        return entry
+    
+    async def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Get an entry and its outcome"""
+        settled = self._settled.get(entry_id)
+        if settled is not None:
+            return settled
+        async with async_session() as session:
+            row = await session.get(OutboxRow, entry_id)
+        return row_to_dict(row) if row else None
+    
+    async def wait(self, entry: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Wait up to timeout for an entry to be delivered or fail; returns its latest state"""
+        if entry["status"] in FINISHED:
+            return entry
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(entry["id"], []).append(future)
+        try:
+            settled = self._settled.get(entry["id"])
+            if settled is not None:
+                return settled
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # Possibly settled by another process
+            return await self.get(entry["id"]) or entry
+        finally:
+            waiters = self._waiters.get(entry["id"])
+            if waiters is not None:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[entry["id"]]
+    
+    def _settle_waiters(self, entry: Dict[str, Any]):
+        self._settled[entry["id"]] = entry
+        while len(self._settled) > 1024:
+            self._settled.popitem(last=False)
+        for future in self._waiters.get(entry["id"], ()):
+            if not future.done():
+                future.set_result(entry)
+    
+    def _batch(self, rows: List[OutboxRow], now: datetime, limit: int) -> List[OutboxRow]:
+        """Pick due entries, skipping writes queued behind an earlier or in-flight one to the same record"""
+        batch = []
+        blocked = {key for key in self._in_flight.values() if key is not None}
+        for row in rows:
+            key = row.record_key
+            if key is not None:
+                if key in blocked:
+                    continue
+                blocked.add(key)
+            if row.next_attempt_at is not None and row.next_attempt_at > now:
+                continue
+            batch.append(row)
+            if len(batch) >= limit:
+                break
+        return batch
+    
+    async def _claim(self, limit: int) -> List[OutboxRow]:
+        """Mark a batch as being sent, counting the attempt before it is made"""
+        now = datetime.now()
+        async with async_session() as session:
+            rows = list(await session.scalars(
+                select(OutboxRow)
+                .where(OutboxRow.status == "pending", ~_behind_older_write())
+                .order_by(OutboxRow.id)
+                .limit(settings.OUTBOX_BATCH_SIZE * 4)
+            ))
+            if not rows:
+                self._backlog_unknown = False
+            due = [row.next_attempt_at for row in rows if row.next_attempt_at is not None and row.next_attempt_at > now]
+            self._next_due = min(due) if due else None
+            batch = self._batch(rows, now, limit)
+            if not batch:
+                return []
+            # Writes merged in since the select changed op and params; take them as claimed.
+            # The same check again, in case another process inserted or claimed since
+            claimed = {
+                id: (op, params)
+                for id, op, params in await session.execute(
+                    update(OutboxRow)
+                    .where(
+                        OutboxRow.id.in_([row.id for row in batch]),
+                        OutboxRow.status == "pending",
+                        ~_behind_older_write()
+                    )
+                    .values(status="sending", claimed_at=now, attempts=OutboxRow.attempts + 1)
+                    .returning(OutboxRow.id, OutboxRow.op, OutboxRow.params)
+                    .execution_options(synchronize_session=False)
+                )
+            }
+            await session.commit()
+        batch = [row for row in batch if row.id in claimed]
+        queued = {row.id: row for row in self._queued if row.id in claimed}
+        held = {row.id: row for row in self._held.values() if row.id in claimed}
+        for row in batch:
+            row.op, row.params = claimed[row.id]
+            row.attempts += 1
+            if row.id in queued:
+                self._unqueue(queued[row.id])
+            if row.id in held:
+                self._release(held[row.id])
+        self.batches += 1
+        return batch
+    
+    async def _heartbeat(self):
+        """Refresh the claim on sends in flight, so no process replays them as stale"""
+        if time.monotonic() - self._heartbeat_at < settings.OUTBOX_STALE_AFTER / 3:
+            return
+        self._heartbeat_at = time.monotonic()
+        ids = [row.id for row in self._in_flight if row.id is not None]
+        if not ids:
+            return
+        async with async_session() as session:
+            await session.execute(
+                update(OutboxRow)
+                .where(OutboxRow.id.in_(ids), OutboxRow.status == "sending")
+                .values(claimed_at=datetime.now())
+            )
+            await session.commit()
+    
+    async def _replay_stale(self):
+        """Put back sends that never reported back, e.g. because their process died"""
+        if self._replayed_at is not None and time.monotonic() - self._replayed_at < settings.OUTBOX_STALE_AFTER / 4:
+            return
+        self._replayed_at = time.monotonic()
+        async with async_session() as session:
+            result = await session.execute(
+                update(OutboxRow)
+                .where(
+                    OutboxRow.status == "sending",
+                    OutboxRow.claimed_at < datetime.now() - timedelta(seconds=settings.OUTBOX_STALE_AFTER),
+                    OutboxRow.id.not_in([row.id for row in self._in_flight if row.id is not None])
+                )
+                .values(status="pending")
+            )
+            await session.commit()
+        if result.rowcount:
+            self.replayed += result.rowcount
+            self._backlog_unknown = True
+    
+    async def _find_created(self, namecom: NamecomService, row: OutboxRow) -> Optional[Dict[str, Any]]:
+        """Get the record an earlier attempt of a create may have made"""
+        wanted = normalize_record(row.params, row.domain_name)
+        for record in await namecom.get_dns_records(row.domain_name, refresh=True):
+            r = normalize_record(record, row.domain_name)
+            if (r["name"], r["type"], r["content"]) == (wanted["name"], wanted["type"], wanted["content"]):
+                return record
+        return None
+    
+    def _retry_or_fail(self, row: OutboxRow, error: str, status_code: Optional[int], retry_after: Optional[float]) -> Dict[str, Any]:
+        if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            return {"status": "failed", "error": error, "error_status": status_code}
+        delay = max(
+            backoff_delay(row.attempts - 1, settings.OUTBOX_RETRY_BASE_DELAY, settings.OUTBOX_RETRY_MAX_DELAY),
+            retry_after or 0
+        )
+        return {
+            "status": "pending",
+            "next_attempt_at": datetime.now() + timedelta(seconds=delay),
+            "error": error,
+            "error_status": status_code
+        }
+    
+    async def _send(self, row: OutboxRow) -> Dict[str, Any]:
+        """Send one entry to name.com; returns the columns to store"""
+        upstream_key.set(f"team:{row.team_id}" if row.team_id is not None else f"user:{row.user_id}")
+        done = {"status": "done", "error": None, "error_status": None}
+        try:
+            namecom = await namecom_registry.for_team(row.team_id)
+            if row.op == "create" and row.attempts > 1:
+                record = await self._find_created(namecom, row)
+                if record is not None:
+                    self.deduplicated += 1
+                    return {**done, "result": record}
+            if row.op == "create":
+                result = await namecom.create_dns_record(domain_name=row.domain_name, **row.params)
+            elif row.op == "update":
+                result = await namecom.update_dns_record(domain_name=row.domain_name, **row.params)
+            else:
+                await namecom.delete_dns_record(row.domain_name, **row.params)
+                result = None
+        except (NamecomServerError, NamecomRateLimitError) as e:
+            return self._retry_or_fail(row, str(e), e.status_code, e.retry_after)
+        except NamecomAPIError as e:
+            if row.op == "delete" and e.status_code == 404 and row.attempts > 1:
+                # An earlier attempt deleted it
+                return {**done, "result": None}
+            return {"status": "failed", "error": str(e), "error_status": e.status_code}
+        except Exception as e:
+            # e.g. Vault down while loading the team's credentials
+            return self._retry_or_fail(row, str(e), None, None)
+        return {**done, "result": result}
+    
+    def _dispatch(self, row: OutboxRow):
+        task = asyncio.create_task(self._deliver(row))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _deliver(self, row: OutboxRow):
+        try:
+            values = await self._send(row)
+        finally:
+            key = self._in_flight.pop(row)
+        if values["status"] == "done":
+            values["delivered_at"] = datetime.now()
+        elif values["status"] not in FINISHED:
+            # Keeps later writes to the record behind the retry
+            self._queue(row, key)
+        self._wake.set()
+        
+        entry = {**row_to_dict(row), **values}
+        if values["status"] == "done":
+            self.delivered += 1
+            zone_mirror.mark_changed(row.domain_name)
+        elif values["status"] == "failed":
+            self.failed += 1
+        else:
+            self.retried += 1
+        # Answered before the outcome is stored: if that write is lost, the
+        # entry is replayed and the replay finds the write already made
+        if entry["status"] in FINISHED:
+            self._settle_waiters(entry)
+            for merged in self._merged.pop(row.id, ()):
+                self._settle_waiters({**row_to_dict(merged), **values})
+        try:
+            await self._updates.write((row.id, values))
+        except Exception:
+            # Left as sending, so it is replayed after OUTBOX_STALE_AFTER
+            logger.exception("Storing the outcome of outbox entry %s failed", row.id)
+    
+    async def _clean(self):
+        """Forget settled entries, and their keys, after OUTBOX_RETENTION"""
+        if time.monotonic() - self._cleaned_at < 300:
+            return
+        self._cleaned_at = time.monotonic()
+        async with async_session() as session:
+            await session.execute(
+                delete(OutboxRow).where(
+                    OutboxRow.status.in_(FINISHED),
+                    OutboxRow.updated_at < datetime.now() - timedelta(seconds=settings.OUTBOX_RETENTION)
+                )
+            )
+            await session.commit()
+    
+    async def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            room = settings.OUTBOX_BATCH_SIZE - len(self._in_flight)
+            claimed = []
+            try:
+                await self._heartbeat()
+                await self._replay_stale()
+                if room > 0:
+                    claimed = await self._claim(room)
+                await self._clean()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            for row in claimed:
+                self._in_flight[row] = row.record_key
+                self._dispatch(row)
+            if claimed and len(claimed) == room:
+                # Possibly more waiting
+                continue
+            timeout = min(settings.OUTBOX_POLL_INTERVAL, settings.OUTBOX_STALE_AFTER / 3)
+            if self._next_due is not None and self._next_due > datetime.now():
+                # Wake when a held or backed-off entry comes due
+                timeout = min(timeout, max((self._next_due - datetime.now()).total_seconds(), 0))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    def start(self):
+        """Start the dispatcher, which first replays entries left pending before a restart"""
+        if self._worker is None or self._worker.done():
+            self._stopping = False
+            self._backlog_unknown = True
+            self._wake = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Let sends in flight finish, then stop the dispatcher"""
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._worker
+        self._worker = None
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=settings.OUTBOX_WAIT_TIMEOUT)
+        interrupted = [row.id for row in self._in_flight if row.id is not None]
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._updates.drain()
+        self._queued.clear()
+        self._queued_keys.clear()
+        self._held.clear()
+        self._held_keys.clear()
+        self._merged.clear()
+        self._settled.clear()
+        if interrupted:
+            # These may have landed; their attempt count makes the replay check first
+            async with async_session() as session:
+                await session.execute(
+                    update(OutboxRow)
+                    .where(OutboxRow.id.in_(interrupted), OutboxRow.status == "sending")
+                    .values(status="pending")
+                )
+                await session.commit()
+    
+    async def stats(self) -> Dict[str, Any]:
+        """Get entry counts by status and dispatcher counters"""
+        async with async_session() as session:
+            counts = dict(
+                (await session.execute(select(OutboxRow.status, func.count()).group_by(OutboxRow.status))).all()
+            )
+        return {
+            "running": self._worker is not None and not self._worker.done(),
+            "entries": counts,
+            "sent_directly": self.sent_directly,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retried": self.retried,
+            "replayed": self.replayed,
+            "deduplicated": self.deduplicated,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "held": len(self._held),
+            "batches": self.batches,
+            "commits": self._inserts.commits + self._updates.commits,
+            "in_flight": len(self._in_flight),
+            "queued": len(self._queued),
+            "waiting_requests": sum(len(waiters) for waiters in self._waiters.values())
+        }
+
+record_outbox = RecordOutbox()
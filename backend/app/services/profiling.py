@@ -0,0 +1,317 @@
+import asyncio
+import gc
+import heapq
+import inspect
+import itertools
+import random
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from app.config import settings
+
+class _StackSampler:
+    """Wall-clock profile of one request, from periodic snapshots of its await chain
+    
+    Each snapshot records where the request's task is suspended, weighted by
+    the time since the previous one. Time the loop spends blocked in
+    synchronous code lands on the next await point.
+    """
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self.samples = 0
+        self._last = time.perf_counter()
+    
+    def sample(self, now: float):
+        stack = _await_chain(self.task)
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + now - self._last
+        self.samples += 1
+        self._last = now
+    
+    def collapsed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the heaviest stacks, outermost frame first, in flame graph order"""
+        heaviest = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"stack": ";".join(stack), "ms": round(seconds * 1000, 2)} for stack, seconds in heaviest]
+
+def _await_chain(task: asyncio.Task) -> Tuple[str, ...]:
+    """Frames from the task's coroutine down to whatever it is awaiting"""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        if type(awaitable).__name__ == "async_generator_asend":
+            # `await agen.__anext__()` awaits a frameless wrapper; its referent is the generator
+            awaitable = next((ref for ref in gc.get_referents(awaitable) if inspect.isasyncgen(ref)), None)
+            continue
+        frame = _first_attr(awaitable, "cr_frame", "gi_frame", "ag_frame")
+        if frame is None:
+            break
+        code = frame.f_code
+        location = "/".join(code.co_filename.replace("\\", "/").rsplit("/", 2)[-2:])
+        frames.append(f"{code.co_name} ({location}:{frame.f_lineno})")
+        awaitable = _first_attr(awaitable, "cr_await", "gi_yieldfrom", "ag_await")
+    return tuple(frames)
+
+def _first_attr(obj: Any, *names: str) -> Any:
+    for name in names:
+        value = getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+class RequestTrace:
+    """Time spent per component while serving one request"""
+    
+    __slots__ = ("id", "method", "path", "reason", "status", "started_at", "duration", "spans", "sampler")
+    
+    def __init__(self, method: str, path: str):
+        self.id: Optional[str] = None
+        self.method = method
+        self.path = path
+        self.reason: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.duration = 0.0
+        # component -> [seconds, calls]
+        self.spans: Dict[str, List[float]] = {}
+        self.sampler: Optional[_StackSampler] = None
+    
+    def add(self, component: str, seconds: float):
+        span = self.spans.get(component)
+        if span is None:
+            self.spans[component] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+    
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Get milliseconds and call counts per component (summed across concurrent calls)"""
+        return {
+            component: {"ms": round(seconds * 1000, 3), "calls": int(calls)}
+            for component, (seconds, calls) in self.spans.items()
+        }
+    
+    def server_timing(self) -> str:
+        """Format the breakdown as a Server-Timing header value"""
+        return ", ".join(
+            f"{component};dur={seconds * 1000:.3f}"
+            for component, (seconds, _) in self.spans.items()
+        )
+    
+    def to_dict(self, profile: bool = True) -> Dict[str, Any]:
+        trace = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "breakdown": self.breakdown(),
+            "profiled": self.sampler is not None and self.sampler.samples > 0
+        }
+        if profile and self.sampler is not None and self.sampler.samples:
+            trace["samples"] = self.sampler.samples
+            trace["profile"] = self.sampler.collapsed()
+        return trace
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+def record_span(component: str, seconds: float):
+    """Add time spent in a component to the current request's trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(component, seconds)
+
+@contextmanager
+def span(component: str):
+    """Time a block as part of the current request's trace"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(component, time.perf_counter() - started)
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that reports its rendering time as serialization"""
+    
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            record_span("serialization", time.perf_counter() - started)
+
+class RequestProfiler:
+    """Recent profiled requests and a log of the slowest ones
+    
+    Requests are profiled when an admin asks for it (X-Profile: 1 or
+    ?profile=1) or at random at PROFILE_SAMPLE_RATE, with at most
+    PROFILE_MAX_ACTIVE profiles running at once; every request is still
+    traced. One ticker samples every profiled request each
+    PROFILE_SAMPLE_INTERVAL, so requests that finish sooner cost little more
+    than a set insert.
+    """
+    
+    def __init__(self):
+        self.recent: Deque[RequestTrace] = deque(maxlen=settings.PROFILE_RECENT_SIZE)
+        # Min-heap of (duration, seq, trace): the PROFILE_SLOW_LOG_SIZE slowest, fastest of them first
+        self.slow: List[Tuple[float, int, RequestTrace]] = []
+        self._seq = itertools.count()
+        self._sampling: Dict[_StackSampler, None] = {}
+        self._ticker: Optional[asyncio.TimerHandle] = None
+        self._ticker_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.traced = 0
+        self.profiled = 0
+    
+    @property
+    def active(self) -> int:
+        return len(self._sampling)
+    
+    def _tick(self):
+        now = time.perf_counter()
+        for sampler in list(self._sampling):
+            sampler.sample(now)
+        if self._sampling:
+            self._ticker = self._ticker_loop.call_later(settings.PROFILE_SAMPLE_INTERVAL, self._tick)
+        else:
+            self._ticker = None
+    
+    def _arm(self, sampler: _StackSampler):
+        self._sampling[sampler] = None
+        loop = asyncio.get_running_loop()
+        if self._ticker is None or self._ticker_loop is not loop:
+            self._ticker_loop = loop
+            self._ticker = loop.call_later(settings.PROFILE_SAMPLE_INTERVAL, self._tick)
+    
+    def begin(self, method: str, path: str, requested: bool) -> RequestTrace:
+        """Start tracing the current request, with a stack sampler if it should be profiled"""
+        trace = RequestTrace(method, path)
+        self.traced += 1
+        if requested:
+            trace.reason = "requested"
+        elif settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            trace.reason = "sampled"
+        if trace.reason is not None and len(self._sampling) < settings.PROFILE_MAX_ACTIVE:
+            trace.sampler = _StackSampler(asyncio.current_task())
+            self._arm(trace.sampler)
+            self.profiled += 1
+        return trace
+    
+    def finish(self, trace: RequestTrace, duration: float):
+        """Stop profiling and keep the trace if it was asked for, sampled or slow"""
+        trace.duration = duration
+        if trace.sampler is not None:
+            self._sampling.pop(trace.sampler, None)
+        if trace.reason is not None:
+            trace.id = trace.id or secrets.token_hex(8)
+            self.recent.append(trace)
+        if duration < settings.PROFILE_SLOW_THRESHOLD or settings.PROFILE_SLOW_LOG_SIZE <= 0:
+            return
+        full = len(self.slow) >= settings.PROFILE_SLOW_LOG_SIZE
+        if full and duration <= self.slow[0][0]:
+            # Faster than everything kept
+            return
+        trace.id = trace.id or secrets.token_hex(8)
+        entry = (duration, next(self._seq), trace)
+        if full:
+            heapq.heapreplace(self.slow, entry)
+        else:
+            heapq.heappush(self.slow, entry)
+    
+    def slowest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the slowest requests in the slow log, slowest first"""
+        return [trace.to_dict(profile=False) for _, _, trace in heapq.nlargest(limit, self.slow)]
+    
+    def latest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent requested or sampled profiles, newest first"""
+        return [trace.to_dict(profile=False) for trace in list(self.recent)[::-1][:limit]]
+    
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Get a kept trace with its profile"""
+        for trace in (*self.recent, *(trace for _, _, trace in self.slow)):
+            if trace.id == trace_id:
+                return trace.to_dict()
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traced": self.traced,
+            "profiled": self.profiled,
+            "active": self.active,
+            "recent": len(self.recent),
+            "slow": len(self.slow),
+            "slow_threshold_ms": settings.PROFILE_SLOW_THRESHOLD * 1000,
+            "sample_rate": settings.PROFILE_SAMPLE_RATE
+        }
+
+request_profiler = RequestProfiler()
+
+def _wants_profile(scope) -> Optional[str]:
+    """Get the bearer token of a request that asks to be profiled"""
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"))
+    if not any(name == "profile" and value in ("1", "true") for name, value in query):
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and value in (b"1", b"true"):
+                break
+        else:
+            return None
+    headers = dict(scope["headers"])
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+class ProfilingMiddleware:
+    """ASGI middleware tracing every request and profiling the ones asked for
+    
+    Profiling on demand is admin-only: the bearer token is checked with the
+    same dependencies as the admin routes, and other callers are served
+    normally without a profile. Profiled responses carry X-Profile-Id and a
+    Server-Timing header with the component breakdown.
+    """
+    
+    def __init__(self, app, is_admin: Optional[Callable] = None):
+        self.app = app
+        self.is_admin = is_admin
+    
+    async def _requested(self, scope) -> bool:
+        token = _wants_profile(scope)
+        if token is None or self.is_admin is None:
+            return False
+        try:
+            await self.is_admin(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+            return True
+        except HTTPException:
+            return False
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        trace = request_profiler.begin(scope["method"], scope["path"], await self._requested(scope))
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                if trace.reason == "requested":
+                    trace.id = secrets.token_hex(8)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", trace.id.encode()))
+                    headers.append((b"server-timing", trace.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+        
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            request_profiler.finish(trace, time.perf_counter() - started)
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Deque, Optional
+
+# Who the current upstream call is made for; callers are queued fairly per key
+upstream_key: ContextVar[str] = ContextVar("upstream_key", default="anonymous")
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Get the seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second with bursts up to `burst`"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds` and drain the bucket"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            delay = self.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                self.updated_at = time.monotonic()
+            if self.rate <= 0:
+                return
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class UpstreamLimiter:
+    """Rate limit, adaptive concurrency and fair queueing for one upstream account
+    
+    Calls take a concurrency slot and then a token. The concurrency limit
+    follows AIMD: it grows by about one per round of successful calls and
+    halves (at most once per cooldown) when upstream throttles or fails.
+    When no slot is free, callers wait in per-key queues that are served
+    round-robin, so one key's bulk job cannot starve the others.
+    """
+    
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_concurrency: int = 1,
+        max_concurrency: int = 20,
+        cooldown: float = 1.0
+    ):
+        self.bucket = TokenBucket(rate=rate, burst=burst)
+        self.min_concurrency = max(min_concurrency, 1)
+        self.max_concurrency = max(max_concurrency, self.min_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._ring: Deque[str] = deque()
+        self._queued = 0
+        self._last_decrease = 0.0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.throttled = 0
+        self.failures = 0
+    
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    async def acquire(self, key: Optional[str] = None):
+        """Wait for a concurrency slot and a rate-limit token"""
+        key = key or upstream_key.get()
+        started = time.monotonic()
+        if self._has_slot() and not self._queued:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._ring.append(key)
+            queue.append(future)
+            self._queued += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted a slot just as we were cancelled; hand it on
+                    self.release("cancelled")
+                raise
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release("cancelled")
+            raise
+        waited = time.monotonic() - started
+        self.waits += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+    
+    def release(self, outcome: str = "ok"):
+        """Free a slot and adapt the limit to how the call went
+        
+        outcome is "ok", "throttled" (429), "failed" (5xx or timeout) or
+        "cancelled" (no signal about upstream health).
+        """
+        self.in_flight -= 1
+        if outcome == "ok":
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        elif outcome in ("throttled", "failed"):
+            if outcome == "throttled":
+                self.throttled += 1
+            else:
+                self.failures += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._last_decrease = now
+        self._wake()
+    
+    def backoff(self, seconds: float):
+        """Stop issuing calls for `seconds`, e.g. after a Retry-After"""
+        self.bucket.pause(seconds)
+    
+    def _wake(self):
+        while self._ring and self._has_slot():
+            key = self._ring.popleft()
+            queue = self._queues[key]
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._ring.append(key)
+            else:
+                del self._queues[key]
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+    
+    def stats(self) -> dict:
+        """Get queue depth, wait time and concurrency counters"""
+        busiest = sorted(self._queues.items(), key=lambda item: len(item[1]), reverse=True)[:10]
+        return {
+            "rate": self.bucket.rate,
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self._queued,
+            "queue_depth_by_key": {key: len(queue) for key, queue in busiest},
+            "waits": self.waits,
+            "wait_seconds_total": round(self.wait_total, 6),
+            "wait_seconds_max": round(self.wait_max, 6),
+            "wait_seconds_avg": round(self.wait_total / self.waits, 6) if self.waits else 0.0,
+            "throttled": self.throttled,
+            "failures": self.failures
+        }
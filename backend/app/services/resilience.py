@@ -0,0 +1,95 @@
+import random
+import time
+from collections import deque
+from typing import Optional
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a pause
+    
+    Closed: calls pass and consecutive failures are counted. After
+    `threshold` failures the breaker opens and rejects calls for
+    `reset_timeout` seconds, then lets one probe through (half-open); the
+    probe's outcome closes or re-opens it.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = max(threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self.rejected = 0
+        self._probing = False
+        self._probe_started = 0.0
+    
+    def allow(self) -> bool:
+        """Check whether a call may go upstream now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            # A probe that never reported back (e.g. cancelled) must not wedge the breaker
+            if not self._probing or now - self._probe_started >= self.reset_timeout:
+                self._probing = True
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+    
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+    
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected,
+            "retry_in": round(self.retry_in(), 3)
+        }
+
+class LatencyTracker:
+    """Sliding window of recent latencies for percentile estimates"""
+    
+    def __init__(self, size: int = 512, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+    
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Get the pct-th percentile, or None until enough samples are in"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
@@ -0,0 +1,393 @@
+import asyncio
+import heapq
+import ipaddress
+import logging
+import time
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.services.dns import dns_service
+from app.services.domain import domain_service
+
+logger = logging.getLogger(__name__)
+
+# Record tuple fields
+DOMAIN, NAME, TYPE, CONTENT, TTL, PRIORITY, NAMECOM_ID, TEAM = range(8)
+# Rebuild the substring scan text once this many records changed since the last build
+BLOB_DELTA_LIMIT = 50000
+
+def _ip_key(type: str, content: str) -> Optional[Tuple[int, int]]:
+    """Get (version, integer address) for A/AAAA content, or None"""
+    if type not in ("A", "AAAA"):
+        return None
+    try:
+        ip = ipaddress.ip_address(content.strip())
+    except ValueError:
+        return None
+    return ip.version, int(ip)
+
+def _remove_sorted(items: list, value):
+    i = bisect_left(items, value)
+    if i < len(items) and items[i] == value:
+        del items[i]
+
+def _from_sorted(ids: List[int], after: Optional[int]) -> Iterator[int]:
+    """Iterate a sorted ID list starting after a cursor"""
+    start = bisect_right(ids, after) if after is not None else 0
+    for i in range(start, len(ids)):
+        yield ids[i]
+
+def _unique(ids: Iterable[int]) -> Iterator[int]:
+    last = None
+    for id in ids:
+        if id != last:
+            yield id
+            last = id
+
+class RecordIndex:
+    """In-memory search index over every stored DNS record
+    
+    Sorted ID lists per type, domain and team, sorted (value, id) lists for
+    name/content prefix and exact lookups, and sorted (version, address, id)
+    lists for CIDR ranges are maintained incrementally. Substring search
+    scans one newline-joined text per field with str.find, merged with the
+    records changed since that text was built. A query walks its most
+    selective source in ID order from the cursor and stops as soon as a
+    page is full, so paging never depends on the total match count.
+    """
+    
+    def __init__(self):
+        self._reset()
+        self._build: Optional[asyncio.Task] = None
+        self.built_at: Optional[float] = None
+        self.build_seconds = 0.0
+    
+    def _reset(self):
+        self._records: Dict[int, tuple] = {}
+        self._ids: List[int] = []
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_domain: Dict[str, List[int]] = {}
+        self._by_team: Dict[Optional[int], List[int]] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._contents: List[Tuple[str, int]] = []
+        self._ips: List[Tuple[int, int, int]] = []
+        # field -> (text, record start offsets, record ids)
+        self._blobs: Dict[int, Tuple[str, List[int], List[int]]] = {}
+        self._delta: set = set()
+    
+    @staticmethod
+    def _to_tuple(row: Dict[str, Any]) -> tuple:
+        return (
+            row["domain_name"].lower(),
+            (row["name"] or "").lower(),
+            (row["type"] or "").upper(),
+            row["content"] or "",
+            row["ttl"],
+            row["priority"],
+            row.get("namecom_id"),
+            row.get("team_id")
+        )
+    
+    def load(self, rows: Iterable[Dict[str, Any]]):
+        """Replace the index contents with rows from DNSService (plus their domain's team_id), sorting each list once"""
+        self._reset()
+        names, contents, ips = [], [], []
+        for row in rows:
+            record = self._to_tuple(row)
+            id = row["id"]
+            self._records[id] = record
+            self._by_type.setdefault(record[TYPE], []).append(id)
+            self._by_domain.setdefault(record[DOMAIN], []).append(id)
+            self._by_team.setdefault(record[TEAM], []).append(id)
+            names.append((record[NAME], id))
+            contents.append((record[CONTENT].lower(), id))
+            ip = _ip_key(record[TYPE], record[CONTENT])
+            if ip is not None:
+                ips.append((*ip, id))
+        self._ids = sorted(self._records)
+        for ids in [*self._by_type.values(), *self._by_domain.values(), *self._by_team.values()]:
+            ids.sort()
+        self._names = sorted(names)
+        self._contents = sorted(contents)
+        self._ips = sorted(ips)
+        self._ensure_blobs()
+    
+    def _add(self, id: int, record: tuple):
+        self._records[id] = record
+        insort(self._ids, id)
+        insort(self._by_type.setdefault(record[TYPE], []), id)
+        insort(self._by_domain.setdefault(record[DOMAIN], []), id)
+        insort(self._by_team.setdefault(record[TEAM], []), id)
+        insort(self._names, (record[NAME], id))
+        insort(self._contents, (record[CONTENT].lower(), id))
+        ip = _ip_key(record[TYPE], record[CONTENT])
+        if ip is not None:
+            insort(self._ips, (*ip, id))
+        self._delta.add(id)
+    
+    def _remove(self, id: int):
+        record = self._records.pop(id, None)
+        if record is None:
+            return
+        _remove_sorted(self._ids, id)
+        _remove_sorted(self._by_type[record[TYPE]], id)
+        _remove_sorted(self._by_domain[record[DOMAIN]], id)
+        _remove_sorted(self._by_team[record[TEAM]], id)
+        _remove_sorted(self._names, (record[NAME], id))
+        _remove_sorted(self._contents, (record[CONTENT].lower(), id))
+        ip = _ip_key(record[TYPE], record[CONTENT])
+        if ip is not None:
+            _remove_sorted(self._ips, (*ip, id))
+        # Scan text hits are checked against _records, so removed IDs drop out
+        self._delta.discard(id)
+    
+    def _update(self, id: int, old: tuple, new: tuple):
+        """Re-key only the lists whose key changed"""
+        self._records[id] = new
+        for field, lists in ((TYPE, self._by_type), (DOMAIN, self._by_domain), (TEAM, self._by_team)):
+            if old[field] != new[field]:
+                _remove_sorted(lists[old[field]], id)
+                insort(lists.setdefault(new[field], []), id)
+        if old[NAME] != new[NAME]:
+            _remove_sorted(self._names, (old[NAME], id))
+            insort(self._names, (new[NAME], id))
+        if old[CONTENT] != new[CONTENT]:
+            _remove_sorted(self._contents, (old[CONTENT].lower(), id))
+            insort(self._contents, (new[CONTENT].lower(), id))
+        old_ip, new_ip = _ip_key(old[TYPE], old[CONTENT]), _ip_key(new[TYPE], new[CONTENT])
+        if old_ip != new_ip:
+            if old_ip is not None:
+                _remove_sorted(self._ips, (*old_ip, id))
+            if new_ip is not None:
+                insort(self._ips, (*new_ip, id))
+        self._delta.add(id)
+    
+    def replace_domain(self, domain_name: str, rows: Iterable[Dict[str, Any]], team_id: Optional[int] = None):
+        """Make the index's records for one domain, owned by team_id, match rows"""
+        incoming = {row["id"]: self._to_tuple({**row, "team_id": team_id}) for row in rows}
+        for id in list(self._by_domain.get(domain_name.lower(), [])):
+            if id not in incoming:
+                self._remove(id)
+        for id, record in incoming.items():
+            old = self._records.get(id)
+            if old is None:
+                self._add(id, record)
+            elif old != record:
+                self._update(id, old, record)
+    
+    async def rebuild(self):
+        """Load every record stored through DNSService"""
+        started = time.perf_counter()
+        rows = []
+        cursor = None
+        while True:
+            page = await dns_service.list_records(limit=10000, cursor=cursor)
+            rows.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        teams = await domain_service.get_domain_teams()
+        for row in rows:
+            row["team_id"] = teams.get(row["domain_id"])
+        # Sorting a large account takes seconds; keep the event loop responsive meanwhile
+        await asyncio.to_thread(self.load, rows)
+        self.build_seconds = time.perf_counter() - started
+        self.built_at = time.time()
+    
+    async def reindex_domain(self, domain_id: int, domain_name: str):
+        """Reload one domain's records, e.g. after the zone mirror synced it"""
+        # The first build may have read the table before this sync wrote it
+        await self.ready()
+        domain = await domain_service.get_domain(domain_id)
+        self.replace_domain(
+            domain_name,
+            await dns_service.get_domain_records(domain_id),
+            domain["team_id"] if domain else None
+        )
+    
+    async def drop_domain(self, domain_name: str):
+        """Remove a domain's records, e.g. after the zone mirror stopped mirroring it"""
+        await self.ready()
+        self.replace_domain(domain_name, [])
+    
+    def start(self):
+        """Build the index in the background"""
+        if self._build is None or (self._build.done() and self.built_at is None):
+            self._build = asyncio.create_task(self.rebuild())
+    
+    async def ready(self):
+        """Wait for the first build to finish"""
+        self.start()
+        await asyncio.shield(self._build)
+    
+    def _ensure_blobs(self):
+        if self._blobs and len(self._delta) <= BLOB_DELTA_LIMIT:
+            return
+        ids = self._ids
+        for field in (NAME, CONTENT):
+            values = [self._records[id][field].lower() for id in ids]
+            starts = list(accumulate([0] + [len(v) + 1 for v in values[:-1]])) if values else []
+            self._blobs[field] = ("\n".join(values), starts, list(ids))
+        self._delta.clear()
+    
+    def _scan(self, field: int, needle: str, after: Optional[int]) -> Iterator[int]:
+        """Yield IDs (ascending) of records built into the scan text that contain needle"""
+        text, starts, ids = self._blobs[field]
+        i = bisect_right(ids, after) if after is not None else 0
+        if i >= len(ids):
+            return
+        pos = starts[i]
+        while True:
+            pos = text.find(needle, pos)
+            if pos < 0:
+                return
+            i = bisect_right(starts, pos) - 1
+            yield ids[i]
+            if i + 1 >= len(starts):
+                return
+            pos = starts[i + 1]
+    
+    @staticmethod
+    def _range(lists: List[list], low: tuple, high: tuple, after: Optional[int]):
+        """Get (size, candidates) for the entries of sorted (key..., id) lists in [low, high)"""
+        bounds = [(items, bisect_left(items, low), bisect_left(items, high)) for items in lists]
+        
+        def candidates():
+            ids = sorted({entry[-1] for items, i, j in bounds for entry in items[i:j]})
+            return _from_sorted(ids, after)
+        
+        return sum(j - i for _, i, j in bounds), candidates
+    
+    def search(
+        self,
+        q: Optional[str] = None,
+        match: str = "substring",
+        field: str = "any",
+        types: Optional[List[str]] = None,
+        cidr: Optional[str] = None,
+        domain: Optional[str] = None,
+        ttl_min: Optional[int] = None,
+        ttl_max: Optional[int] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        teams: Optional[Set[int]] = None
+    ) -> Dict[str, Any]:
+        """Find records matching every given filter, a page at a time in ID order
+        
+        match is "substring", "prefix" or "exact" and applies q to the record
+        name, content or both (field "any"); all comparisons ignore case.
+        teams limits the search to those teams' domains; None searches all.
+        """
+        if match not in ("substring", "prefix", "exact"):
+            raise ValueError(f"Invalid match: {match}")
+        if field not in ("any", "name", "content"):
+            raise ValueError(f"Invalid field: {field}")
+        needle = q.lower().replace("\n", "") if q else None
+        fields = {"any": (NAME, CONTENT), "name": (NAME,), "content": (CONTENT,)}[field]
+        types = {t.upper() for t in types} if types else None
+        domain = domain.lower().rstrip(".") if domain else None
+        network = None
+        if cidr:
+            try:
+                network = ipaddress.ip_network(cidr.strip(), strict=False)
+            except ValueError:
+                raise ValueError(f"Invalid CIDR: {cidr}")
+        
+        def matches(record: tuple) -> bool:
+            if teams is not None and record[TEAM] not in teams:
+                return False
+            if types is not None and record[TYPE] not in types:
+                return False
+            if domain is not None and record[DOMAIN] != domain:
+                return False
+            if ttl_min is not None and (record[TTL] or 0) < ttl_min:
+                return False
+            if ttl_max is not None and (record[TTL] or 0) > ttl_max:
+                return False
+            if network is not None:
+                ip = _ip_key(record[TYPE], record[CONTENT])
+                if ip is None or ip[0] != network.version or not (
+                    int(network.network_address) <= ip[1] <= int(network.broadcast_address)
+                ):
+                    return False
+            if needle is not None:
+                values = [record[f].lower() for f in fields]
+                if match == "exact":
+                    return needle in values
+                if match == "prefix":
+                    return any(v.startswith(needle) for v in values)
+                return any(needle in v for v in values)
+            return True
+        
+        # Sources are (size, ID-ordered candidates); everything else is checked per record
+        sources = []
+        if domain is not None:
+            ids = self._by_domain.get(domain, [])
+            sources.append((len(ids), lambda: _from_sorted(ids, cursor)))
+        for keys, index in ((types, self._by_type), (teams, self._by_team)):
+            if keys is None:
+                continue
+            lists = [index.get(key, []) for key in keys]
+            sources.append((
+                sum(len(ids) for ids in lists),
+                lambda lists=lists: heapq.merge(*(_from_sorted(ids, cursor) for ids in lists))
+            ))
+        if network is not None:
+            sources.append(self._range(
+                [self._ips],
+                (network.version, int(network.network_address)),
+                (network.version, int(network.broadcast_address) + 1),
+                cursor
+            ))
+        if needle is not None and match in ("prefix", "exact"):
+            sources.append(self._range(
+                [self._names if f == NAME else self._contents for f in fields],
+                (needle,),
+                (needle + "\uffff",) if match == "prefix" else (needle + "\x00",),
+                cursor
+            ))
+        
+        # Past this size, walking all IDs in order finds a page of (dense) matches sooner
+        dense = 4 * (limit * max(len(self._ids), 1)) ** 0.5
+        size, source = min(sources, key=lambda source: source[0]) if sources else (None, None)
+        if source is not None and size <= dense:
+            candidates = source()
+        elif needle is not None and match == "substring":
+            self._ensure_blobs()
+            delta = sorted(id for id in self._delta if cursor is None or id > cursor)
+            candidates = _unique(heapq.merge(delta, *(self._scan(f, needle, cursor) for f in fields)))
+        else:
+            candidates = _from_sorted(self._ids, cursor)
+        
+        items = []
+        last_id = None
+        for id in candidates:
+            record = self._records.get(id)
+            if record is None or not matches(record):
+                continue
+            if len(items) == limit:
+                return {"items": items, "next_cursor": last_id}
+            last_id = id
+            items.append({
+                "id": record[NAMECOM_ID],
+                "domain": record[DOMAIN],
+                "name": record[NAME],
+                "type": record[TYPE],
+                "content": record[CONTENT],
+                "ttl": record[TTL],
+                "priority": record[PRIORITY]
+            })
+        return {"items": items, "next_cursor": None}
+    
+    def stats(self) -> dict:
+        """Get index size and build timing"""
+        return {
+            "records": len(self._records),
+            "domains": sum(1 for ids in self._by_domain.values() if ids),
+            "types": {t: len(ids) for t, ids in self._by_type.items() if ids},
+            "changed_since_scan_build": len(self._delta),
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 3)
+        }
+
+record_index = RecordIndex()
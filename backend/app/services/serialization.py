@@ -0,0 +1,110 @@
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+import orjson
+from fastapi.responses import StreamingResponse
+from app.services.profiling import TimedJSONResponse, record_span
+
+# Records encoded per chunk when streaming
+CHUNK_SIZE = 1000
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON with orjson (datetimes as ISO 8601, like FastAPI's encoder)"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(TimedJSONResponse):
+    """JSON response encoded with orjson
+    
+    Routes return it for content they built in the response model's shape
+    themselves, so FastAPI doesn't validate and re-encode it item by item.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return dumps(content)
+        finally:
+            record_span("serialization", time.perf_counter() - started)
+
+def _encode_items(items: List[Any], mapper: Callable[[Any], Any], ndjson: bool) -> bytes:
+    """Encode items as comma-separated JSON values, or NDJSON lines"""
+    started = time.perf_counter()
+    try:
+        if ndjson:
+            return b"".join(dumps(mapper(item)) + b"\n" for item in items)
+        # One orjson call per chunk; drop the list's brackets
+        return dumps([mapper(item) for item in items])[1:-1]
+    finally:
+        record_span("serialization", time.perf_counter() - started)
+
+def _chunks(items: List[Any]) -> Iterator[List[Any]]:
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+async def _pages(first: List[Any], rest: Optional[AsyncIterator[List[Any]]] = None) -> AsyncIterator[List[Any]]:
+    yield first
+    if rest is not None:
+        async for page in rest:
+            yield page
+
+async def _array(pages: AsyncIterator[List[Any]], mapper: Callable[[Any], Any], ndjson: bool):
+    """Yield the items of every page as one JSON array body (or NDJSON), a chunk at a time"""
+    if not ndjson:
+        yield b"["
+    separator = b""
+    async for page in pages:
+        for chunk in _chunks(page):
+            body = _encode_items(chunk, mapper, ndjson)
+            yield body if ndjson else separator + body
+            separator = b","
+    if not ndjson:
+        yield b"]"
+
+async def stream_pages(
+    pages: AsyncIterator[List[Any]],
+    mapper: Callable[[Any], Any],
+    ndjson: bool = False,
+    headers: Optional[dict] = None
+) -> StreamingResponse:
+    """Stream pages as a JSON array, or as NDJSON
+    
+    The first page is fetched before the response starts so upstream errors
+    still turn into a proper status code.
+    """
+    try:
+        first = await pages.__anext__()
+    except StopAsyncIteration:
+        first = []
+    return StreamingResponse(
+        _array(_pages(first, pages), mapper, ndjson),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers=headers
+    )
+
+async def _object(head: Dict[str, Any], key: str, items: List[Any], mapper: Callable[[Any], Any]):
+    yield (dumps(head)[:-1] + b"," if head else b"{") + dumps(key) + b":"
+    async for chunk in _array(_pages(items), mapper, False):
+        yield chunk
+    yield b"}"
+
+def stream_object(
+    head: Dict[str, Any],
+    key: str,
+    items: List[Any],
+    mapper: Callable[[Any], Any],
+    headers: Optional[dict] = None
+) -> StreamingResponse:
+    """Stream a JSON object whose last member, key, is a large array of mapped items"""
+    return StreamingResponse(_object(head, key, items, mapper), media_type="application/json", headers=headers)
+
+def json_response(
+    head: Dict[str, Any],
+    key: str,
+    items: Iterable[Any],
+    mapper: Callable[[Any], Any],
+    headers: Optional[dict] = None
+):
+    """Respond with head plus key: mapped items, streamed once there are more than a chunk of them"""
+    items = list(items)
+    if len(items) > CHUNK_SIZE:
+        return stream_object(head, key, items, mapper, headers)
+    return FastJSONResponse({**head, key: [mapper(item) for item in items]}, headers=headers)
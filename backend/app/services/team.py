@@ -1,104 +1,140 @@
 from typing import Optional, List
-from datetime import datetime
+from sqlalchemy import delete, select
+from app.db import async_session
+from app.db.tables import TeamMemberRow, TeamRow, UserRow, row_to_dict
 
 class TeamService:
     """Service for managing teams"""
     
-    def __init__(self):
-        self.teams = {}
-        self.members = {}  # team_id -> [user_ids]
-        self.counter = 1
-        self.member_counter = 1
-    
-    def create_team(self, name: str, owner_id: int, description: Optional[str] = None):
+    async def create_team(self, name: str, owner_id: int, description: Optional[str] = None):
         """Create team"""
-        team = {
-            "id": self.counter,
-            "name": name,
-            "description": description,
-            "owner_id": owner_id,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        self.teams[self.counter] = team
-        self.members[self.counter] = [
-            {
-                "member_id": self.member_counter,
-                "user_id": owner_id,
-                "role": "admin",
-                "joined_at": datetime.now()
-            }
-        ]
-        self.member_counter += 1
-        self.counter += 1
-        return team
+        team = TeamRow(name=name, description=description, owner_id=owner_id)
+        async with async_session() as session:
+            session.add(team)
+            await session.flush()
+            session.add(TeamMemberRow(team_id=team.id, user_id=owner_id, role="admin"))
+            await session.commit()
+        return row_to_dict(team)
     
-    def get_team(self, team_id: int):
+    async def get_team(self, team_id: int):
         """Get team by ID"""
-        return self.teams.get(team_id)
+        async with async_session() as session:
+            team = await session.get(TeamRow, team_id)
+        return row_to_dict(team) if team else None
     
-    def get_user_teams(self, user_id: int) -> List:
+    async def get_user_teams(self, user_id: int) -> List:
         """Get all teams for a user"""
-        user_teams = []
-        for team_id, members in self.members.items():
-            if any(m["user_id"] == user_id for m in members):
-                user_teams.append(self.teams[team_id])
-        return user_teams
+        async with async_session() as session:
+            teams = await session.scalars(
+                select(TeamRow)
+                .join(TeamMemberRow, TeamMemberRow.team_id == TeamRow.id)
+                .where(TeamMemberRow.user_id == user_id)
+            )
+            return [row_to_dict(team) for team in teams]
     
-    def add_member(self, team_id: int, user_id: int, role: str = "member"):
+    async def add_member(self, team_id: int, user_id: int, role: str = "member"):
         """Add member to team"""
-        if team_id in self.teams and team_id in self.members:
-            member = {
-                "member_id": self.member_counter,
-                "user_id": user_id,
-                "role": role,
-                "joined_at": datetime.now()
-            }
-            self.members[team_id].append(member)
-            self.member_counter += 1
-            return member
-        return None
+        async with async_session() as session:
+            if not await session.get(TeamRow, team_id):
+                return None
+            member = await self._get_member(session, team_id, user_id)
+            if member:
+                return self._member_dict(member)
+            member = TeamMemberRow(team_id=team_id, user_id=user_id, role=role)
+            session.add(member)
+            await session.commit()
+        return self._member_dict(member)
     
-    def get_team_members(self, team_id: int) -> List:
+    async def get_team_members(self, team_id: int) -> List:
         """Get all members of a team"""
-        return self.members.get(team_id, [])
+        async with async_session() as session:
+            rows = await session.execute(
+                select(TeamMemberRow, UserRow.username, UserRow.email)
+                .join(UserRow, UserRow.id == TeamMemberRow.user_id)
+                .where(TeamMemberRow.team_id == team_id)
+                .order_by(TeamMemberRow.member_id)
+            )
+            return [
+                {**self._member_dict(member), "username": username, "email": email}
+                for member, username, email in rows
+            ]
+    
+    async def is_member(self, team_id: int, user_id: int) -> bool:
+        """Check whether a user belongs to a team"""
+        async with async_session() as session:
+            return await self._get_member(session, team_id, user_id) is not None
     
-    def update_member_role(self, team_id: int, user_id: int, role: str):
+    async def update_member_role(self, team_id: int, user_id: int, role: str):
         """Update member role"""
-        if team_id in self.members:
-            for member in self.members[team_id]:
-                if member["user_id"] == user_id:
-                    member["role"] = role
-                    return member
-        return None
+        async with async_session() as session:
+            member = await self._get_member(session, team_id, user_id)
+            if not member:
+                return None
+            member.role = role
+            await session.commit()
+            return self._member_dict(member)
     
-    def remove_member(self, team_id: int, user_id: int):
+    async def remove_member(self, team_id: int, user_id: int):
         """Remove member from team"""
-        if team_id in self.members:
-            self.members[team_id] = [
-                m for m in self.members[team_id] if m["user_id"] != user_id
-            ]
+        async with async_session() as session:
+            if not await session.get(TeamRow, team_id):
+                return False
+            await session.execute(
+                delete(TeamMemberRow).where(
+                    TeamMemberRow.team_id == team_id,
+                    TeamMemberRow.user_id == user_id
+                )
+            )
+            await session.commit()
             return True
-        return False
     
-    def update_team(self, team_id: int, name: Optional[str] = None, description: Optional[str] = None):
+    async def update_team(
+        self,
+        team_id: int,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        write_coalesce_window: Optional[float] = None
+    ):
         """Update team"""
-        if team_id in self.teams:
+        async with async_session() as session:
+            team = await session.get(TeamRow, team_id)
+            if not team:
+                return None
             if name:
-                self.teams[team_id]["name"] = name
+                team.name = name
             if description:
-                self.teams[team_id]["description"] = description
-            self.teams[team_id]["updated_at"] = datetime.now()
-            return self.teams[team_id]
-        return None
+                team.description = description
+            if write_coalesce_window is not None:
+                team.write_coalesce_window = write_coalesce_window
+            await session.commit()
+            return row_to_dict(team)
     
-    def delete_team(self, team_id: int):
+    async def delete_team(self, team_id: int):
         """Delete team"""
-        if team_id in self.teams:
-            del self.teams[team_id]
-            if team_id in self.members:
-                del self.members[team_id]
+        async with async_session() as session:
+            team = await session.get(TeamRow, team_id)
+            if not team:
+                return False
+            await session.execute(delete(TeamMemberRow).where(TeamMemberRow.team_id == team_id))
+            await session.delete(team)
+            await session.commit()
             return True
-        return False
+    
+    async def _get_member(self, session, team_id: int, user_id: int) -> Optional[TeamMemberRow]:
+        """Look up one membership through the (team_id, user_id) unique index"""
+        return await session.scalar(
+            select(TeamMemberRow).where(
+                TeamMemberRow.team_id == team_id,
+                TeamMemberRow.user_id == user_id
+            )
+        )
+    
+    def _member_dict(self, member: TeamMemberRow) -> dict:
+        return {
+            "member_id": member.member_id,
+            "user_id": member.user_id,
+            "role": member.role,
+            "joined_at": member.joined_at
+        }
 
 team_service = TeamService()
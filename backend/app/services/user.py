@@ -1,73 +1,75 @@
 from typing import Optional
-from datetime import datetime
-import hashlib
+from sqlalchemy import select
+from app.auth.passwords import password_hasher
+from app.db import async_session
+from app.db.tables import UserRow, row_to_dict
+
+USER_FIELDS = {"username", "email", "full_name", "is_active"}
 
 class UserService:
     """Service for managing users"""
     
-    def __init__(self):
-        self.users = {}
-        self.counter = 1
-    
-    def create_user(self, username: str, email: str, password: str, full_name: Optional[str] = None):
+    async def create_user(self, username: str, email: str, password: str, full_name: Optional[str] = None):
         """Create user"""
-        user = {
-            "id": self.counter,
-            "username": username,
-            "email": email,
-            "password": self._hash_password(password),
-            "full_name": full_name,
-            "is_active": True,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        self.users[self.counter] = user
-        self.counter += 1
-        return user
+        user = UserRow(
+            username=username,
+            email=email,
+            password=await password_hasher.hash(password),
+            full_name=full_name,
+            is_active=True
+        )
+        async with async_session() as session:
+            session.add(user)
+            await session.commit()
+        return row_to_dict(user)
     
-    def get_user(self, user_id: int):
+    async def get_user(self, user_id: int):
         """Get user by ID"""
-        return self.users.get(user_id)
+        async with async_session() as session:
+            user = await session.get(UserRow, user_id)
+        return row_to_dict(user) if user else None
     
-    def get_user_by_username(self, username: str):
+    async def get_user_by_username(self, username: str):
         """Get user by username"""
-        for user in self.users.values():
-            if user["username"] == username:
-                return user
-        return None
+        async with async_session() as session:
+            user = await session.scalar(select(UserRow).where(UserRow.username == username))
+        return row_to_dict(user) if user else None
     
-    def get_user_by_email(self, email: str):
+    async def get_user_by_email(self, email: str):
         """Get user by email"""
-        for user in self.users.values():
-            if user["email"] == email:
-                return user
-        return None
-    
-    def verify_password(self, user: dict, password: str) -> bool:
-        """Verify password"""
-        return user["password"] == self._hash_password(password)
+        async with async_session() as session:
+            user = await session.scalar(select(UserRow).where(UserRow.email == email))
+        return row_to_dict(user) if user else None
     
-    def _hash_password(self, password: str) -> str:
-        """Hash password"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    async def verify_password(self, user: dict, password: str) -> bool:
+        """Verify password, upgrading legacy or outdated hashes on success"""
+        matches, needs_rehash = await password_hasher.verify(user["password"], password)
+        if matches and needs_rehash:
+            await self.update_user(user["id"], password=password)
+        return matches
     
-    def update_user(self, user_id: int, **kwargs):
+    async def update_user(self, user_id: int, **kwargs):
         """Update user"""
-        if user_id in self.users:
+        async with async_session() as session:
+            user = await session.get(UserRow, user_id)
+            if not user:
+                return None
             for key, value in kwargs.items():
-                if key != "password" and value is not None:
-                    self.users[user_id][key] = value
+                if key in USER_FIELDS and value is not None:
+                    setattr(user, key, value)
             if "password" in kwargs and kwargs["password"]:
-                self.users[user_id]["password"] = self._hash_password(kwargs["password"])
-            self.users[user_id]["updated_at"] = datetime.now()
-            return self.users[user_id]
-        return None
+                user.password = await password_hasher.hash(kwargs["password"])
+            await session.commit()
+            return row_to_dict(user)
     
-    def deactivate_user(self, user_id: int):
+    async def deactivate_user(self, user_id: int):
         """Deactivate user"""
-        if user_id in self.users:
-            self.users[user_id]["is_active"] = False
-            return self.users[user_id]
-        return None
+        async with async_session() as session:
+            user = await session.get(UserRow, user_id)
+            if not user:
+                return None
+            user.is_active = False
+            await session.commit()
+            return row_to_dict(user)
 
 user_service = UserService()
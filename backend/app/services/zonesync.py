@@ -0,0 +1,222 @@
+import shlex
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# Records name.com manages itself and that a zone file may still carry
+SKIPPED_TYPES = {"SOA"}
+# Types whose content is a host name
+HOST_TYPES = {"CNAME", "MX", "NS", "SRV", "ANAME"}
+
+def _normalize_name(name: Optional[str], domain_name: str) -> str:
+    """Get a record name relative to the zone, with "@" for the apex"""
+    name = (name or "").strip().lower().rstrip(".")
+    domain_name = domain_name.lower().rstrip(".")
+    if name in ("", "@", domain_name):
+        return "@"
+    if name.endswith("." + domain_name):
+        return name[: -len(domain_name) - 1]
+    return name
+
+def _normalize_content(type: str, content: Optional[str]) -> str:
+    content = (content or "").strip()
+    if type in HOST_TYPES:
+        return content.lower().rstrip(".")
+    return content
+
+def _managed(r: Dict[str, Any]) -> bool:
+    """Records name.com keeps for the zone itself: the SOA and the apex NS set"""
+    return r["type"] in SKIPPED_TYPES or (r["type"] == "NS" and r["name"] == "@")
+
+def normalize_record(record: Dict[str, Any], domain_name: str) -> Dict[str, Any]:
+    """Normalize a desired or name.com record into name/type/content/ttl/priority"""
+    type = (record.get("type") or "").upper()
+    priority = record.get("priority", record.get("mxPriority"))
+    return {
+        "id": record.get("recordId", record.get("id")),
+        "name": _normalize_name(record.get("name", record.get("host")), domain_name),
+        "type": type,
+        "content": _normalize_content(type, record.get("content", record.get("answer"))),
+        "ttl": record.get("ttl") or 3600,
+        "priority": priority
+    }
+
+def diff_records(
+    current: List[Dict[str, Any]],
+    desired: List[Dict[str, Any]],
+    domain_name: str
+) -> Dict[str, Any]:
+    """Compute the fewest record operations that turn `current` into `desired`
+    
+    Records are matched on (name, type, content); a matched pair with a
+    different TTL or priority becomes an update. Leftovers with the same
+    (name, type) are paired into content updates, which costs one call
+    instead of a delete plus a create. Records name.com manages (SOA, apex
+    NS) are left out on both sides. Runs in linear time.
+    """
+    current_by_key = defaultdict(list)
+    for record in current:
+        r = normalize_record(record, domain_name)
+        if _managed(r):
+            continue
+        current_by_key[(r["name"], r["type"], r["content"])].append(r)
+    
+    desired_by_key = {}
+    for record in desired:
+        r = normalize_record(record, domain_name)
+        if _managed(r):
+            continue
+        desired_by_key[(r["name"], r["type"], r["content"])] = r
+    
+    create, update, delete = [], [], []
+    unchanged = 0
+    leftover_current = defaultdict(list)
+    leftover_desired = defaultdict(list)
+    
+    for key, want in desired_by_key.items():
+        matches = current_by_key.pop(key, None)
+        if not matches:
+            leftover_desired[key[:2]].append(want)
+            continue
+        have = matches[0]
+        # Duplicates of the same record are redundant upstream
+        delete.extend(matches[1:])
+        if have["ttl"] != want["ttl"] or have["priority"] != want["priority"]:
+            update.append({**want, "id": have["id"]})
+        else:
+            unchanged += 1
+    
+    for key, records in current_by_key.items():
+        leftover_current[key[:2]].extend(records)
+    
+    for name_type, wants in leftover_desired.items():
+        haves = leftover_current.pop(name_type, [])
+        for have, want in zip(haves, wants):
+            update.append({**want, "id": have["id"]})
+        create.extend(wants[len(haves):])
+        delete.extend(haves[len(wants):])
+    
+    for haves in leftover_current.values():
+        delete.extend(haves)
+    
+    return {"create": create, "update": update, "delete": delete, "unchanged": unchanged}
+
+def plan_operations(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn a diff plan into NamecomService.apply_dns_changes operations, deletes first"""
+    operations = []
+    for r in plan["delete"]:
+        operations.append({"op": "delete", "record_id": r["id"]})
+    for r in plan["update"]:
+        operations.append({
+            "op": "update",
+            "record_id": r["id"],
+            "content": r["content"],
+            "ttl": r["ttl"],
+            "priority": r["priority"]
+        })
+    for r in plan["create"]:
+        operations.append({
+            "op": "create",
+            "name": "" if r["name"] == "@" else r["name"],
+            "type": r["type"],
+            "content": r["content"],
+            "ttl": r["ttl"],
+            "priority": r["priority"]
+        })
+    return operations
+
+def _zone_lines(text: str):
+    """Yield logical zone file lines, joining parentheses and dropping comments"""
+    buffer = ""
+    depth = 0
+    for raw in text.splitlines():
+        line = ""
+        in_quotes = False
+        for i, ch in enumerate(raw):
+            if ch == '"' and (i == 0 or raw[i - 1] != "\\"):
+                in_quotes = not in_quotes
+            elif ch == ";" and not in_quotes:
+                break
+            elif ch in "()" and not in_quotes:
+                depth += 1 if ch == "(" else -1
+                ch = " "
+            line += ch
+        # Keep leading whitespace: it means "same owner as the previous line"
+        buffer = buffer + " " + line.strip() if buffer else line.rstrip()
+        if depth <= 0 and buffer.strip():
+            yield buffer
+            buffer = ""
+            depth = 0
+    if buffer.strip():
+        yield buffer
+
+def parse_zone_file(text: str, domain_name: str) -> List[Dict[str, Any]]:
+    """Parse a BIND zone file into records with names relative to the zone"""
+    origin = domain_name.lower().rstrip(".")
+    default_ttl = 3600
+    last_owner = origin
+    records = []
+    
+    def absolute(host: str) -> str:
+        if host == "@":
+            return origin
+        if host.endswith("."):
+            return host.rstrip(".")
+        return f"{host}.{origin}"
+    
+    for line in _zone_lines(text):
+        try:
+            tokens = shlex.split(line, posix=True)
+        except ValueError as e:
+            raise ValueError(f"Invalid zone file line {line.strip()!r}: {e}")
+        if not tokens:
+            continue
+        
+        directive = tokens[0].upper()
+        if directive == "$ORIGIN":
+            origin = tokens[1].lower().rstrip(".")
+            continue
+        if directive == "$TTL":
+            default_ttl = int(tokens[1])
+            continue
+        if directive.startswith("$"):
+            raise ValueError(f"Unsupported zone file directive {tokens[0]}")
+        
+        if line[0].isspace():
+            owner = last_owner
+        else:
+            owner = absolute(tokens.pop(0).lower())
+            last_owner = owner
+        
+        ttl = default_ttl
+        while tokens and (tokens[0].isdigit() or tokens[0].upper() in ("IN", "CH", "HS")):
+            token = tokens.pop(0)
+            if token.isdigit():
+                ttl = int(token)
+        if not tokens:
+            raise ValueError(f"Missing record type in line {line.strip()!r}")
+        
+        type = tokens.pop(0).upper()
+        if type in SKIPPED_TYPES or (type == "NS" and owner == origin):
+            continue
+        if not tokens:
+            raise ValueError(f"Missing record data in line {line.strip()!r}")
+        
+        priority = None
+        if type in ("MX", "SRV"):
+            priority = int(tokens.pop(0))
+        if type == "TXT":
+            content = "".join(tokens)
+        elif type in HOST_TYPES:
+            tokens[-1] = absolute(tokens[-1].lower())
+            content = " ".join(tokens)
+        else:
+            content = " ".join(tokens)
+        
+        records.append({
+            "name": _normalize_name(owner, domain_name),
+            "type": type,
+            "content": content,
+            "ttl": ttl,
+            "priority": priority
+        })
+    return records
@@ -0,0 +1 @@
+"""Backend benchmarks (run from backend/: python -m benchmarks.<name>)"""
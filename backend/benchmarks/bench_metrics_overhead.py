@@ -0,0 +1,79 @@
+"""Per-request cost of the metrics and profiling middleware and hot-path instruments
+
+Drives a bare ASGI app directly (no server, no network) with and without
+MetricsMiddleware and ProfilingMiddleware and reports the difference per
+request, alongside the cost of a single histogram observation and counter
+increment.
+
+    python -m benchmarks.bench_metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from app.config import settings
+from app.services.metrics import Histogram, MetricsMiddleware, http_requests
+from app.services.profiling import ProfilingMiddleware
+
+class _Route:
+    def __init__(self, path, endpoint):
+        self.path = path
+        self.endpoint = endpoint
+
+async def endpoint():
+    pass
+
+async def bare_app(scope, receive, send):
+    scope["endpoint"] = endpoint
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+async def drive(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/domains/example.com",
+            "query_string": b"",
+            "headers": [(b"accept", b"application/json"), (b"authorization", b"Bearer x")]
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+def run(requests: int):
+    wrapped = MetricsMiddleware(bare_app, routes_of=lambda: [_Route("/api/domains/{domain_name}", endpoint)])
+    bare = asyncio.run(drive(bare_app, requests))
+    instrumented = asyncio.run(drive(wrapped, requests))
+    print(f"bare app:          {bare / requests * 1e6:7.2f} us/request")
+    print(f"with middleware:   {instrumented / requests * 1e6:7.2f} us/request")
+    print(f"overhead:          {(instrumented - bare) / requests * 1e6:7.2f} us/request\n")
+
+    profiled = asyncio.run(drive(ProfilingMiddleware(bare_app), requests))
+    print(f"profiling, sampler armed: {(profiled - bare) / requests * 1e6:7.2f} us/request")
+    settings.PROFILE_MAX_ACTIVE = 0
+    traced = asyncio.run(drive(ProfilingMiddleware(bare_app), requests))
+    print(f"profiling, trace only:    {(traced - bare) / requests * 1e6:7.2f} us/request\n")
+
+    histogram = Histogram("bench_seconds", "benchmark", ("route",))
+    child = histogram.labels("/api/domains")
+    started = time.perf_counter()
+    for _ in range(requests):
+        child.observe(0.003)
+    print(f"histogram observe: {(time.perf_counter() - started) / requests * 1e6:7.2f} us")
+    started = time.perf_counter()
+    for _ in range(requests):
+        http_requests.labels("GET", "/api/domains", "200").inc()
+    print(f"labelled counter:  {(time.perf_counter() - started) / requests * 1e6:7.2f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.requests)
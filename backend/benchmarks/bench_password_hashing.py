@@ -0,0 +1,60 @@
+"""Login throughput per scrypt cost setting
+
+For each cost, measures single-thread verifications per second (the
+per-core rate) and the rate through PasswordHasher's worker pool, plus
+how late a 1 ms event-loop ticker runs while a login storm is in flight.
+
+    python -m benchmarks.bench_password_hashing --costs 4096 16384 32768
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.auth.passwords import PasswordHasher
+
+async def loop_lag_during(coro) -> float:
+    """Run coro and return the worst delay seen by a 1 ms ticker meanwhile"""
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await coro
+    done = True
+    await task
+    return worst
+
+async def run(costs, logins: int, workers: int):
+    print(f"{'N':>8}{'per core/s':>14}{'pool/s':>12}{'ms/login':>12}{'loop lag ms':>14}   ({workers} workers)")
+    for n in costs:
+        hasher = PasswordHasher(n=n, workers=workers)
+        stored = hasher.hash_sync("correct horse battery staple")
+
+        rounds = max(logins // 4, 5)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            hasher.verify_sync(stored, "correct horse battery staple")
+        single = rounds / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        lag = await loop_lag_during(asyncio.gather(*(
+            hasher.verify(stored, "correct horse battery staple") for _ in range(logins)
+        )))
+        pooled = logins / (time.perf_counter() - started)
+        hasher.shutdown()
+        print(f"{n:>8}{single:>14.1f}{pooled:>12.1f}{1000 / single:>12.2f}{lag * 1000:>14.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=[4096, 8192, 16384, 32768])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+    asyncio.run(run(args.costs, args.logins, args.workers))
@@ -0,0 +1,102 @@
+"""Record search latency over a synthetic account
+
+Loads RecordIndex with generated records spread over many domains and
+times a set of typical incident-response queries (first page and a deep
+page), plus an incremental zone reindex.
+
+    python -m benchmarks.bench_record_search --records 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.search import RecordIndex
+
+TYPES = ["A", "A", "A", "AAAA", "CNAME", "CNAME", "MX", "TXT", "NS"]
+HOSTS = ["www", "api", "mail", "cdn", "static", "app", "vpn", "dev", "staging", "@"]
+
+def generate(records: int, domains: int, seed: int = 1):
+    rng = random.Random(seed)
+    for id in range(1, records + 1):
+        type = rng.choice(TYPES)
+        domain = f"domain{rng.randrange(domains)}.com"
+        if type == "A":
+            content = f"203.0.{rng.randrange(256)}.{rng.randrange(256)}"
+        elif type == "AAAA":
+            content = f"2001:db8::{rng.randrange(65536):x}"
+        elif type == "CNAME":
+            content = rng.choice(["old-cdn.example.net", "new-cdn.example.net", f"lb{rng.randrange(100)}.example.org"])
+        elif type == "MX":
+            content = f"mx{rng.randrange(3)}.mailhost.example"
+        elif type == "TXT":
+            content = f"v=spf1 include:_spf.example.com ~all {rng.randrange(10 ** 6)}"
+        else:
+            content = f"ns{rng.randrange(4)}.name.com"
+        yield {
+            "id": id,
+            "domain_name": domain,
+            "name": f"{rng.choice(HOSTS)}{rng.randrange(50)}",
+            "type": type,
+            "content": content,
+            "ttl": rng.choice([300, 3600, 86400]),
+            "priority": 10 if type == "MX" else None,
+            "namecom_id": id
+        }
+
+QUERIES = {
+    "exact ip": dict(q="203.0.113.7", match="exact", field="content"),
+    "cidr /24": dict(cidr="203.0.113.0/24"),
+    "cidr /16": dict(cidr="203.0.0.0/16"),
+    "cname to old cdn": dict(q="old-cdn", types=["CNAME"]),
+    "substring rare": dict(q="spf.example.com ~all 99999"),
+    "substring common": dict(q="cdn"),
+    "name prefix": dict(q="api1", match="prefix", field="name"),
+    "type MX": dict(types=["MX"]),
+    "domain": dict(domain="domain42.com"),
+    "ttl + type": dict(types=["AAAA"], ttl_min=86400),
+}
+
+def timed(fn, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples), result
+
+def run(records: int, domains: int, limit: int, repeat: int):
+    index = RecordIndex()
+    rows = list(generate(records, domains))
+    started = time.perf_counter()
+    index.load(rows)
+    print(f"loaded {records} records over {domains} domains in {time.perf_counter() - started:.2f}s\n")
+
+    print(f"{'query':<20}{'page 1 ms':>11}{'max':>9}{'page 5 ms':>11}{'hits':>7}")
+    for label, query in QUERIES.items():
+        first_ms, first_max, page = timed(lambda: index.search(limit=limit, **query), repeat)
+        cursor = page["next_cursor"]
+        for _ in range(3):
+            if cursor is None:
+                break
+            cursor = index.search(limit=limit, cursor=cursor, **query)["next_cursor"]
+        deep_ms, _, _ = timed(lambda: index.search(limit=limit, cursor=cursor, **query), repeat)
+        print(f"{label:<20}{first_ms:>11.2f}{first_max:>9.2f}{deep_ms:>11.2f}{len(page['items']):>7}")
+
+    zone = [r for r in rows if r["domain_name"] == "domain7.com"]
+    for r in zone[: len(zone) // 2]:
+        r["content"] = "198.51.100.1" if r["type"] == "A" else r["content"] + ".moved"
+    ms, _, _ = timed(lambda: index.replace_domain("domain7.com", zone), 1)
+    print(f"\nreindex of a {len(zone)}-record zone with {len(zone) // 2} changes: {ms:.2f} ms")
+    ms, _, page = timed(lambda: index.search(q="198.51.100.1", match="exact", field="content"), repeat)
+    print(f"exact search for the moved address: {ms:.2f} ms, {len(page['items'])} hits")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--domains", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.records, args.domains, args.limit, args.repeat)
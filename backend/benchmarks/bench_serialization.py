@@ -0,0 +1,141 @@
+"""Response serialization cost for large zones
+
+Drives bare FastAPI apps directly (no server, no network, no name.com)
+with zones of generated name.com records and compares, per zone size:
+
+- domain details validated against DomainWithRecords and encoded by
+  FastAPI, against the pre-shaped orjson path (streamed past one chunk)
+- the streamed record listing encoded one stdlib json.dumps per record,
+  against one orjson call per chunk
+
+Time is the median over --repeat requests; peak is the largest Python
+allocation while one response is produced (tracemalloc, separate run).
+
+    python -m benchmarks.bench_serialization --sizes 1000,10000,100000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.api.domains import _domain_head, _domain_with_records, _record_detail, _record_summary
+from app.models.domain import DomainWithRecords
+from app.services.serialization import json_response, stream_pages
+from benchmarks.fakes import generate_account
+
+DOMAIN = "bench0.example"
+
+def build_app(records: list) -> FastAPI:
+    app = FastAPI()
+    info = {"domainName": DOMAIN, "domainId": 1}
+
+    @app.get("/validated", response_model=DomainWithRecords)
+    async def validated():
+        return _domain_with_records(DOMAIN, info, records)
+
+    @app.get("/fast")
+    async def fast():
+        return json_response(_domain_head(info), "records", records, lambda r: _record_detail(r, DOMAIN))
+
+    async def pages():
+        for start in range(0, len(records), 1000):
+            yield records[start:start + 1000]
+
+    @app.get("/list-stdlib")
+    async def list_stdlib():
+        async def body():
+            yield "["
+            separator = ""
+            async for page in pages():
+                yield separator + ",".join(json.dumps(_record_summary(r)) for r in page)
+                separator = ","
+            yield "]"
+        return StreamingResponse(body(), media_type="application/json")
+
+    @app.get("/list-fast")
+    async def list_fast():
+        return await stream_pages(pages(), _record_summary)
+
+    return app
+
+async def request(app: FastAPI, path: str) -> int:
+    """Run one GET through the app, discarding the body; returns its size"""
+    size = 0
+    received = asyncio.Event()
+
+    async def receive():
+        if received.is_set():
+            # Streaming responses listen for a disconnect until they finish
+            await asyncio.Event().wait()
+        received.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80)
+    }
+    await app(scope, receive, send)
+    return size
+
+async def timed(app: FastAPI, path: str, repeat: int):
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = await request(app, path)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), size
+
+async def peak(app: FastAPI, path: str) -> float:
+    tracemalloc.start()
+    try:
+        await request(app, path)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+async def run(sizes: list, repeat: int):
+    print(f"{'records':>8}  {'path':<28}{'ms':>10}{'peak MB':>10}{'body MB':>10}{'speedup':>9}")
+    for records in sizes:
+        zones, _ = generate_account(1, records)
+        app = build_app(list(zones[DOMAIN].values()))
+        for label, (baseline, fast) in {
+            "domain details": ("/validated", "/fast"),
+            "streamed record list": ("/list-stdlib", "/list-fast")
+        }.items():
+            base_ms, size = await timed(app, baseline, repeat)
+            fast_ms, fast_size = await timed(app, fast, repeat)
+            if label == "domain details":
+                # Same document either way
+                assert size == fast_size, (size, fast_size)
+            base_peak = await peak(app, baseline)
+            fast_peak = await peak(app, fast)
+            print(f"{records:>8}  {label + ', before':<28}{base_ms:>10.1f}{base_peak:>10.1f}{size / 2 ** 20:>10.1f}")
+            print(f"{records:>8}  {label + ', fast':<28}{fast_ms:>10.1f}{fast_peak:>10.1f}{fast_size / 2 ** 20:>10.1f}{base_ms / fast_ms:>8.1f}x")
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated zone sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run([int(size) for size in args.sizes.split(",")], args.repeat))
@@ -0,0 +1,87 @@
+"""Micro-benchmark for indexed user and team membership lookups
+
+Seeds a scratch SQLite database with N users and N/10 teams (each user in
+two teams) and times the lookups on the login, register and team paths.
+Latency should stay flat as N grows.
+
+    python -m benchmarks.bench_user_lookups --users 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="bench-users-")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DIR}/bench.db"
+os.environ["DB_AUTO_CREATE"] = "True"
+
+from sqlalchemy import delete, insert  # noqa: E402
+from app.db import async_session, engine, init_db  # noqa: E402
+from app.db.tables import TeamMemberRow, TeamRow, UserRow  # noqa: E402
+from app.services.team import team_service  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+
+BATCH = 5000
+
+async def seed(users: int):
+    teams = max(users // 10, 1)
+    async with async_session() as session:
+        for table in (TeamMemberRow, TeamRow, UserRow):
+            await session.execute(delete(table))
+        for start in range(0, users, BATCH):
+            await session.execute(insert(UserRow), [
+                {
+                    "id": i + 1,
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password": "x",
+                    "is_active": True
+                }
+                for i in range(start, min(start + BATCH, users))
+            ])
+        await session.execute(insert(TeamRow), [
+            {"id": t + 1, "name": f"team{t}", "owner_id": t + 1} for t in range(teams)
+        ])
+        for start in range(0, users, BATCH):
+            rows = []
+            for i in range(start, min(start + BATCH, users)):
+                rows.append({"team_id": i % teams + 1, "user_id": i + 1, "role": "member"})
+                rows.append({"team_id": (i * 7 + 3) % teams + 1, "user_id": i + 1, "role": "member"})
+            # Both picks can land on the same team for small team counts
+            await session.execute(insert(TeamMemberRow).prefix_with("OR IGNORE"), rows)
+        await session.commit()
+    return teams
+
+async def timed(label: str, calls, rounds: int) -> str:
+    started = time.perf_counter()
+    for call in calls[:rounds]:
+        await call()
+    elapsed = time.perf_counter() - started
+    return f"{label:<26}{elapsed / rounds * 1e6:>10.1f} us"
+
+async def run(sizes, rounds: int):
+    await init_db()
+    for users in sizes:
+        teams = await seed(users)
+        picks = [random.randrange(users) for _ in range(rounds)]
+        team_picks = [random.randrange(teams) + 1 for _ in range(rounds)]
+        print(f"\n{users} users, {teams} teams ({rounds} lookups each)")
+        for line in [
+            await timed("get_user_by_username", [lambda i=i: user_service.get_user_by_username(f"user{i}") for i in picks], rounds),
+            await timed("get_user_by_email", [lambda i=i: user_service.get_user_by_email(f"user{i}@example.com") for i in picks], rounds),
+            await timed("get_user_teams", [lambda i=i: team_service.get_user_teams(i + 1) for i in picks], rounds),
+            await timed("update_member_role", [
+                lambda i=i, t=t: team_service.update_member_role(t, i + 1, "member") for i, t in zip(picks, team_picks)
+            ], rounds),
+        ]:
+            print("  " + line)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.rounds))
@@ -0,0 +1,239 @@
+"""Local stand-ins for the name.com v4 API and Vault, for benchmarks and load tests
+
+The name.com fake serves a generated account (domains, records, nextPage
+pagination, record CRUD and /hello) with configurable latency and fault
+injection. The Vault fake is an in-memory KV v2 store with token lookup.
+
+    python -m benchmarks.fakes namecom --port 18080 --domains 50 --records 200 --latency 20
+    python -m benchmarks.fakes vault --port 18200 --token bench-vault-token
+
+Point the backend at them with NAMECOM_BASE_URL=http://127.0.0.1:18080/v4,
+VAULT_ADDR=http://127.0.0.1:18200 and VAULT_TOKEN.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+NAMECOM_SECRET_PATH = "secret/data/namecom"
+
+def generate_account(domains: int, records: int, seed: int = 1):
+    """Build the fake account: {domain_name: {record_id: record}} and the next free record ID"""
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    zones = {}
+    for d in range(domains):
+        name = f"bench{d}.example"
+        zone = {}
+        for r in range(records):
+            type = rng.choice(["A", "A", "AAAA", "CNAME", "MX", "TXT"])
+            if type == "A":
+                answer = f"203.0.{rng.randrange(256)}.{rng.randrange(256)}"
+            elif type == "AAAA":
+                answer = f"2001:db8::{rng.randrange(65536):x}"
+            elif type == "CNAME":
+                answer = f"lb{rng.randrange(20)}.example.net"
+            elif type == "MX":
+                answer = f"mx{rng.randrange(3)}.example.net"
+            else:
+                answer = f"v=spf1 include:_spf.example.net ~all {r}"
+            record_id = next(ids)
+            zone[record_id] = _record(name, record_id, f"host{r}", type, answer, 300, 10 if type == "MX" else None)
+        zones[name] = zone
+    return zones, ids
+
+def _record(domain: str, record_id: int, host: str, type: str, answer: str, ttl: int, priority=None) -> dict:
+    record = {
+        "id": record_id,
+        "recordId": record_id,
+        "domainName": domain,
+        "host": host,
+        "name": host,
+        "fqdn": f"{host}.{domain}.",
+        "type": type,
+        "answer": answer,
+        "ttl": ttl
+    }
+    if priority is not None:
+        record["mxPriority"] = priority
+    return record
+
+def _page(request: Request, items: list, key: str) -> JSONResponse:
+    per_page = max(1, min(int(request.query_params.get("perPage", 1000)), 1000))
+    page = max(1, int(request.query_params.get("page", 1)))
+    start = (page - 1) * per_page
+    body = {key: items[start:start + per_page]}
+    if start + per_page < len(items):
+        body["nextPage"] = page + 1
+        body["lastPage"] = (len(items) + per_page - 1) // per_page
+    return JSONResponse(body)
+
+def create_namecom_app(
+    domains: int = 50,
+    records: int = 200,
+    latency: float = 0,
+    jitter: float = 0,
+    error_rate: float = 0,
+    throttle_rate: float = 0,
+    seed: int = 1
+) -> Starlette:
+    """Fake name.com v4 API; latency and jitter are in milliseconds"""
+    zones, ids = generate_account(domains, records, seed)
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    async def inject_faults():
+        stats["requests"] += 1
+        delay = latency + rng.uniform(-jitter, jitter) if jitter else latency
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if throttle_rate and rng.random() < throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse({"message": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"message": "Internal Server Error"}, status_code=503)
+        return None
+
+    def zone_or_404(request: Request):
+        return zones.get(request.path_params["domain"].lower())
+
+    async def hello(request: Request):
+        return await inject_faults() or JSONResponse({"motd": "fake name.com", "username": "bench"})
+
+    async def list_domains(request: Request):
+        fault = await inject_faults()
+        if fault:
+            return fault
+        return _page(request, [{"domainName": name, "domainId": i + 1} for i, name in enumerate(zones)], "domains")
+
+    async def get_domain(request: Request):
+        fault = await inject_faults()
+        if fault:
+            return fault
+        name = request.path_params["domain"].lower()
+        if name not in zones:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        return JSONResponse({"domainName": name, "domainId": list(zones).index(name) + 1, "locked": True})
+
+    async def records_collection(request: Request):
+        fault = await inject_faults()
+        if fault:
+            return fault
+        zone = zone_or_404(request)
+        if zone is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        if request.method == "GET":
+            return _page(request, list(zone.values()), "records")
+        data = await request.json()
+        record_id = next(ids)
+        domain = request.path_params["domain"].lower()
+        zone[record_id] = _record(
+            domain,
+            record_id,
+            data.get("host", data.get("name", "")),
+            data.get("type", "A"),
+            data.get("answer", data.get("content", "")),
+            data.get("ttl", 300),
+            data.get("priority", data.get("mxPriority"))
+        )
+        return JSONResponse(zone[record_id])
+
+    async def record_item(request: Request):
+        fault = await inject_faults()
+        if fault:
+            return fault
+        zone = zone_or_404(request)
+        record = zone.get(int(request.path_params["record_id"])) if zone is not None else None
+        if record is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        if request.method == "GET":
+            return JSONResponse(record)
+        if request.method == "DELETE":
+            del zone[record["recordId"]]
+            return JSONResponse({})
+        data = await request.json()
+        if data.get("answer", data.get("content")):
+            record["answer"] = data.get("answer", data.get("content"))
+        if data.get("ttl"):
+            record["ttl"] = data["ttl"]
+        if data.get("priority") is not None:
+            record["mxPriority"] = data["priority"]
+        return JSONResponse(record)
+
+    async def fake_stats(request: Request):
+        return JSONResponse({**stats, "domains": len(zones), "records": sum(len(z) for z in zones.values())})
+
+    return Starlette(routes=[
+        Route("/v4/hello", hello),
+        Route("/v4/domains", list_domains),
+        Route("/v4/domains/{domain}", get_domain),
+        Route("/v4/domains/{domain}/records", records_collection, methods=["GET", "POST"]),
+        Route("/v4/domains/{domain}/records/{record_id:int}", record_item, methods=["GET", "PUT", "DELETE"]),
+        Route("/_stats", fake_stats)
+    ])
+
+def create_vault_app(token: str, secrets: dict) -> Starlette:
+    """Fake Vault KV v2 store; secrets are keyed by the path the backend passes to hvac"""
+    store = {path: {"data": data, "version": 1} for path, data in secrets.items()}
+
+    def authorized(request: Request) -> bool:
+        return request.headers.get("x-vault-token") == token
+
+    async def lookup_self(request: Request):
+        if not authorized(request):
+            return JSONResponse({"errors": ["permission denied"]}, status_code=403)
+        return JSONResponse({"data": {"id": token, "ttl": 0, "policies": ["root"]}})
+
+    async def kv(request: Request):
+        if not authorized(request):
+            return JSONResponse({"errors": ["permission denied"]}, status_code=403)
+        path = request.path_params["path"]
+        if request.method == "GET":
+            secret = store.get(path)
+            if secret is None:
+                return JSONResponse({"errors": []}, status_code=404)
+            return JSONResponse({
+                "data": {"data": secret["data"], "metadata": {"version": secret["version"]}},
+                "lease_duration": 0
+            })
+        if request.method == "DELETE":
+            store.pop(path, None)
+            return JSONResponse({}, status_code=204)
+        body = await request.json()
+        version = store.get(path, {"version": 0})["version"] + 1
+        store[path] = {"data": body.get("data", {}), "version": version}
+        return JSONResponse({"data": {"version": version}})
+
+    return Starlette(routes=[
+        Route("/v1/auth/token/lookup-self", lookup_self),
+        Route("/v1/secret/data/{path:path}", kv, methods=["GET", "POST", "PUT", "DELETE"])
+    ])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=["namecom", "vault"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--domains", type=int, default=50)
+    parser.add_argument("--records", type=int, default=200, help="Records per domain")
+    parser.add_argument("--latency", type=float, default=0, help="Added latency per call (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="Latency jitter, +/- ms")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of calls failing with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Share of calls answered with 429")
+    parser.add_argument("--token", default="bench-vault-token", help="Vault token to accept")
+    parser.add_argument("--namecom-token", default="bench-namecom-token", help="name.com token stored in Vault")
+    args = parser.parse_args()
+
+    if args.service == "namecom":
+        app = create_namecom_app(args.domains, args.records, args.latency, args.jitter, args.error_rate, args.throttle_rate)
+    else:
+        app = create_vault_app(args.token, {NAMECOM_SECRET_PATH: {"api_token": args.namecom_token, "username": "bench"}})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
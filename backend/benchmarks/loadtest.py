@@ -0,0 +1,393 @@
+"""Load test the backend against local name.com and Vault stand-ins
+
+Starts the fakes from benchmarks.fakes and the app from main.py under
+uvicorn, each in its own process with a scratch SQLite database, then
+drives request mixes at fixed concurrency levels over HTTP. For each
+scenario and level it reports throughput, p50/p95/p99 latency (overall and
+per operation), errors and the app's resident memory, and saves the results
+as JSON. With --baseline, the run is compared against an earlier results
+file and the exit status is 1 if throughput or p95 latency regressed by
+more than --tolerance.
+
+    python -m benchmarks.loadtest --scenarios read,mixed --concurrency 1,10,50 --duration 10
+    python -m benchmarks.loadtest --upstream-latency 30 --upstream-error-rate 0.01
+    python -m benchmarks.loadtest --baseline benchmarks/results/baseline.json
+
+The app's name.com rate limit is raised to 1000/s by default so the numbers
+reflect the service rather than the throttle; override with --env.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+VAULT_TOKEN = "bench-vault-token"
+PASSWORD = "bench-password"
+
+# Operation weights per scenario
+SCENARIOS = {
+    "read": {"login": 2, "list_domains": 28, "domain_details": 35, "list_records": 35},
+    "write": {"create_record": 45, "update_record": 30, "delete_record": 20, "list_records": 5},
+    "mixed": {
+        "login": 2,
+        "list_domains": 18,
+        "domain_details": 25,
+        "list_records": 25,
+        "create_record": 12,
+        "update_record": 12,
+        "delete_record": 6
+    }
+}
+
+DEFAULT_ENV = {
+    "NAMECOM_RATE_LIMIT": "1000",
+    "NAMECOM_RATE_BURST": "1000",
+    "DEBUG": "False",
+    "DB_AUTO_CREATE": "True"
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def memory_mb(pid: int) -> dict:
+    """Resident and peak resident memory of a process (Linux only)"""
+    usage = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    usage["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+def percentile(ordered: list, pct: float):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """Throughput and latency percentiles (ms) of (latency, outcome) samples
+    
+    The outcome is the HTTP status, or the exception name for transport errors.
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    errors = {}
+    for _, outcome in samples:
+        if isinstance(outcome, str) or outcome >= 400:
+            errors[str(outcome)] = errors.get(str(outcome), 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None
+    }
+
+class Stack:
+    """The fakes and the app under test, each in a subprocess"""
+
+    def __init__(self, args):
+        self.args = args
+        self.scratch = tempfile.mkdtemp(prefix="bench-load-")
+        self.processes = []
+        self.app_pid = None
+        self.base_url = None
+
+    def _spawn(self, command: list, env: dict = None):
+        process = subprocess.Popen(
+            [sys.executable, *command],
+            cwd=BACKEND_DIR,
+            env={**os.environ, **(env or {})},
+            stdout=subprocess.DEVNULL,
+            stderr=open(os.path.join(self.scratch, f"{command[1].replace('.', '_')}-{len(self.processes)}.log"), "w")
+        )
+        self.processes.append(process)
+        return process
+
+    async def start(self):
+        args = self.args
+        namecom_port, vault_port, app_port = free_port(), free_port(), free_port()
+        self._spawn([
+            "-m", "benchmarks.fakes", "namecom",
+            "--port", str(namecom_port),
+            "--domains", str(args.domains),
+            "--records", str(args.records),
+            "--latency", str(args.upstream_latency),
+            "--jitter", str(args.upstream_jitter),
+            "--error-rate", str(args.upstream_error_rate),
+            "--throttle-rate", str(args.upstream_throttle_rate)
+        ])
+        self._spawn(["-m", "benchmarks.fakes", "vault", "--port", str(vault_port), "--token", VAULT_TOKEN])
+        env = {
+            **DEFAULT_ENV,
+            "NAMECOM_BASE_URL": f"http://127.0.0.1:{namecom_port}/v4",
+            "NAMECOM_API_TOKEN": "bench-namecom-token",
+            "VAULT_ADDR": f"http://127.0.0.1:{vault_port}",
+            "VAULT_TOKEN": VAULT_TOKEN,
+            "DATABASE_URL": f"sqlite:///{self.scratch}/bench.db",
+            **dict(item.split("=", 1) for item in args.env)
+        }
+        app = self._spawn(["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"], env)
+        self.app_pid = app.pid
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        await self._wait_ready()
+
+    async def _wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(base_url=self.base_url) as client:
+            while time.monotonic() < deadline:
+                for process in self.processes:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"{' '.join(process.args[1:4])} exited early; see logs in {self.scratch}")
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"App not ready after {timeout}s; see logs in {self.scratch}")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+class Worker:
+    """One simulated client issuing operations back to back"""
+
+    def __init__(self, client: httpx.AsyncClient, username: str, token: str, domains: list, seed: int):
+        self.client = client
+        self.username = username
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.domains = domains
+        self.rng = random.Random(seed)
+        # Records this worker created, so updates and deletes never collide with other workers
+        self.owned = []
+
+    def _domain(self) -> str:
+        return self.rng.choice(self.domains)
+
+    async def login(self):
+        return await self.client.post("/api/auth/login", json={"username": self.username, "password": PASSWORD})
+
+    async def list_domains(self):
+        return await self.client.get("/api/domains", headers=self.headers)
+
+    async def domain_details(self):
+        return await self.client.get(f"/api/domains/{self._domain()}", headers=self.headers)
+
+    async def list_records(self):
+        return await self.client.get(f"/api/domains/{self._domain()}/records", headers=self.headers)
+
+    async def create_record(self):
+        domain = self._domain()
+        response = await self.client.post(f"/api/domains/{domain}/records", headers=self.headers, json={
+            "name": f"load{self.rng.randrange(10 ** 6)}",
+            "type": "A",
+            "content": f"198.51.100.{self.rng.randrange(256)}",
+            "ttl": 300
+        })
+        if response.status_code == 200:
+            record_id = response.json().get("record", {}).get("recordId")
+            if record_id is not None:
+                self.owned.append((domain, record_id))
+        return response
+
+    async def update_record(self):
+        if not self.owned:
+            return await self.create_record()
+        domain, record_id = self.rng.choice(self.owned)
+        return await self.client.put(
+            f"/api/domains/{domain}/records/{record_id}",
+            headers=self.headers,
+            json={"content": f"198.51.100.{self.rng.randrange(256)}"}
+        )
+
+    async def delete_record(self):
+        if not self.owned:
+            return await self.create_record()
+        domain, record_id = self.owned.pop(self.rng.randrange(len(self.owned)))
+        return await self.client.delete(f"/api/domains/{domain}/records/{record_id}", headers=self.headers)
+
+    async def run(self, weights: dict, deadline: float, samples: dict):
+        operations = list(weights)
+        cumulative = list(weights.values())
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(operations, weights=cumulative)[0]
+            started = time.perf_counter()
+            try:
+                outcome = (await getattr(self, operation)()).status_code
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            samples.setdefault(operation, []).append((time.perf_counter() - started, outcome))
+
+async def register(client: httpx.AsyncClient, username: str) -> str:
+    await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+        "full_name": "Load Test"
+    })
+    response = await client.post("/api/auth/login", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_level(stack: Stack, scenario: str, concurrency: int, args) -> dict:
+    """Drive one scenario at one concurrency level (after a warmup) and summarize it"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=stack.base_url, limits=limits, timeout=60) as client:
+        username = f"load-{scenario}-{concurrency}"
+        token = await register(client, username)
+        domains = [f"bench{d}.example" for d in range(args.domains)]
+        workers = [Worker(client, username, token, domains, seed=i) for i in range(concurrency)]
+        weights = SCENARIOS[scenario]
+
+        if args.warmup:
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*(worker.run(weights, deadline, {}) for worker in workers))
+
+        samples = {}
+        started = time.monotonic()
+        await asyncio.gather(*(worker.run(weights, started + args.duration, samples) for worker in workers))
+        elapsed = time.monotonic() - started
+
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        **summarize([sample for per_op in samples.values() for sample in per_op], elapsed),
+        **memory_mb(stack.app_pid),
+        "operations": {operation: summarize(per_op, elapsed) for operation, per_op in sorted(samples.items())}
+    }
+    return result
+
+def print_result(result: dict):
+    print(
+        f"{result['scenario']:<8}{result['concurrency']:>6}{result['rps']:>10}{result['p50_ms']:>10}"
+        f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}{result['rss_mb'] or '-':>9}"
+    )
+    for operation, stats in result["operations"].items():
+        print(
+            f"  {operation:<16}{stats['rps']:>8}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}"
+        )
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """List regressions of throughput or p95 latency beyond the tolerance"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        if before["rps"] and result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['rps']} -> {result['rps']} req/s")
+        # Ignore sub-millisecond wobble on very fast paths
+        if before["p95_ms"] is not None and result["p95_ms"] > max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + 1):
+            regressions.append(f"{label}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+async def main(args) -> int:
+    stack = Stack(args)
+    await stack.start()
+    results = []
+    try:
+        print(f"{'scenario':<8}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'rss MB':>9}")
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_level(stack, scenario, concurrency, args)
+                print_result(result)
+                results.append(result)
+        memory = memory_mb(stack.app_pid)
+    finally:
+        stack.stop()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "domains": args.domains,
+            "records": args.records,
+            "upstream_latency_ms": args.upstream_latency,
+            "upstream_jitter_ms": args.upstream_jitter,
+            "upstream_error_rate": args.upstream_error_rate,
+            "upstream_throttle_rate": args.upstream_throttle_rate,
+            "env": args.env,
+            "peak_rss_mb": memory["peak_rss_mb"]
+        },
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\npeak app memory {memory['peak_rss_mb']} MB; results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=["read", "write", "mixed"])
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds measured per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each level")
+    parser.add_argument("--domains", type=int, default=50)
+    parser.add_argument("--records", type=int, default=200, help="Records per domain")
+    parser.add_argument("--upstream-latency", type=float, default=20, help="Fake name.com latency (ms)")
+    parser.add_argument("--upstream-jitter", type=float, default=5, help="Fake name.com jitter, +/- ms")
+    parser.add_argument("--upstream-error-rate", type=float, default=0)
+    parser.add_argument("--upstream-throttle-rate", type=float, default=0)
+    parser.add_argument("--env", action="append", default=[], help="Extra app setting, KEY=VALUE (repeatable)")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    sys.exit(asyncio.run(main(args)))
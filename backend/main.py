@@ -1,14 +1,101 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.api import auth_router, teams_router, domains_router
+from app.api import auth_router, teams_router, domains_router, records_router, profiling_router, jobs_router
 from app.config import settings
+from app.services.namecom import namecom_service
+from app.services.accounts import namecom_registry
+from app.services.mirror import zone_mirror
+from app.services.search import record_index
+from app.services.health import health_monitor
+from app.services.jobs import job_queue
+from app.services.outbox import record_outbox
+from app.services.profiling import ProfilingMiddleware, TimedJSONResponse
+from app.services.metrics import MetricsMiddleware, account_stats, cache_stats, export_stats, metrics, upstream_stats
+from app.auth.vault import vault_service
+from app.auth.jwt import jwt_service
+from app.auth.dependencies import get_current_user, get_current_admin_user
+from app.auth.passwords import password_hasher
+from app.db import init_db, ping_db, close_db
+
+logger = logging.getLogger(__name__)
+
+def apply_namecom_credentials(credentials: dict):
+    """Point the name.com client at credentials read from Vault"""
+    if credentials.get("api_token"):
+        namecom_service.set_credentials(credentials["api_token"], credentials.get("username"))
+
+async def load_namecom_credentials():
+    """Use name.com credentials from Vault and follow their rotation"""
+    try:
+        apply_namecom_credentials(await vault_service.get_namecom_credentials())
+    except Exception as e:
+        logger.warning("Using name.com credentials from the environment: %s", e)
+    vault_service.subscribe(settings.VAULT_SECRET_PATH, apply_namecom_credentials)
+
+def collect_service_metrics():
+    """Copy cache, limiter and circuit breaker counters into gauges at scrape time"""
+    export_stats(cache_stats, namecom_service.cache_stats(), "namecom")
+    export_stats(cache_stats, jwt_service.cache_stats(), "jwt")
+    upstream = namecom_service.upstream_stats()
+    export_stats(upstream_stats, upstream)
+    upstream_stats.labels("breaker_open").set(float(upstream["breaker"]["state"] != "closed"))
+    # One series set per live client; at most NAMECOM_MAX_CLIENTS accounts, and evicted ones drop out
+    registry = namecom_registry.stats()
+    export_stats(upstream_stats, {key: registry[key] for key in ("accounts", "created", "evicted")}, prefix="registry_")
+    account_stats.clear()
+    for account, client in registry["clients"].items():
+        export_stats(account_stats, client, account)
+        account_stats.labels(account, "breaker_open").set(float(client["breaker"]["state"] != "closed"))
+
+metrics.add_collector(collect_service_metrics)
+
+async def check_admin(credentials):
+    """Resolve credentials to an admin user, as the admin routes do"""
+    return await get_current_admin_user(await get_current_user(credentials))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    if settings.VAULT_TOKEN:
+        await load_namecom_credentials()
+        vault_service.start()
+    record_index.start()
+    if settings.ZONE_MIRROR_ENABLED:
+        zone_mirror.subscribe(record_index.reindex_domain)
+        zone_mirror.subscribe_removed(record_index.drop_domain)
+        zone_mirror.start()
+    health_monitor.register("database", ping_db)
+    if settings.VAULT_TOKEN:
+        health_monitor.register("vault", vault_service.check_token)
+    health_monitor.register("namecom", namecom_service.ping, required=settings.HEALTH_NAMECOM_REQUIRED)
+    health_monitor.start()
+    job_queue.start()
+    record_outbox.start()
+    yield
+    # Finish in-flight record writes, hand running jobs back at their checkpoints,
+    # then release pooled upstream and database connections
+    await record_outbox.stop()
+    await job_queue.stop()
+    await health_monitor.stop()
+    await zone_mirror.stop()
+    await vault_service.stop()
+    password_hasher.shutdown()
+    await namecom_registry.close()
+    await namecom_service.close()
+    await close_db()
 
 # Create FastAPI app
 app = FastAPI(
     title="DNS API Management Platform",
     description="Beautiful UI for DNS API management with name.com integration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,10 +107,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request time breakdown, on-demand profiles and the slow request log
+app.add_middleware(ProfilingMiddleware, is_admin=check_admin)
+
+# Per-route latency, status and in-flight requests
+app.add_middleware(MetricsMiddleware, routes_of=lambda: app.routes)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(teams_router)
 app.include_router(domains_router)
+app.include_router(records_router)
+app.include_router(profiling_router)
+app.include_router(jobs_router)
 
 # Root endpoint
 @app.get("/")
@@ -35,9 +131,27 @@ async def root():
         "health": "/health"
     }
 
+def health_report(probes: Optional[Iterable[str]] = None):
+    """Cached results of the given background probes (all of them for None); 503 unless they pass"""
+    report = health_monitor.readiness(probes)
+    if report["status"] != "ready":
+        return JSONResponse(report, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return report
+
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness: the process is up and serving requests; no dependency is consulted"""
+    return health_report(())
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: every registered dependency probe"""
+    return health_report()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
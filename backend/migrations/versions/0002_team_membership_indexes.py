@@ -0,0 +1,28 @@
+"""team membership indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 13:16:08.874946
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Drop duplicate memberships so the unique constraint can be created
+    op.execute(
+        "DELETE FROM team_members WHERE member_id NOT IN "
+        "(SELECT MIN(member_id) FROM team_members GROUP BY team_id, user_id)"
+    )
+    op.create_index(op.f('ix_team_members_user_id'), 'team_members', ['user_id'], unique=False)
+    with op.batch_alter_table('team_members') as batch_op:
+        batch_op.create_unique_constraint('uq_team_members_team_user', ['team_id', 'user_id'])
+
+def downgrade():
+    with op.batch_alter_table('team_members') as batch_op:
+        batch_op.drop_constraint('uq_team_members_team_user', type_='unique')
+    op.drop_index(op.f('ix_team_members_user_id'), table_name='team_members')
@@ -0,0 +1,28 @@
+"""zone listing indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 13:16:58.035011
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Composite (parent, id) indexes replace the single-column ones for keyset paging
+    op.drop_index('ix_dns_records_domain_id', table_name='dns_records')
+    op.create_index('ix_dns_records_domain_id_id', 'dns_records', ['domain_id', 'id'], unique=False)
+    op.create_index('ix_dns_records_domain_id_name_type', 'dns_records', ['domain_id', 'name', 'type'], unique=False)
+    op.drop_index('ix_domains_team_id', table_name='domains')
+    op.create_index('ix_domains_team_id_id', 'domains', ['team_id', 'id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_domains_team_id_id', table_name='domains')
+    op.create_index('ix_domains_team_id', 'domains', ['team_id'], unique=False)
+    op.drop_index('ix_dns_records_domain_id_name_type', table_name='dns_records')
+    op.drop_index('ix_dns_records_domain_id_id', table_name='dns_records')
+    op.create_index('ix_dns_records_domain_id', 'dns_records', ['domain_id'], unique=False)
@@ -0,0 +1,25 @@
+"""zone mirror
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:02:41.518204
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('domains', sa.Column('synced_at', sa.DateTime(), nullable=True))
+    op.add_column('dns_records', sa.Column('namecom_id', sa.Integer(), nullable=True))
+    op.create_index('ix_dns_records_domain_id_namecom_id', 'dns_records', ['domain_id', 'namecom_id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_dns_records_domain_id_namecom_id', table_name='dns_records')
+    with op.batch_alter_table('dns_records') as batch_op:
+        batch_op.drop_column('namecom_id')
+    with op.batch_alter_table('domains') as batch_op:
+        batch_op.drop_column('synced_at')
@@ -0,0 +1,25 @@
+"""record write coalescing
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 23:40:12.518904
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('teams', sa.Column('write_coalesce_window', sa.Float(), nullable=True))
+    op.add_column('outbox', sa.Column('merged_into', sa.Integer(), nullable=True))
+    op.create_index('ix_outbox_merged_into', 'outbox', ['merged_into'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_outbox_merged_into', table_name='outbox')
+    with op.batch_alter_table('outbox') as batch_op:
+        batch_op.drop_column('merged_into')
+    with op.batch_alter_table('teams') as batch_op:
+        batch_op.drop_column('write_coalesce_window')
@@ -0,0 +1,33 @@
+"""unique domain names and leases
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 15:22:08.731145
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# Rows the zone mirror created twice for one name; lookups by name always used the lowest ID
+DUPLICATES = "SELECT id FROM domains WHERE id NOT IN (SELECT MIN(id) FROM domains GROUP BY name)"
+
+def upgrade():
+    op.execute(f"DELETE FROM dns_records WHERE domain_id IN ({DUPLICATES})")
+    op.execute(f"DELETE FROM domains WHERE id IN ({DUPLICATES})")
+    op.drop_index('ix_domains_name', table_name='domains')
+    op.create_index('ix_domains_name', 'domains', ['name'], unique=True)
+    op.create_table('leases',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade():
+    op.drop_table('leases')
+    op.drop_index('ix_domains_name', table_name='domains')
+    op.create_index('ix_domains_name', 'domains', ['name'], unique=False)
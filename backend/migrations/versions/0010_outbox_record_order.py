@@ -0,0 +1,41 @@
+"""outbox record order
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 16:47:13.902518
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+outbox = sa.table(
+    'outbox',
+    sa.column('id', sa.Integer()),
+    sa.column('domain_name', sa.String()),
+    sa.column('op', sa.String()),
+    sa.column('params', sa.JSON()),
+    sa.column('record_key', sa.String())
+)
+
+def upgrade():
+    op.add_column('outbox', sa.Column('record_key', sa.String(length=300), nullable=True))
+    op.create_index('ix_outbox_record_key_id', 'outbox', ['record_key', 'id'], unique=False)
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(outbox.c.id, outbox.c.domain_name, outbox.c.params).where(outbox.c.op != 'create')
+    ).all()
+    for id, domain_name, params in rows:
+        connection.execute(
+            outbox.update()
+            .where(outbox.c.id == id)
+            .values(record_key=f"{domain_name.lower()}/{params.get('record_id')}")
+        )
+
+def downgrade():
+    op.drop_index('ix_outbox_record_key_id', table_name='outbox')
+    with op.batch_alter_table('outbox') as batch_op:
+        batch_op.drop_column('record_key')
@@ -0,0 +1,20 @@
+"""outbox superseded
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 19:02:41.377150
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('outbox', sa.Column('superseded', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+def downgrade():
+    with op.batch_alter_table('outbox') as batch_op:
+        batch_op.drop_column('superseded')
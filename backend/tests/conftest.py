@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+# Settings and the engine are read at import time
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("VAULT_TOKEN", "")
+
+import pytest
+from app.db.session import Base, engine
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db():
+    """Fresh tables for a test"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
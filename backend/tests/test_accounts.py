@@ -0,0 +1,75 @@
+import pytest
+from hvac.exceptions import InvalidPath
+from app.config import settings
+from app.services import accounts
+from app.services.accounts import NamecomRegistry
+from app.services.namecom import NamecomService
+
+pytestmark = pytest.mark.anyio
+
+class Secrets(dict):
+    listeners: dict
+
+@pytest.fixture
+def secrets(monkeypatch):
+    """Team name.com secrets as Vault would serve them, by team ID"""
+    secrets = Secrets({
+        1: {"api_token": "one", "username": "reseller-a"},
+        2: {"api_token": "one", "username": "reseller-a"},
+        3: {"api_token": "three", "username": "reseller-b"}
+    })
+    listeners = {}
+    
+    async def get_secret(path):
+        team_id = int(path.split("/")[-2])
+        if team_id not in secrets:
+            raise InvalidPath()
+        return secrets[team_id]
+    
+    def subscribe(path, listener):
+        listeners[int(path.split("/")[-2])] = listener
+    
+    monkeypatch.setattr(settings, "VAULT_TOKEN", "token")
+    monkeypatch.setattr(settings, "NAMECOM_TEAM_SECRET_PATH", "secret/data/teams/{team_id}/namecom")
+    monkeypatch.setattr(accounts.vault_service, "get_secret", get_secret)
+    monkeypatch.setattr(accounts.vault_service, "subscribe", subscribe)
+    secrets.listeners = listeners
+    return secrets
+
+@pytest.fixture
+def registry(secrets):
+    return NamecomRegistry(NamecomService(api_token="shared", username="shared", rate_limit=0))
+
+async def test_teams_share_their_accounts_client(registry):
+    first, second, other = [await registry.for_team(team_id) for team_id in (1, 2, 3)]
+    assert first is second and first is not other
+    assert await registry.for_team(4) is registry.default
+    assert await registry.for_team(None) is registry.default
+    assert registry.stats()["clients"]["user:reseller-a"]["teams"] == [1, 2]
+
+async def test_rotated_credentials_reach_the_live_client(registry, secrets):
+    service = await registry.for_team(3)
+    secrets[3] = {"api_token": "rotated", "username": "reseller-b"}
+    secrets.listeners[3](secrets[3])
+    assert service.api_token == "rotated"
+    assert service.headers["Authorization"] == "Bearer rotated"
+    assert await registry.for_team(3) is service
+
+async def test_a_client_just_handed_out_is_never_closed(registry, monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_MAX_CLIENTS", 1)
+    closed = []
+    
+    async def close(self):
+        closed.append(self.username)
+    
+    monkeypatch.setattr(NamecomService, "close", close)
+    first = await registry.for_team(1)
+    # Over the cap, but the first client's caller may not have reached the limiter yet
+    second = await registry.for_team(3)
+    assert closed == [] and registry.stats()["accounts"] == 2
+    
+    monkeypatch.setattr(accounts, "HANDOUT_GRACE", 0)
+    # The least recently used client goes, never the one being handed out
+    assert await registry.for_team(3) is second
+    assert closed == ["reseller-a"]
+    assert await registry.for_team(1) is not first
@@ -0,0 +1,46 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.api import auth
+from app.auth.passwords import password_hasher
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client(db):
+    app = FastAPI()
+    app.include_router(auth.router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+@pytest.fixture
+def verifications(monkeypatch):
+    """Stored hashes login checked a password against"""
+    checked = []
+    verify = password_hasher.verify
+    
+    async def counted(stored, password):
+        checked.append(stored)
+        return await verify(stored, password)
+    
+    monkeypatch.setattr(password_hasher, "verify", counted)
+    return checked
+
+async def test_unknown_user_costs_a_hash_like_a_wrong_password(client, verifications):
+    await client.post("/api/auth/register", json={"username": "alice", "email": "alice@example.com", "password": "correct horse"})
+    
+    response = await client.post("/api/auth/login", json={"username": "alice", "password": "wrong"})
+    assert response.status_code == 401
+    response = await client.post("/api/auth/login", json={"username": "mallory", "password": "wrong"})
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid credentials"}
+    
+    assert len(verifications) == 2
+    # Same scheme and cost, so the unknown user takes as long
+    assert verifications[1].split("$")[:4] == verifications[0].split("$")[:4]
+
+async def test_known_user_still_logs_in(client):
+    await client.post("/api/auth/register", json={"username": "alice", "email": "alice@example.com", "password": "correct horse"})
+    response = await client.post("/api/auth/login", json={"username": "alice", "password": "correct horse"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
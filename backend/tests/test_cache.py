@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from app.services.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrent_loads_share_one_call():
+    cache = TTLCache()
+    calls = 0
+    
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+    
+    results = await asyncio.gather(*(cache.get_or_load("k", loader, 60) for _ in range(5)))
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+async def test_invalidate_during_load_discards_its_result():
+    cache = TTLCache()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    
+    async def loader():
+        started.set()
+        await release.wait()
+        return "stale"
+    
+    load = asyncio.create_task(cache.get_or_load("k", loader, 60))
+    await started.wait()
+    cache.invalidate("k")
+    release.set()
+    assert await load == "stale"
+    assert cache.get("k") is None
+
+async def test_invalidate_and_update_keep_no_state_for_dropped_keys():
+    cache = TTLCache()
+    for key in range(1000):
+        cache.set(key, key, 60)
+        cache.update(key, lambda value: value + 1)
+        cache.invalidate(key)
+    assert cache.get(1) is None
+    # No per-key bookkeeping is left behind
+    assert all(not value for value in vars(cache).values() if isinstance(value, dict))
@@ -0,0 +1,41 @@
+import httpx
+import pytest
+import main
+from app.services.health import HealthMonitor
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client(monkeypatch):
+    monitor = HealthMonitor()
+    
+    async def ok():
+        pass
+    
+    async def down():
+        raise ConnectionError("refused")
+    
+    monitor.register("database", ok)
+    monitor.register("namecom", down, required=False)
+    monitor.register("vault", down)
+    await monitor.probe_all()
+    monkeypatch.setattr(main, "health_monitor", monitor)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        yield client
+
+async def test_liveness_checks_no_dependency(client):
+    for path in ("/health", "/health/live"):
+        response = await client.get(path)
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready", "dependencies": {}}
+
+async def test_readiness_fails_on_a_required_dependency_only(client):
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    dependencies = response.json()["dependencies"]
+    assert {name: d["status"] for name, d in dependencies.items()} == {
+        "database": "ok", "namecom": "failing", "vault": "failing"
+    }
+    main.health_monitor.register("vault", main.health_monitor._probes["database"].check)
+    await main.health_monitor.probe_all()
+    assert (await client.get("/health/ready")).status_code == 200
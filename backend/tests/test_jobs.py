@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from sqlalchemy import update
+from app.config import settings
+from app.db import async_session
+from app.db.tables import JobRow
+from app.services.accounts import namecom_registry
+from app.services.jobs import JobQueue, OwnershipLost, plan_dns_changes
+
+pytestmark = pytest.mark.anyio
+
+CHANGES = {
+    "a.example": [{"op": "delete", "record_id": 1}],
+    "b.example": [{"op": "delete", "record_id": 2}]
+}
+
+@pytest.fixture
+async def queue(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_CHUNK_SIZE", 1)
+    queue = JobQueue()
+    queue.register("dns_changes", plan_dns_changes)
+    queue._wake = asyncio.Event()
+    return queue
+
+async def take_over(job_id: str):
+    """Another process claims the job, as after missed heartbeats"""
+    async with async_session() as session:
+        await session.execute(update(JobRow).where(JobRow.id == job_id).values(owner="other"))
+        await session.commit()
+
+async def test_losing_the_job_stops_it_without_finishing(queue, monkeypatch):
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    applied = []
+    
+    async def apply(job_id, namecom, domain_name, operations):
+        applied.append(domain_name)
+        await take_over(job["id"])
+        return [{"index": 0, "op": "delete", "record_id": 1, "status": "ok"}]
+    
+    monkeypatch.setattr(queue, "_apply", apply)
+    queue._running[job["id"]] = "user:1"
+    await queue._run(job["id"])
+    
+    assert applied == ["a.example"]
+    stored = await queue.get(job["id"])
+    # Left for the new owner at the last checkpoint it saved
+    assert stored["status"] == "running" and stored["checkpoint"] == 0
+    assert queue.completed == queue.failed == 0
+
+async def test_heartbeat_notices_the_takeover(queue, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_STALE_AFTER", 0.03)
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    assert await queue._claim(job["id"]) is not None
+    heartbeat = asyncio.create_task(queue._heartbeat(job["id"]))
+    await asyncio.sleep(0.05)
+    assert not heartbeat.done()
+    await take_over(job["id"])
+    await asyncio.wait_for(heartbeat, 1)
+    assert job["id"] in queue._lost
+
+class Breaker:
+    def retry_in(self) -> float:
+        return 0
+
+class FakeNamecom:
+    """Answers every write with one canned result while counting calls"""
+    
+    def __init__(self, result):
+        self.result = result
+        self.breaker = Breaker()
+        self.calls = 0
+        self.on_call = None
+    
+    async def apply_dns_changes(self, domain_name, operations):
+        self.calls += 1
+        if self.on_call is not None:
+            await self.on_call()
+        return [
+            {"index": i, "op": operation["op"], "record_id": operation.get("record_id"), **self.result}
+            for i, operation in enumerate(operations)
+        ]
+    
+    async def get_dns_records(self, domain_name, refresh=False):
+        return []
+
+BREAKER_OPEN = {"status": "error", "error": "name.com is unavailable", "retry_after": 30}
+
+@pytest.fixture
+def namecom(monkeypatch):
+    fake = FakeNamecom(BREAKER_OPEN)
+    
+    async def for_team(team_id):
+        return fake
+    
+    monkeypatch.setattr(namecom_registry, "for_team", for_team)
+    return fake
+
+async def test_cancelling_stops_waiting_out_the_breaker(queue, namecom):
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    
+    async def cancel():
+        await queue.cancel(job["id"])
+    
+    namecom.on_call = cancel
+    queue._running[job["id"]] = "user:1"
+    await asyncio.wait_for(queue._run(job["id"]), 5)
+    
+    assert namecom.calls == 1
+    stored = await queue.get(job["id"])
+    assert stored["status"] == "cancelled"
+    # The held write was never sent, so it is neither a success nor a failure
+    assert stored["succeeded"] == stored["failed"] == 0
+
+async def test_losing_the_job_stops_waiting_out_the_breaker(queue, namecom):
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    queue._lost.add(job["id"])
+    with pytest.raises(OwnershipLost):
+        await asyncio.wait_for(queue._apply(job["id"], namecom, "a.example", CHANGES["a.example"]), 5)
+    assert namecom.calls == 1
+
+async def test_the_breaker_wait_is_capped(queue, namecom, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BREAKER_MAX_WAIT", 0)
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    results = await asyncio.wait_for(queue._apply(job["id"], namecom, "a.example", CHANGES["a.example"]), 5)
+    assert namecom.calls == 1
+    assert results[0]["status"] == "error"
+
+async def test_a_resumed_delete_that_already_landed_is_not_a_failure(queue, namecom):
+    namecom.result = {"status": "error", "error": "name.com returned 404", "status_code": 404}
+    job = await queue.submit("dns_changes", {"changes": CHANGES}, user_id=1)
+    results = await queue._apply_once(job["id"], namecom, "a.example", CHANGES["a.example"])
+    assert results[0]["status"] == "ok" and results[0]["skipped"]
+    # Outside a resume it is still an error
+    results = await queue._apply(job["id"], namecom, "a.example", CHANGES["a.example"])
+    assert results[0]["status"] == "error"
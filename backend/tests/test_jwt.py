@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app.auth.jwt import JWTService
+from app.db import async_session
+from app.db.tables import RevokedTokenRow
+
+pytestmark = pytest.mark.anyio
+
+def restart() -> JWTService:
+    """A service with nothing in memory, as in a fresh or different process"""
+    return JWTService()
+
+async def test_revocation_survives_a_restart(db):
+    service = restart()
+    token = service.create_access_token({"sub": "1"})
+    assert (await service.get_verified_user(token))["user_id"] == 1
+    await service.revoke_token(token)
+    with pytest.raises(Exception, match="revoked"):
+        await service.get_verified_user(token)
+    
+    service = restart()
+    with pytest.raises(Exception, match="revoked"):
+        await service.get_verified_user(token)
+
+async def test_revocation_elsewhere_drops_a_cached_verification(db, monkeypatch):
+    monkeypatch.setattr("app.auth.jwt.settings.JWT_REVOCATION_POLL_INTERVAL", 0)
+    service = restart()
+    token = service.create_access_token({"sub": "1"})
+    await service.get_verified_user(token)
+    # Another process logs the token out
+    async with async_session() as session:
+        session.add(RevokedTokenRow(digest=service._digest(token).hex(), expires_at=datetime.now() + timedelta(minutes=5)))
+        await session.commit()
+    with pytest.raises(Exception, match="revoked"):
+        await service.get_verified_user(token)
+
+async def test_expired_revocations_are_removed(db):
+    service = restart()
+    async with async_session() as session:
+        session.add(RevokedTokenRow(digest="00" * 32, expires_at=datetime.now() - timedelta(seconds=1)))
+        await session.commit()
+    token = service.create_access_token({"sub": "1"})
+    await service.revoke_token(token)
+    async with async_session() as session:
+        digests = (await session.scalars(select(RevokedTokenRow.digest))).all()
+    assert digests == [service._digest(token).hex()]
+
+async def test_services_keep_their_own_cache(db):
+    service, other = restart(), restart()
+    token = service.create_access_token({"sub": "1"})
+    user = await service.get_verified_user(token)
+    assert service.cache_stats()["entries"] == 1 and other.cache_stats()["entries"] == 0
+    # Callers get their own copy of the cached user
+    user["role"] = "admin"
+    assert "role" not in await service.get_verified_user(token)
+    assert service.cache_stats()["hits"] == 1
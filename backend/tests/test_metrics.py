@@ -0,0 +1,44 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+import main
+from app.services.accounts import _Account
+from app.services.metrics import MetricsMiddleware, http_requests
+from app.services.namecom import NamecomService
+
+pytestmark = pytest.mark.anyio
+
+async def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    
+    @app.get("/widgets/{widget_id}")
+    async def get_widget(widget_id: int):
+        return {"id": widget_id}
+    
+    app.add_middleware(MetricsMiddleware, routes_of=lambda: app.routes)
+    requests = http_requests._children
+    before = {key: child.value for key, child in requests.items()}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for widget_id in (1, 2, 3):
+            await client.get(f"/widgets/{widget_id}")
+        await client.get("/missing/42")
+    
+    counted = {key: child.value - before.get(key, 0) for key, child in requests.items()}
+    assert counted[("GET", "/widgets/{widget_id}", "200")] == 3
+    assert counted[("GET", "unmatched", "404")] == 1
+    # Nothing is labelled with a concrete path
+    assert not any("/widgets/1" in key[1] or "/missing" in key[1] for key in requests)
+
+async def test_each_team_account_is_exported_until_its_client_closes(monkeypatch):
+    registry = main.namecom_registry
+    account = _Account(NamecomService(api_token="token", username="reseller", rate_limit=0))
+    monkeypatch.setitem(registry._accounts, "user:reseller", account)
+    
+    scraped = main.metrics.render()
+    assert 'namecom_account_stat{account="user:reseller",stat="breaker_open"} 0.0' in scraped
+    assert 'namecom_account_stat{account="user:reseller",stat="limiter_in_flight"}' in scraped
+    assert 'namecom_upstream_stat{stat="registry_accounts"} 1.0' in scraped
+    
+    del registry._accounts["user:reseller"]
+    await account.service.close()
+    assert 'account="user:reseller"' not in main.metrics.render()
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from app.db import async_session
+from app.db.tables import DomainRow
+from app.services.lease import Lease
+from app.services.mirror import ZoneMirror
+from app.services.namecom import namecom_service
+from benchmarks.fakes import generate_account
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def account(monkeypatch):
+    """Serve the mirror's name.com reads from a generated account"""
+    zones, _ = generate_account(3, 5)
+    
+    async def iter_domains():
+        yield [{"domainName": name, "domainId": i + 1} for i, name in enumerate(zones)]
+    
+    async def get_dns_records(domain_name, refresh=False):
+        return list(zones[domain_name].values())
+    
+    monkeypatch.setattr(namecom_service, "iter_domains", iter_domains)
+    monkeypatch.setattr(namecom_service, "get_dns_records", get_dns_records)
+    return zones
+
+def mirror(owner: str, ttl: float = 60) -> ZoneMirror:
+    zone_mirror = ZoneMirror()
+    zone_mirror._lease = Lease("zone_mirror", owner, ttl)
+    return zone_mirror
+
+async def test_concurrent_listings_store_each_domain_once(db, account):
+    await asyncio.gather(*(mirror(f"process{i}").refresh_domains() for i in range(4)))
+    async with async_session() as session:
+        rows = (await session.execute(select(DomainRow.name, func.count()).group_by(DomainRow.name))).all()
+    assert sorted(rows) == [(name, 1) for name in sorted(account)]
+
+async def test_only_the_lease_holder_syncs(db, account):
+    leader, follower = mirror("one"), mirror("two")
+    reindexed = []
+    
+    async def listener(domain_id, name):
+        reindexed.append(name)
+    
+    follower.subscribe(listener)
+    await leader.tick()
+    await follower.tick()
+    assert leader.leader and not follower.leader
+    assert leader.syncs == 3 and follower.syncs == 0
+    # The follower serves what the leader stored
+    assert all(follower.serves(name) for name in account)
+    assert len(await follower.get_dns_records("bench0.example")) == 5
+    
+    await leader.sync_zone("bench1.example")
+    await follower.tick()
+    assert reindexed == ["bench1.example"]
+
+async def test_follower_takes_over_an_expired_lease(db, account):
+    # Long enough that the leader's first tick, which syncs every zone, ends inside the lease
+    leader, follower = mirror("one", ttl=0.3), mirror("two", ttl=0.3)
+    await leader.tick()
+    await follower.tick()
+    assert not follower.leader
+    await asyncio.sleep(0.4)
+    await follower.tick()
+    assert follower.leader and follower.syncs == 0
+    await leader.tick()
+    assert not leader.leader
+
+async def test_a_follower_write_is_read_live_until_the_leader_resyncs(db, account):
+    leader, follower = mirror("one"), mirror("two")
+    await leader.tick()
+    await follower.tick()
+    follower.mark_changed("bench2.example")
+    await follower.tick()
+    assert not follower.serves("bench2.example")
+    await leader.sync_zone("bench2.example")
+    await follower.tick()
+    assert follower.serves("bench2.example")
+
+async def test_a_follower_reports_zones_added_and_removed_by_the_leader(db, account):
+    leader, follower = mirror("one"), mirror("two")
+    added, removed = [], []
+    
+    async def on_added(domain_id, name):
+        added.append(name)
+    
+    async def on_removed(name):
+        removed.append(name)
+    
+    follower.subscribe(on_added)
+    follower.subscribe_removed(on_removed)
+    leader.subscribe_removed(on_removed)
+    await leader.tick()
+    await follower.tick()
+    # Zones there at startup are covered by the listeners' own build
+    assert added == []
+    
+    account["new.example"] = {}
+    await leader.refresh_domains()
+    await leader.sync_zone("new.example")
+    await follower.tick()
+    assert added == ["new.example"]
+    
+    del account["bench1.example"]
+    await leader.refresh_domains()
+    assert removed == ["bench1.example"]
+    await follower.tick()
+    assert removed == ["bench1.example", "bench1.example"]
+    assert not follower.serves("bench1.example")
@@ -0,0 +1,180 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.config import settings
+from app.services.namecom import NamecomAPIError, NamecomServerError, NamecomService, NamecomUnavailableError
+from app.services.resilience import CircuitBreaker
+from benchmarks.fakes import create_namecom_app
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "NAMECOM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(settings, "NAMECOM_RETRY_MAX_DELAY", 0.001)
+    monkeypatch.setattr(settings, "NAMECOM_HEDGE_GETS", False)
+
+@pytest.fixture
+async def service():
+    service = NamecomService(api_token="token", username="user", rate_limit=0)
+    yield service
+    await service.close()
+
+def serve(service: NamecomService, transport: httpx.AsyncBaseTransport):
+    service._client = httpx.AsyncClient(base_url=service.BASE_URL, transport=transport)
+
+def replies(*responses):
+    """Transport answering with the given (status, headers) in turn; records when each call came"""
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        status, headers = responses[min(len(calls), len(responses)) - 1]
+        return httpx.Response(status, headers=headers, json={"ok": True} if status < 400 else {"message": "error"})
+    
+    return httpx.MockTransport(handler), calls
+
+async def test_idempotent_calls_are_retried_until_attempts_run_out(service):
+    transport, calls = replies((503, {}), (502, {}), (200, {}))
+    serve(service, transport)
+    assert await service._make_request("GET", "/hello") == {"ok": True}
+    assert len(calls) == 3 and service.retries == 2
+    
+    transport, calls = replies((503, {}))
+    serve(service, transport)
+    with pytest.raises(NamecomServerError):
+        await service._make_request("PUT", "/domains/example.com/records/1", {"answer": "192.0.2.1"})
+    assert len(calls) == settings.NAMECOM_RETRY_ATTEMPTS
+
+async def test_creates_and_client_errors_are_not_retried(service):
+    transport, calls = replies((503, {}))
+    serve(service, transport)
+    with pytest.raises(NamecomServerError):
+        await service._make_request("POST", "/domains/example.com/records", {"host": "www"})
+    assert len(calls) == 1
+    
+    transport, calls = replies((404, {}))
+    serve(service, transport)
+    with pytest.raises(NamecomAPIError) as error:
+        await service._make_request("GET", "/domains/missing.com")
+    assert error.value.status_code == 404 and len(calls) == 1
+
+async def test_retry_waits_for_retry_after(service):
+    transport, calls = replies((429, {"Retry-After": "0.3"}), (200, {}))
+    serve(service, transport)
+    assert await service._make_request("GET", "/hello") == {"ok": True}
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.3
+
+async def test_breaker_opens_and_lets_one_probe_through(service, monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_RETRY_ATTEMPTS", 1)
+    service.breaker = CircuitBreaker(threshold=2, reset_timeout=0.2)
+    transport, calls = replies((503, {}))
+    serve(service, transport)
+    for _ in range(2):
+        with pytest.raises(NamecomServerError):
+            await service._make_request("GET", "/hello")
+    with pytest.raises(NamecomUnavailableError) as error:
+        await service._make_request("GET", "/hello")
+    assert len(calls) == 2 and error.value.retry_after > 0
+    
+    # Half-open: a failed probe re-opens it straight away
+    await asyncio.sleep(0.2)
+    with pytest.raises(NamecomServerError):
+        await service._make_request("GET", "/hello")
+    assert service.breaker.state == CircuitBreaker.OPEN and len(calls) == 3
+    
+    # Half-open again: only one of two concurrent calls probes, and its success closes the breaker
+    await asyncio.sleep(0.2)
+    
+    async def slow_ok(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"ok": True})
+    
+    serve(service, httpx.MockTransport(slow_ok))
+    results = await asyncio.gather(
+        service._make_request("GET", "/hello"),
+        service._make_request("GET", "/hello"),
+        return_exceptions=True
+    )
+    assert sorted(type(result).__name__ for result in results) == ["NamecomUnavailableError", "dict"]
+    assert len(calls) == 4 and service.breaker.state == CircuitBreaker.CLOSED
+
+async def test_slow_get_is_hedged(service, monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_HEDGE_GETS", True)
+    for _ in range(20):
+        service.latency.add(0.02)
+    calls = []
+    
+    async def first_slow(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return httpx.Response(200, json={"call": len(calls)})
+    
+    serve(service, httpx.MockTransport(first_slow))
+    started = time.monotonic()
+    assert await service._make_request("GET", "/hello") == {"call": 2}
+    assert time.monotonic() - started < 0.5
+    assert service.hedged == 1
+    # The hedge went out after the p95 latency, not at once
+    assert calls[1] - calls[0] >= 0.02
+    
+    calls.clear()
+    serve(service, httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+    await service._make_request("GET", "/hello")
+    assert service.hedged == 1
+
+async def test_reads_ride_out_a_flaky_upstream(service, monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_RETRY_ATTEMPTS", 6)
+    app = create_namecom_app(domains=2, records=50, error_rate=0.3)
+    serve(service, httpx.ASGITransport(app=app))
+    records = await service.get_dns_records("bench0.example")
+    assert len(records) == 50
+    stats = (await service._get_client().get(service._get_client().base_url.join("/_stats"))).json()
+    assert stats["errors"] > 0 and service.retries == stats["errors"]
+
+async def test_paged_reads_share_one_cached_load(service, monkeypatch):
+    monkeypatch.setattr(settings, "NAMECOM_PAGE_SIZE", 20)
+    app = create_namecom_app(domains=1, records=50)
+    listed = []
+    
+    async def counted(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/records"):
+            listed.append(request.url.params["page"])
+            await asyncio.sleep(0.01)
+        return await transport.handle_async_request(request)
+    
+    transport = httpx.ASGITransport(app=app)
+    serve(service, httpx.MockTransport(counted))
+    
+    async def streamed():
+        return [record async for page in service.iter_dns_records("bench0.example") for record in page]
+    
+    page, records = await asyncio.gather(
+        service.get_dns_records_page("bench0.example", cursor="2", limit=10),
+        streamed()
+    )
+    assert listed == ["1", "2", "3"]
+    assert len(records) == 50
+    assert page["items"] == records[10:20] and page["next_cursor"] == "3"
+    
+    # Served from the cache from now on
+    assert (await service.get_dns_records_page("bench0.example", cursor="5", limit=10))["next_cursor"] is None
+    assert len(listed) == 3
+
+async def test_ping_skips_the_rate_limiter_queue(service):
+    transport, calls = replies((200, {}))
+    serve(service, transport)
+    # The account is throttled for a while
+    service.limiter.backoff(30)
+    await asyncio.wait_for(service.ping(), 1)
+    assert len(calls) == 1
+    
+    transport, calls = replies((401, {}))
+    serve(service, transport)
+    with pytest.raises(NamecomAPIError) as error:
+        await service.ping()
+    assert error.value.status_code == 401
@@ -0,0 +1,224 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import update
+from app.api import domains
+from app.auth.dependencies import get_current_user
+from app.config import settings
+from app.db import async_session
+from app.db.tables import OutboxRow
+from app.services.accounts import namecom_registry
+from app.services.namecom import NamecomService
+from app.services.outbox import RecordOutbox, record_outbox
+
+pytestmark = pytest.mark.anyio
+
+class FakeNamecom:
+    """Records the writes the outbox sends"""
+    
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.sent = []
+    
+    async def create_dns_record(self, domain_name, **params):
+        self.sent.append(("create", None, params))
+        return {"recordId": 100, **params}
+    
+    async def update_dns_record(self, domain_name, record_id, **params):
+        await asyncio.sleep(self.delay)
+        # Once it has landed, so overlapping sends show up out of order
+        self.sent.append(("update", record_id, params))
+        return {"recordId": record_id, **params}
+    
+    async def delete_dns_record(self, domain_name, record_id):
+        self.sent.append(("delete", record_id, {}))
+    
+    apply_dns_changes = NamecomService.apply_dns_changes
+
+@pytest.fixture
+async def namecom(db, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "OUTBOX_COALESCE_WINDOW", 0)
+    fake = FakeNamecom()
+    
+    async def for_team(team_id):
+        return fake
+    
+    monkeypatch.setattr(namecom_registry, "for_team", for_team)
+    return fake
+
+async def other_process_sending(record_id: int) -> int:
+    """An update to the record that another process has claimed and is sending"""
+    row = OutboxRow(
+        request_hash="0" * 64,
+        user_id=2,
+        domain_name="example.com",
+        op="update",
+        params={"record_id": record_id, "ttl": 60},
+        record_key=f"example.com/{record_id}",
+        status="sending",
+        attempts=1,
+        claimed_at=datetime.now()
+    )
+    async with async_session() as session:
+        session.add(row)
+        await session.commit()
+    return row.id
+
+async def finish(entry_id: int):
+    async with async_session() as session:
+        await session.execute(update(OutboxRow).where(OutboxRow.id == entry_id).values(status="done"))
+        await session.commit()
+
+async def test_a_write_waits_for_an_older_one_sent_by_another_process(namecom):
+    outbox = RecordOutbox()
+    outbox.start()
+    try:
+        older = await other_process_sending(7)
+        # The dispatcher has looked for a backlog, so direct sends are allowed
+        await asyncio.sleep(0.1)
+        entry, _ = await outbox.submit("update", "example.com", {"record_id": 7, "ttl": 300}, user_id=1)
+        entry = await outbox.wait(entry, 0.3)
+        assert entry["status"] == "pending" and namecom.sent == []
+        assert outbox.sent_directly == 0
+        
+        await finish(older)
+        entry = await outbox.wait(entry, 1)
+        assert entry["status"] == "done"
+        assert namecom.sent == [("update", 7, {"ttl": 300})]
+    finally:
+        await outbox.stop()
+
+async def test_claim_skips_records_with_an_older_unfinished_write(namecom):
+    outbox = RecordOutbox()
+    older = await other_process_sending(7)
+    entry, _ = await outbox.submit("delete", "example.com", {"record_id": 7}, user_id=1)
+    other, _ = await outbox.submit("delete", "example.com", {"record_id": 8}, user_id=1)
+    assert [row.id for row in await outbox._claim(10)] == [other["id"]]
+    await finish(older)
+    assert [row.id for row in await outbox._claim(10)] == [entry["id"]]
+
+async def test_a_long_send_is_not_replayed_while_its_process_is_alive(namecom, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_STALE_AFTER", 0.3)
+    namecom.delay = 0.8
+    outbox, elsewhere = RecordOutbox(), RecordOutbox()
+    outbox.start()
+    try:
+        await asyncio.sleep(0.1)
+        entry, _ = await outbox.submit("update", "example.com", {"record_id": 7, "ttl": 300}, user_id=1)
+        for _ in range(5):
+            await asyncio.sleep(0.12)
+            elsewhere._replayed_at = None
+            await elsewhere._replay_stale()
+        assert elsewhere.replayed == 0
+        entry = await outbox.wait(entry, 1)
+        assert entry["status"] == "done" and len(namecom.sent) == 1
+    finally:
+        await outbox.stop()
+    
+    # A claim nobody refreshes is replayed
+    stale = await other_process_sending(9)
+    async with async_session() as session:
+        await session.execute(
+            update(OutboxRow).where(OutboxRow.id == stale).values(claimed_at=datetime.now() - timedelta(seconds=1))
+        )
+        await session.commit()
+    elsewhere._replayed_at = None
+    await elsewhere._replay_stale()
+    assert elsewhere.replayed == 1
+
+@pytest.fixture
+async def client(namecom, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_COALESCE_WINDOW", 0.3)
+    app = FastAPI()
+    app.include_router(domains.router)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": 1, "username": "alice"}
+    record_outbox.start()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+    finally:
+        await record_outbox.stop()
+
+async def test_an_update_replaced_by_a_held_delete_is_a_conflict(client, namecom):
+    updated = asyncio.create_task(client.put("/api/domains/example.com/records/7", json={"content": "192.0.2.2"}))
+    await asyncio.sleep(0.1)
+    deleted = await client.delete("/api/domains/example.com/records/7")
+    updated = await updated
+    assert deleted.status_code == 200
+    assert updated.status_code == 409
+    assert "superseded" in updated.json()["detail"]
+    assert namecom.sent == [("delete", 7, {})]
+
+async def test_every_update_merged_before_a_delete_is_a_conflict(client, namecom):
+    def put(content, key):
+        return asyncio.create_task(client.put(
+            "/api/domains/example.com/records/7",
+            json={"content": content},
+            headers={"Idempotency-Key": key}
+        ))
+    
+    first = put("192.0.2.2", "first")
+    await asyncio.sleep(0.05)
+    second = put("192.0.2.3", "second")
+    await asyncio.sleep(0.05)
+    deleted = await client.delete("/api/domains/example.com/records/7")
+    assert deleted.status_code == 200
+    assert [(await first).status_code, (await second).status_code] == [409, 409]
+    assert namecom.sent == [("delete", 7, {})]
+    
+    # A retry of the merged update gets the same answer
+    replayed = await put("192.0.2.3", "second")
+    assert replayed.status_code == 409
+
+async def test_a_batch_keeps_its_place_among_single_writes(client, namecom, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_COALESCE_WINDOW", 0)
+    namecom.delay = 0.3
+    batch = asyncio.create_task(client.post(
+        "/api/domains/example.com/records:batch",
+        json={"operations": [{"op": "update", "record_id": 7, "content": "192.0.2.2"}]}
+    ))
+    await asyncio.sleep(0.1)
+    # Quicker than the batch's update, so it would land first if it didn't wait for it
+    namecom.delay = 0
+    single = await client.put("/api/domains/example.com/records/7", json={"content": "192.0.2.3"})
+    batch = await batch
+    assert batch.status_code == 200 and single.status_code == 200
+    assert batch.json()["succeeded"] == 1 and batch.json()["queued"] == 0
+    assert [params["content"] for _, _, params in namecom.sent] == ["192.0.2.2", "192.0.2.3"]
+
+async def test_a_batch_operation_waits_behind_an_older_write(client, namecom, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_WAIT_TIMEOUT", 0.2)
+    older = await other_process_sending(7)
+    await asyncio.sleep(0.1)
+    response = await client.post("/api/domains/example.com/records:batch", json={"operations": [
+        {"op": "create", "name": "www", "type": "A", "content": "192.0.2.1"},
+        {"op": "delete", "record_id": 7}
+    ]})
+    assert response.status_code == 202
+    body = response.json()
+    assert (body["succeeded"], body["failed"], body["queued"]) == (1, 0, 1)
+    created, deleted = body["results"]
+    assert created["status"] == "ok" and created["record"]["recordId"] == 100
+    assert deleted["status"] == "queued" and namecom.sent == [("create", None, {
+        "name": "www", "type": "A", "content": "192.0.2.1", "ttl": 3600, "priority": None
+    })]
+    
+    await finish(older)
+    entry = await record_outbox.wait(await record_outbox.get(deleted["outbox_id"]), 1)
+    assert entry["status"] == "done" and namecom.sent[-1] == ("delete", 7, {})
+
+@pytest.mark.parametrize("operations", [
+    [],
+    [{"op": "create", "name": "www", "type": "A"}],
+    [{"op": "update", "content": "192.0.2.1"}],
+    [{"op": "delete"}],
+    [{"op": "rename", "record_id": 7}],
+    [{"op": "delete", "record_id": 7}] * 1001
+])
+async def test_invalid_batches_are_rejected(client, namecom, operations):
+    response = await client.post("/api/domains/example.com/records:batch", json={"operations": operations})
+    assert response.status_code == 422
+    assert namecom.sent == []
@@ -0,0 +1,55 @@
+import pytest
+from app.config import settings
+from app.services.profiling import RequestProfiler, _wants_profile
+
+def scope(query: bytes, headers=()):
+    return {"query_string": query, "headers": [(b"authorization", b"Bearer token"), *headers]}
+
+@pytest.mark.parametrize("query, wanted", [
+    (b"profile=1", True),
+    (b"limit=5&profile=true", True),
+    (b"profile=10", False),
+    (b"noprofile=1", False),
+    (b"q=profile%3D1", False),
+    (b"", False)
+])
+def test_profile_flag_is_read_from_the_parsed_query(query, wanted):
+    assert (_wants_profile(scope(query)) == "token") is wanted
+
+def test_profile_header_still_counts():
+    assert _wants_profile(scope(b"", [(b"x-profile", b"1")])) == "token"
+
+@pytest.mark.anyio
+async def test_only_requested_or_sampled_requests_get_a_sampler_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_MAX_ACTIVE", 2)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0)
+    profiler = RequestProfiler()
+    plain = profiler.begin("GET", "/", requested=False)
+    assert plain.sampler is None and profiler.active == 0
+    
+    traces = [profiler.begin("GET", "/", requested=True) for _ in range(3)]
+    assert [trace.sampler is not None for trace in traces] == [True, True, False]
+    # Over the cap it is still traced and reported
+    assert traces[2].reason == "requested"
+    
+    profiler.finish(traces[0], 0.01)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1)
+    sampled = profiler.begin("GET", "/", requested=False)
+    assert sampled.reason == "sampled" and sampled.sampler is not None
+    assert profiler.active == 2
+
+def test_the_slow_log_keeps_the_slowest_requests(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_SLOW_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "PROFILE_SLOW_LOG_SIZE", 3)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0)
+    profiler = RequestProfiler()
+    for duration in (5, 9, 7):
+        profiler.finish(profiler.begin("GET", f"/{duration}", requested=False), duration)
+    # A burst just over the threshold doesn't push the slowest out
+    for _ in range(20):
+        profiler.finish(profiler.begin("GET", "/burst", requested=False), 1.5)
+    profiler.finish(profiler.begin("GET", "/6", requested=False), 6)
+    slowest = profiler.slowest()
+    assert [trace["path"] for trace in slowest] == ["/9", "/7", "/6"]
+    assert profiler.get(slowest[0]["id"])["duration_ms"] == 9000
+    assert profiler.stats()["slow"] == 3
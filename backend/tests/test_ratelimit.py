@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.services.ratelimit import UpstreamLimiter, parse_retry_after
+
+pytestmark = pytest.mark.anyio
+
+def limiter(**kwargs) -> UpstreamLimiter:
+    # rate 0: no token bucket, so only the concurrency limit applies
+    return UpstreamLimiter(rate=0, burst=1, **kwargs)
+
+async def test_a_bulk_key_cannot_starve_another():
+    upstream = limiter(max_concurrency=1)
+    await upstream.acquire("holder")
+    served = []
+    
+    async def call(key: str):
+        await upstream.acquire(key)
+        served.append(key)
+    
+    tasks = [asyncio.create_task(call("bulk")) for _ in range(10)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(call("interactive")))
+    await asyncio.sleep(0)
+    assert upstream.stats()["queue_depth_by_key"] == {"bulk": 10, "interactive": 1}
+    
+    while len(served) < 11:
+        upstream.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    # Keys take turns, so the single interactive call goes second, not last
+    assert served.index("interactive") == 1
+
+async def test_a_cancelled_waiter_gives_up_its_place():
+    upstream = limiter(max_concurrency=1)
+    await upstream.acquire("holder")
+    cancelled = asyncio.create_task(upstream.acquire("a"))
+    waiting = asyncio.create_task(upstream.acquire("b"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    upstream.release()
+    await asyncio.wait_for(waiting, 1)
+    assert upstream.in_flight == 1
+
+async def test_throttling_halves_the_limit_and_success_grows_it_back():
+    upstream = limiter(min_concurrency=1, max_concurrency=8, cooldown=60)
+    
+    async def call(outcome: str):
+        await upstream.acquire("key")
+        upstream.release(outcome)
+    
+    await call("throttled")
+    assert upstream.limit == 4
+    # One decrease per cooldown, however many calls were throttled at once
+    await call("throttled")
+    await call("failed")
+    assert upstream.limit == 4
+    assert upstream.stats()["throttled"] == 2 and upstream.stats()["failures"] == 1
+    
+    # About one more slot per round of successful calls
+    for _ in range(4):
+        await call("ok")
+    assert 4.9 < upstream.limit < 5
+    for _ in range(100):
+        await call("ok")
+    assert upstream.limit == 8
+
+async def test_the_limit_never_drops_below_the_minimum():
+    upstream = limiter(min_concurrency=2, max_concurrency=8, cooldown=0)
+    for _ in range(5):
+        await upstream.acquire("key")
+        upstream.release("throttled")
+    assert upstream.limit == 2
+
+@pytest.mark.parametrize("value, seconds", [
+    ("3", 3.0),
+    ("-1", 0.0),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+    ("soon", None),
+    (None, None)
+])
+def test_retry_after_is_read_as_seconds_or_a_date(value, seconds):
+    assert parse_retry_after(value) == seconds
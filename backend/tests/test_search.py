@@ -0,0 +1,127 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.api import records
+from app.auth.dependencies import get_current_user
+from app.services import search
+from app.services.dns import dns_service
+from app.services.domain import domain_service
+from app.services.search import RecordIndex
+from app.services.team import team_service
+
+def record(id, name, type="A", content="192.0.2.1", domain="example.com", ttl=300):
+    return {
+        "id": id,
+        "domain_name": domain,
+        "name": name,
+        "type": type,
+        "content": content,
+        "ttl": ttl,
+        "priority": None,
+        "namecom_id": id,
+        "team_id": 1
+    }
+
+def names(result) -> list:
+    return [item["name"] for item in result["items"]]
+
+@pytest.fixture
+def index() -> RecordIndex:
+    index = RecordIndex()
+    index.load([record(id, f"host{id}", content=f"192.0.2.{id}") for id in range(1, 101)])
+    return index
+
+def test_cursor_pages_through_every_match_once(index):
+    seen, cursor = [], None
+    while True:
+        page = index.search(q="host", limit=7, cursor=cursor)
+        seen.extend(names(page))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"host{id}" for id in range(1, 101)]
+
+def test_substring_search_sees_changes_since_the_scan_text_was_built(index):
+    index.replace_domain("example.com", [
+        *(record(id, f"host{id}", content=f"192.0.2.{id}") for id in range(1, 101) if id not in (5, 6)),
+        record(6, "renamed6"),
+        record(200, "new-host")
+    ], team_id=1)
+    assert len(index._delta) == 2
+    # Removed and renamed records are gone from the old text's hits
+    assert names(index.search(q="host5")) == [f"host{id}" for id in range(50, 60)]
+    assert "host6" not in names(index.search(q="host6"))
+    assert names(index.search(q="renamed")) == ["renamed6"]
+    # The new record comes after the scan hits, in ID order
+    assert names(index.search(q="host", limit=200))[-2:] == ["host100", "new-host"]
+    page = index.search(q="host", limit=1, cursor=99)
+    assert names(page) == ["host100"] and page["next_cursor"] == 100
+    assert names(index.search(q="host", limit=1, cursor=100)) == ["new-host"]
+
+def test_prefix_and_exact_stay_within_their_bounds(index):
+    assert names(index.search(q="host1", match="exact", field="name")) == ["host1"]
+    assert names(index.search(q="host10", match="prefix", field="name")) == ["host10", "host100"]
+    assert names(index.search(q="HOST9", match="prefix", field="name")) == ["host9", *(f"host{id}" for id in range(90, 100))]
+    assert names(index.search(q="host", match="exact")) == []
+    assert names(index.search(q="192.0.2.50", match="exact", field="content")) == ["host50"]
+
+def test_cidr_matches_each_address_family():
+    index = RecordIndex()
+    index.load([
+        record(1, "v4", content="203.0.113.7"),
+        record(2, "v4-outside", content="198.51.100.7"),
+        record(3, "v6", type="AAAA", content="2001:db8::1"),
+        record(4, "v6-outside", type="AAAA", content="2001:db9::1"),
+        record(5, "text", type="TXT", content="203.0.113.8")
+    ])
+    assert names(index.search(cidr="203.0.113.0/24")) == ["v4"]
+    assert names(index.search(cidr="2001:db8::/32")) == ["v6"]
+    assert names(index.search(cidr="0.0.0.0/0")) == ["v4", "v4-outside"]
+    with pytest.raises(ValueError):
+        index.search(cidr="not-a-network")
+
+def test_a_broad_filter_falls_back_to_walking_ids(index, monkeypatch):
+    walked = []
+    from_sorted = search._from_sorted
+    
+    def spy(ids, after):
+        walked.append(len(ids))
+        return from_sorted(ids, after)
+    
+    monkeypatch.setattr(search, "_from_sorted", spy)
+    # Every record is an A record: too many for the type list to be the cheaper source
+    assert len(names(index.search(types=["A"], ttl_min=300, limit=5))) == 5
+    assert walked == [100]
+    walked.clear()
+    # A single domain's few records are
+    index.replace_domain("other.example", [record(300, "other", domain="other.example")], team_id=1)
+    assert names(index.search(domain="other.example", types=["A"])) == ["other"]
+    assert walked == [1]
+
+def test_search_is_limited_to_the_given_teams(index):
+    index.replace_domain("team2.example", [record(400, "host-team2", domain="team2.example")], team_id=2)
+    assert "host-team2" in names(index.search(q="host", limit=200))
+    assert "host-team2" not in names(index.search(q="host", limit=200, teams={1}))
+    assert names(index.search(q="host", teams={2})) == ["host-team2"]
+    assert names(index.search(teams=set())) == []
+
+@pytest.mark.anyio
+async def test_the_route_searches_only_the_users_teams(db, monkeypatch):
+    monkeypatch.setattr(search, "record_index", RecordIndex())
+    monkeypatch.setattr(records, "record_index", search.record_index)
+    mine = await team_service.create_team("mine", owner_id=1)
+    theirs = await team_service.create_team("theirs", owner_id=2)
+    for team, domain_name in ((mine, "mine.example"), (theirs, "theirs.example")):
+        domain = await domain_service.create_domain(domain_name, team_id=team["id"])
+        await dns_service.create_record(domain["id"], domain_name, "www", "A", "192.0.2.1")
+    
+    app = FastAPI()
+    app.include_router(records.router)
+    user = {"user_id": 1, "username": "alice", "role": "user"}
+    app.dependency_overrides[get_current_user] = lambda: user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/records/search", params={"q": "www"})
+        assert [item["domain"] for item in response.json()["items"]] == ["mine.example"]
+        user["role"] = "admin"
+        response = await client.get("/api/records/search", params={"q": "www"})
+        assert [item["domain"] for item in response.json()["items"]] == ["mine.example", "theirs.example"]
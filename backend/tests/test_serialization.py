@@ -0,0 +1,107 @@
+import json
+from typing import List
+import httpx
+import pytest
+from fastapi import FastAPI, Query
+from app.api.domains import _domain_head, _domain_summary, _domain_with_records, _record_detail, _record_summary
+from app.models.domain import Domain, DomainWithRecords
+from app.services import serialization
+from app.services.serialization import json_response, stream_object, stream_pages
+from benchmarks.fakes import generate_account
+
+pytestmark = pytest.mark.anyio
+
+DOMAIN = "bench0.example"
+INFO = {"domainName": DOMAIN, "domainId": 1}
+
+@pytest.fixture(autouse=True)
+def chunk_size(monkeypatch):
+    """Small chunks, so a handful of records cross the streaming boundaries"""
+    monkeypatch.setattr(serialization, "CHUNK_SIZE", 4)
+    return 4
+
+def records(count: int) -> list:
+    zones, _ = generate_account(1, count)
+    return list(zones[DOMAIN].values())[:count]
+
+def paged(items: list, sizes: List[int]):
+    """Pages of the given sizes (0 for an empty page) over items"""
+    async def pages():
+        start = 0
+        for size in sizes:
+            yield items[start:start + size]
+            start += size
+    return pages()
+
+def build_app(items: list, sizes: List[int]) -> FastAPI:
+    app = FastAPI()
+    
+    @app.get("/validated", response_model=DomainWithRecords)
+    async def validated():
+        return _domain_with_records(DOMAIN, INFO, items)
+    
+    @app.get("/fast")
+    async def fast():
+        return json_response(_domain_head(INFO), "records", items, lambda r: _record_detail(r, DOMAIN))
+    
+    @app.get("/records", response_model=List[dict])
+    async def list_records(ndjson: bool = Query(False)):
+        return await stream_pages(paged(items, sizes), _record_summary, ndjson)
+    
+    @app.get("/domains", response_model=List[Domain])
+    async def list_domains():
+        return await stream_pages(paged(items, sizes), _domain_summary)
+    
+    @app.get("/validated/domains", response_model=List[Domain])
+    async def validated_domains():
+        return [_domain_summary(d) for d in items]
+    
+    return app
+
+async def get(app: FastAPI, path: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(path)
+    assert response.status_code == 200
+    return response
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5, 9])
+async def test_details_match_the_validated_route(count):
+    # Up to a chunk is one FastJSONResponse, past it the body is streamed
+    app = build_app(records(count), [])
+    validated, fast = await get(app, "/validated"), await get(app, "/fast")
+    assert fast.json() == validated.json()
+    assert fast.content == validated.content
+    assert len(fast.json()["records"]) == count
+
+@pytest.mark.parametrize("sizes", [[], [0], [4], [5], [0, 4, 0, 5, 0], [3, 0, 6]])
+async def test_streamed_pages_parse_like_a_list(sizes):
+    items = records(sum(sizes))
+    app = build_app(items, sizes)
+    response = await get(app, "/records")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [_record_summary(r) for r in items]
+
+@pytest.mark.parametrize("sizes", [[], [0], [4], [0, 9, 0]])
+async def test_ndjson_has_one_record_per_line(sizes):
+    items = records(sum(sizes))
+    response = await get(build_app(items, sizes), "/records?ndjson=true")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n") or not items
+    assert [json.loads(line) for line in response.text.splitlines()] == [_record_summary(r) for r in items]
+
+async def test_streamed_domains_match_the_validated_route():
+    domains = [{"domainName": f"d{i}.example", "domainId": i} for i in range(9)]
+    app = build_app(domains, [4, 0, 5])
+    streamed, validated = await get(app, "/domains"), await get(app, "/validated/domains")
+    assert streamed.json() == validated.json()
+    assert streamed.content == validated.content
+
+async def test_streamed_object_without_a_head():
+    app = FastAPI()
+    
+    @app.get("/object")
+    async def as_object():
+        return stream_object({}, "items", list(range(9)), lambda i: {"i": i})
+    
+    response = await get(app, "/object")
+    assert response.json() == {"items": [{"i": i} for i in range(9)]}
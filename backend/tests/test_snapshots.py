@@ -0,0 +1,24 @@
+import asyncio
+import pytest
+from app.services.namecom import NamecomAPIError, NamecomService
+
+pytestmark = pytest.mark.anyio
+
+async def test_snapshot_fan_out_reports_errors_and_propagates_cancellation(monkeypatch):
+    service = NamecomService(api_token="token", username="user")
+    
+    async def get_domain_snapshot(domain_name):
+        if domain_name == "broken.com":
+            raise NamecomAPIError("Not found", status_code=404)
+        if domain_name == "cancelled.com":
+            raise asyncio.CancelledError()
+        return {"domain": {"domainName": domain_name}, "records": []}
+    
+    monkeypatch.setattr(service, "get_domain_snapshot", get_domain_snapshot)
+    snapshots = await service.get_domain_snapshots(["ok.com", "broken.com"])
+    assert snapshots["ok.com"]["records"] == []
+    assert isinstance(snapshots["broken.com"], NamecomAPIError)
+    
+    with pytest.raises(asyncio.CancelledError):
+        await service.get_domain_snapshots(["ok.com", "cancelled.com"])
+    await service.close()
@@ -0,0 +1,126 @@
+import asyncio
+import socket
+import threading
+import time
+from types import SimpleNamespace
+import hvac
+import pytest
+import uvicorn
+from app.auth import vault as vault_module
+from app.auth.vault import VaultService
+from benchmarks.fakes import NAMECOM_SECRET_PATH, create_vault_app
+
+pytestmark = pytest.mark.anyio
+
+TOKEN = "test-vault-token"
+
+class Clock:
+    """Stands in for time.monotonic so TTLs pass when a test says so"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def vault_addr():
+    """The fake Vault served over HTTP, as hvac needs a real socket"""
+    app = create_vault_app(TOKEN, {NAMECOM_SECRET_PATH: {"api_token": "one", "username": "user"}})
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    thread.join()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(vault_module, "time", SimpleNamespace(monotonic=clock, perf_counter=time.perf_counter))
+    return clock
+
+@pytest.fixture
+def vault(vault_addr, clock, monkeypatch):
+    monkeypatch.setattr("app.auth.vault.settings.VAULT_ADDR", vault_addr)
+    monkeypatch.setattr("app.auth.vault.settings.VAULT_TOKEN", TOKEN)
+    monkeypatch.setattr("app.auth.vault.settings.VAULT_SECRET_TTL", 60)
+    monkeypatch.setattr("app.auth.vault.settings.VAULT_REFRESH_INTERVAL", 0.01)
+    monkeypatch.setattr("app.auth.vault.settings.VAULT_MAX_STALENESS", 60)
+    return VaultService()
+
+@pytest.fixture
+def reads(vault):
+    """Clock times of the Vault reads that have finished"""
+    reads = []
+    read_secret = vault._read_secret
+    
+    def counted(path):
+        secret = read_secret(path)
+        reads.append(secret.fetched_at)
+        return secret
+    
+    vault._read_secret = counted
+    return reads
+
+def write(vault_addr: str, data: dict):
+    """Store a new version of the name.com secret, as an operator would"""
+    hvac.Client(url=vault_addr, token=TOKEN).secrets.kv.create_or_update_secret(path=NAMECOM_SECRET_PATH, secret=data)
+
+async def eventually(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+async def test_concurrent_first_reads_share_one_vault_read(vault, reads):
+    secrets = await asyncio.gather(*(vault.get_secret(NAMECOM_SECRET_PATH) for _ in range(10)))
+    assert [secret["api_token"] for secret in secrets] == ["one"] * 10
+    assert len(reads) == 1
+
+async def test_refreshes_after_two_thirds_of_the_ttl(vault, reads, clock):
+    assert (await vault.get_secret(NAMECOM_SECRET_PATH))["api_token"] == "one"
+    vault.start()
+    try:
+        clock.now += 39
+        # Several refresh intervals pass without a read
+        await asyncio.sleep(0.1)
+        assert len(reads) == 1
+        clock.now += 2
+        await eventually(lambda: len(reads) == 2)
+        # Read before the secret expired, so callers never waited on Vault
+        assert 40 <= reads[1] - reads[0] < 60
+    finally:
+        await vault.stop()
+
+async def test_serves_stale_until_max_staleness(vault, clock):
+    assert (await vault.get_secret(NAMECOM_SECRET_PATH))["api_token"] == "one"
+    vault.client.token = "revoked"
+    clock.now += 90
+    assert (await vault.get_secret(NAMECOM_SECRET_PATH))["api_token"] == "one"
+    assert vault.cache_status()[NAMECOM_SECRET_PATH]["last_error"]
+    clock.now += 40
+    with pytest.raises(hvac.exceptions.Forbidden):
+        await vault.get_secret(NAMECOM_SECRET_PATH)
+
+async def test_listeners_hear_of_new_versions_only(vault, vault_addr, reads, clock):
+    seen = []
+    vault.subscribe(NAMECOM_SECRET_PATH, seen.append)
+    await vault.get_secret(NAMECOM_SECRET_PATH)
+    vault.start()
+    try:
+        # A refresh that finds the same version says nothing
+        clock.now += 41
+        await eventually(lambda: len(reads) == 2)
+        assert seen == []
+        write(vault_addr, {"api_token": "two", "username": "user"})
+        clock.now += 41
+        await eventually(lambda: len(reads) == 3)
+        assert seen == [{"api_token": "two", "username": "user"}]
+        assert vault.cache_status()[NAMECOM_SECRET_PATH]["version"] == 2
+    finally:
+        await vault.stop()
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from app.services.namecom import NamecomService
+from app.services.zonesync import diff_records, parse_zone_file, plan_operations
+
+CURRENT = [
+    {"recordId": 1, "host": "", "type": "NS", "answer": "ns1.name.com", "ttl": 300},
+    {"recordId": 2, "host": "", "type": "NS", "answer": "ns2.name.com", "ttl": 300},
+    {"recordId": 3, "host": "", "type": "SOA", "answer": "ns1.name.com. hostmaster.name.com. 1 10800 3600 604800 3600", "ttl": 300},
+    {"recordId": 4, "host": "www", "type": "CNAME", "answer": "lb.example.net", "ttl": 300},
+    {"recordId": 5, "host": "sub", "type": "NS", "answer": "ns.other.net", "ttl": 300}
+]
+
+def test_managed_records_are_left_alone_on_both_sides():
+    desired = parse_zone_file(
+        "$ORIGIN example.com.\n"
+        "$TTL 300\n"
+        "@ IN SOA ns1.name.com. hostmaster.name.com. 1 10800 3600 604800 3600\n"
+        "@ NS ns1.name.com.\n"
+        "www CNAME lb.example.net.\n"
+        "sub NS ns.other.net.\n",
+        "example.com"
+    )
+    plan = diff_records(CURRENT, desired, "example.com")
+    assert plan == {"create": [], "update": [], "delete": [], "unchanged": 2}
+
+def test_apex_ns_in_json_desired_set_is_ignored():
+    desired = [
+        {"name": "@", "type": "NS", "content": "ns9.example.net", "ttl": 300},
+        {"name": "www", "type": "CNAME", "content": "lb.example.net", "ttl": 300},
+        {"name": "sub", "type": "NS", "content": "ns.other.net", "ttl": 300}
+    ]
+    plan = diff_records(CURRENT, desired, "example.com")
+    assert plan["create"] == [] and plan["delete"] == []
+
+def test_cname_to_a_swap_deletes_before_it_creates():
+    desired = [
+        {"name": "www", "type": "A", "content": "192.0.2.1", "ttl": 300},
+        {"name": "sub", "type": "NS", "content": "ns.other.net", "ttl": 300}
+    ]
+    operations = plan_operations(diff_records(CURRENT, desired, "example.com"))
+    assert [operation["op"] for operation in operations] == ["delete", "create"]
+    assert operations[0]["record_id"] == 4
+
+@pytest.mark.anyio
+async def test_apply_dns_changes_runs_deletes_updates_then_creates(monkeypatch):
+    service = NamecomService(api_token="token", username="user")
+    events = []
+    
+    def handler(op, delay):
+        async def call(domain_name, **params):
+            events.append(("start", op))
+            await asyncio.sleep(delay)
+            events.append(("end", op))
+            return {"op": op}
+        return call
+    
+    monkeypatch.setattr(service, "create_dns_record", handler("create", 0))
+    monkeypatch.setattr(service, "update_dns_record", handler("update", 0.01))
+    monkeypatch.setattr(service, "delete_dns_record", handler("delete", 0.02))
+    results = await service.apply_dns_changes("example.com", [
+        {"op": "create", "name": "www", "type": "A", "content": "192.0.2.1"},
+        {"op": "update", "record_id": 7, "content": "192.0.2.2"},
+        {"op": "delete", "record_id": 4}
+    ])
+    assert [result["op"] for result in results] == ["create", "update", "delete"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert events == [
+        ("start", "delete"), ("end", "delete"),
+        ("start", "update"), ("end", "update"),
+        ("start", "create"), ("end", "create")
+    ]
+    await service.close()